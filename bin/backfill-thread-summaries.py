@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Compute the summaries (message, unread and starred counts, and categories) of
+threads that predate them. Sync keeps them up to date afterwards.
+
+Set THREAD_SUMMARY_FILTERS in the config once this has run on every shard,
+the thread API keeps filtering on the messages until then.
+"""
+
+import click
+from sqlalchemy import asc  # type: ignore[import-untyped]
+
+from inbox.error_handling import maybe_enable_error_reporting
+from inbox.ignition import engine_manager
+from inbox.logging import configure_logging, get_logger
+from inbox.models import Thread
+from inbox.models.session import session_scope_by_shard_id
+from inbox.models.thread import summarize_threads
+from inbox.models.util import limitlion
+
+configure_logging()
+log = get_logger(purpose="backfill-thread-summaries")
+
+
+def process_shard(  # type: ignore[no-untyped-def]
+    shard_id, dry_run, id_start: int = 0
+) -> None:
+    batch_size = 1000
+    throttle = limitlion.throttle_wait(
+        "backfill-thread-summaries", rps=1, window=5
+    )
+
+    n = 0
+    while True:
+        with session_scope_by_shard_id(
+            shard_id, versioned=False
+        ) as db_session:
+            thread_ids = [
+                thread_id
+                for (thread_id,) in db_session.query(Thread.id)
+                .filter(Thread.id > id_start)
+                .order_by(asc(Thread.id))
+                .limit(batch_size)
+            ]
+            if not thread_ids:
+                break
+
+            if not dry_run:
+                summarize_threads(db_session, thread_ids)
+                db_session.commit()
+
+        n += len(thread_ids)
+        id_start = thread_ids[-1]
+        log.info("progress", shard_id=shard_id, id_start=id_start, n=n)
+        throttle()
+
+    log.info("finished", shard_id=shard_id, n=n)
+
+
+@click.command()
+@click.option("--shard-id", type=int, default=None)
+@click.option("--id-start", type=int, default=0)
+@click.option("--dry-run", is_flag=True)
+def main(shard_id, id_start, dry_run) -> None:  # type: ignore[no-untyped-def]
+    maybe_enable_error_reporting()
+
+    if shard_id is not None:
+        process_shard(shard_id, dry_run, id_start)
+    else:
+        for shard_id in engine_manager.engines:
+            process_shard(shard_id, dry_run, id_start)
+
+
+if __name__ == "__main__":
+    main()
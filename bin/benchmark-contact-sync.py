@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+import random
+
+import click
+
+from inbox.contacts.abc import AbstractContactsProvider
+from inbox.contacts.remote_sync import ContactSync
+from inbox.models import Contact
+from inbox.models.util import delete_namespace
+from inbox.util.benchmark import (
+    Measurement,
+    create_account,
+    new_results,
+    print_results,
+)
+
+
+class SyntheticContactsProvider(AbstractContactsProvider):
+    """
+    Serves a reproducible synthetic directory, the way a provider returns
+    all contacts on a first sync and only the changed ones afterwards.
+    """
+
+    PROVIDER_NAME = "benchmark"
+
+    def __init__(self, seed: int) -> None:
+        self.rng = random.Random(seed)
+        self.contacts: dict[str, tuple[str, str]] = {}
+        self.changes: list[tuple[str, tuple[str, str] | None]] = []
+
+    def _person(self) -> tuple[str, str]:
+        number = self.rng.getrandbits(40)
+        return f"Person {number}", f"person.{number}@benchmark.test"
+
+    def generate(self, count: int) -> None:
+        for uid in range(len(self.contacts), len(self.contacts) + count):
+            self.contacts[str(uid)] = self._person()
+            self.changes.append((str(uid), self.contacts[str(uid)]))
+
+    def change(self, updates: int, deletes: int) -> None:
+        uids = self.rng.sample(sorted(self.contacts), updates + deletes)
+        for uid in uids[:updates]:
+            self.contacts[uid] = self._person()
+            self.changes.append((uid, self.contacts[uid]))
+        for uid in uids[updates:]:
+            del self.contacts[uid]
+            self.changes.append((uid, None))
+
+    def get_items(self, sync_from_dt=None, max_results=100000):  # type: ignore[no-untyped-def]  # noqa: ANN201
+        changes, self.changes = self.changes, []
+        for uid, person in changes:
+            name, email_address = person or (None, None)
+            yield Contact(  # type: ignore[call-arg]
+                uid=uid,
+                provider_name=self.PROVIDER_NAME,
+                name=name,
+                email_address=email_address,
+                deleted=person is None,
+            )
+
+
+@click.command()
+@click.option("--contacts", default=30000, help="Contacts in the directory.")
+@click.option("--polls", default=3, help="Incremental syncs to run.")
+@click.option(
+    "--updates-per-poll",
+    default=200,
+    help="Contacts changing before each incremental sync.",
+)
+@click.option(
+    "--deletes-per-poll",
+    default=50,
+    help="Contacts deleted before each incremental sync.",
+)
+@click.option("--seed", default=0, help="Seed for the synthetic directory.")
+@click.option(
+    "--keep-account",
+    is_flag=True,
+    help="Don't delete the benchmark account afterwards.",
+)
+def main(
+    contacts: int,
+    polls: int,
+    updates_per_poll: int,
+    deletes_per_poll: int,
+    seed: int,
+    keep_account: bool,
+) -> None:
+    """
+    Benchmark contact sync against a large synthetic directory.
+
+    Runs a first sync of the whole directory followed by incremental syncs
+    of changed and deleted contacts, using the configured database. Prints
+    one JSON document with contacts per second, database queries per
+    contact and peak RSS for every phase, so that runs against different
+    revisions can be compared.
+
+    Creates a throwaway account; only run this against a development or
+    test database.
+    """
+    provider = SyntheticContactsProvider(seed)
+    provider.generate(contacts)
+
+    account_id, namespace_id, email_address = create_account()
+    results = new_results(
+        parameters={
+            "contacts": contacts,
+            "updates_per_poll": updates_per_poll,
+            "deletes_per_poll": deletes_per_poll,
+            "seed": seed,
+        },
+        phases={},
+    )
+    measurement = Measurement(namespace_id, "contact")
+
+    try:
+        contact_sync = ContactSync(
+            email_address, "gmail", account_id, namespace_id
+        )
+        contact_sync.provider = provider
+        with measurement.phase(results["phases"], "initial", contacts):
+            contact_sync.sync()
+
+        for poll in range(1, polls + 1):
+            provider.change(updates_per_poll, deletes_per_poll)
+            with measurement.phase(
+                results["phases"],
+                f"poll_{poll}",
+                updates_per_poll + deletes_per_poll,
+            ):
+                contact_sync.sync()
+    finally:
+        if not keep_account:
+            delete_namespace(namespace_id)
+
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
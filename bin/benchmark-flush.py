@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+import time
+from datetime import datetime
+from typing import Any
+
+import click
+
+from inbox.models import Thread
+from inbox.models.session import session_scope
+from inbox.models.util import delete_namespace
+from inbox.util.benchmark import create_account, new_results, print_results
+
+
+def create_threads(namespace_id: int, count: int) -> list[int]:
+    now = datetime.utcnow()
+    with session_scope(namespace_id) as db_session:
+        threads = [
+            Thread(  # type: ignore[call-arg]
+                subject=f"Thread {number}",
+                subjectdate=now,
+                recentdate=now,
+                namespace_id=namespace_id,
+            )
+            for number in range(count)
+        ]
+        db_session.add_all(threads)
+        db_session.commit()
+        return [thread.id for thread in threads]
+
+
+def measure_flushes(
+    namespace_id: int,
+    thread_ids: list[int],
+    loaded: int,
+    dirty_per_flush: int,
+    flushes: int,
+) -> dict[str, Any]:
+    """
+    Load `loaded` threads into one session, then repeatedly change a few of
+    them and time flushing the changes.
+    """
+    with session_scope(namespace_id) as db_session:
+        threads = (
+            db_session.query(Thread)
+            .filter(Thread.id.in_(thread_ids[:loaded]))
+            .order_by(Thread.id)
+            .all()
+        )
+        elapsed = 0.0
+        for flush in range(flushes):
+            for offset in range(dirty_per_flush):
+                thread = threads[
+                    (flush * dirty_per_flush + offset) % len(threads)
+                ]
+                thread.subject = f"Changed in flush {flush}"
+            start = time.perf_counter()
+            db_session.flush()
+            elapsed += time.perf_counter() - start
+        db_session.rollback()
+
+    return {
+        "objects_in_session": loaded,
+        "dirty_per_flush": dirty_per_flush,
+        "flushes": flushes,
+        "ms_per_flush": round(elapsed / flushes * 1000, 3),
+    }
+
+
+@click.command()
+@click.option(
+    "--objects", default=10000, help="Clean objects in the large session."
+)
+@click.option(
+    "--dirty-per-flush", default=5, help="Objects changed before each flush."
+)
+@click.option("--flushes", default=200, help="Flushes to time per session.")
+@click.option(
+    "--keep-account",
+    is_flag=True,
+    help="Don't delete the benchmark account afterwards.",
+)
+def main(
+    objects: int, dirty_per_flush: int, flushes: int, keep_account: bool
+) -> None:
+    """
+    Benchmark flushing a few changed objects from a large session.
+
+    Times flushes of a few changed threads from a session holding only
+    those threads and from a session holding many clean threads, using the
+    configured database. The versioning hooks only look at changed objects,
+    so both should take about as long. Prints one JSON document, so that
+    runs against different revisions can be compared.
+
+    Creates a throwaway account; only run this against a development or
+    test database.
+    """
+    _, namespace_id, _ = create_account()
+    results = new_results(sessions={})
+    try:
+        thread_ids = create_threads(namespace_id, objects)
+        results["sessions"]["small"] = measure_flushes(
+            namespace_id, thread_ids, dirty_per_flush, dirty_per_flush, flushes
+        )
+        results["sessions"]["large"] = measure_flushes(
+            namespace_id, thread_ids, objects, dirty_per_flush, flushes
+        )
+    finally:
+        if not keep_account:
+            delete_namespace(namespace_id)
+
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
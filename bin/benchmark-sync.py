@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+
+import math
+import random
+import string
+from collections import Counter
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import format_datetime
+from threading import BoundedSemaphore
+from typing import Any
+from unittest import mock
+
+import click
+
+from inbox.mailsync.backends.gmail import (
+    MAX_DOWNLOAD_COUNT,
+    GmailFolderSyncEngine,
+)
+from inbox.mailsync.backends.imap.generic import (
+    FolderSyncEngine,
+    uidvalidity_cb,
+)
+from inbox.models import Account, Folder, Transaction
+from inbox.models.backends.imap import ImapFolderSyncStatus
+from inbox.models.session import session_scope
+from inbox.models.util import delete_namespace
+from inbox.util.benchmark import (
+    Measurement,
+    create_account,
+    new_results,
+    print_results,
+)
+from inbox.util.testutils import MockIMAPClient
+
+# Methods of the IMAPClient stand-in that correspond to an IMAP command
+# round-trip. Capabilities are cached by IMAPClient so they aren't counted.
+IMAP_COMMANDS = frozenset({
+    "login",
+    "oauth2_login",
+    "list_folders",
+    "select_folder",
+    "folder_status",
+    "search",
+    "fetch",
+    "idle",
+    "idle_check",
+    "idle_done",
+    "enable",
+})
+
+GMAIL_FOLDERS = [((b"\\All", b"\\HasNoChildren"), b"/", "[Gmail]/All Mail")]
+GENERIC_FOLDERS = [((b"\\HasNoChildren",), b"/", "INBOX")]
+
+MIN_MESSAGE_SIZE = 256
+MAX_MESSAGE_SIZE = 10 * 1024 * 1024
+
+
+class BenchmarkIMAPClient(MockIMAPClient):
+    """
+    An in-process IMAPClient stand-in serving a synthetic mailbox, which
+    counts the IMAP commands issued against it.
+    """
+
+    welcome = b"* OK IMAP4rev1 Service Ready"
+
+    def __init__(
+        self, folders: list[tuple[Any, bytes, str]], capabilities: list[bytes]
+    ) -> None:
+        super().__init__()
+        self.folders = folders
+        self._capabilities = tuple(capabilities)
+        self.commands: Counter[str] = Counter()
+
+    def __getattribute__(self, name: str) -> Any:
+        if name in IMAP_COMMANDS:
+            object.__getattribute__(self, "commands")[name] += 1
+        return object.__getattribute__(self, name)
+
+    def list_folders(
+        self, directory: str = "", pattern: str = "*"
+    ) -> list[tuple[Any, bytes, str]]:
+        return self.folders
+
+    def capabilities(self) -> tuple[bytes, ...]:
+        return self._capabilities
+
+    def idle(self) -> None:
+        pass
+
+
+class MailboxGenerator:
+    """
+    Generates a reproducible synthetic mailbox in the UID data format
+    served by `MockIMAPClient`.
+    """
+
+    def __init__(
+        self,
+        seed: int,
+        median_size: int,
+        attachment_ratio: float,
+        thread_length: float,
+        inbox_ratio: float,
+    ) -> None:
+        self.rng = random.Random(seed)
+        self.median_size = median_size
+        self.attachment_ratio = attachment_ratio
+        self.thread_length = thread_length
+        self.inbox_ratio = inbox_ratio
+        self.threads: list[tuple[int, str, str]] = []
+        self.uidnext = 1
+        self.modseq = 1
+        self.date = datetime(2020, 1, 1)
+
+    def _message_size(self) -> int:
+        size = int(self.rng.lognormvariate(math.log(self.median_size), 1.0))
+        return max(MIN_MESSAGE_SIZE, min(size, MAX_MESSAGE_SIZE))
+
+    def _text(self, size: int) -> str:
+        words = self.rng.choices(string.ascii_lowercase, k=size)
+        return "\n".join(
+            "".join(words[i : i + 76]) for i in range(0, size, 76)
+        )
+
+    def _build_message(self, uid: int) -> tuple[bytes, int]:
+        message_id = f"<{uid}.{self.rng.getrandbits(32)}@benchmark.test>"
+        if self.threads and self.rng.random() > 1 / self.thread_length:
+            thread_index = self.rng.randrange(len(self.threads))
+            g_thrid, subject, references = self.threads[thread_index]
+            subject = "Re: " + subject
+            parent = references.split()[-1]
+            self.threads[thread_index] = (
+                g_thrid,
+                subject,
+                f"{references} {message_id}",
+            )
+        else:
+            g_thrid = uid
+            subject = f"Benchmark thread {uid}"
+            parent = None
+            self.threads.append((g_thrid, subject, message_id))
+
+        msg = EmailMessage()
+        sender = self.rng.randrange(100)
+        msg["From"] = f"Sender {sender} <sender{sender}@benchmark.test>"
+        msg["To"] = "Benchmark <benchmark@benchmark.test>"
+        msg["Subject"] = subject
+        msg["Date"] = format_datetime(self.date)
+        msg["Message-ID"] = message_id
+        if parent is not None:
+            msg["In-Reply-To"] = parent
+            msg["References"] = parent
+
+        size = self._message_size()
+        if self.rng.random() < self.attachment_ratio:
+            msg.set_content(self._text(size // 2))
+            msg.add_attachment(
+                self.rng.randbytes(size // 2),
+                maintype="application",
+                subtype="octet-stream",
+                filename=f"attachment-{uid}.bin",
+            )
+        else:
+            msg.set_content(self._text(size))
+        return msg.as_bytes(), g_thrid
+
+    def generate(self, count: int) -> dict[int, dict[bytes, Any]]:
+        """Generate `count` new messages with increasing UIDs."""
+        uids = {}
+        for _ in range(count):
+            uid = self.uidnext
+            body, g_thrid = self._build_message(uid)
+            inbox = self.rng.random() < self.inbox_ratio
+            uids[uid] = {
+                b"INTERNALDATE": self.date,
+                b"FLAGS": (b"\\Seen",) if self.rng.random() < 0.7 else (),
+                b"BODY[]": body,
+                b"RFC822.SIZE": len(body),
+                b"X-GM-LABELS": (b"\\Inbox",) if inbox else (),
+                b"X-GM-MSGID": uid,
+                b"X-GM-THRID": g_thrid,
+                b"MODSEQ": (self.modseq,),
+            }
+            self.uidnext += 1
+            self.modseq += 1
+            self.date += timedelta(minutes=self.rng.randrange(1, 120))
+        return uids
+
+    def change_flags(
+        self, uids: dict[int, dict[bytes, Any]], count: int
+    ) -> None:
+        r"""Toggle the \Seen flag on `count` random existing messages."""
+        for uid in self.rng.sample(sorted(uids), min(count, len(uids))):
+            seen = b"\\Seen" in uids[uid][b"FLAGS"]
+            uids[uid][b"FLAGS"] = () if seen else (b"\\Seen",)
+            uids[uid][b"MODSEQ"] = (self.modseq,)
+            self.modseq += 1
+
+
+class IMAPMeasurement(Measurement):
+    """Also counts the IMAP commands of every phase."""
+
+    def __init__(self, conn: BenchmarkIMAPClient, namespace_id: int) -> None:
+        super().__init__(namespace_id, "message")
+        self.conn = conn
+
+    def reset(self) -> None:
+        super().reset()
+        self.conn.commands.clear()
+
+    def extra(self, count: int) -> dict[str, Any]:
+        imap_commands = sum(self.conn.commands.values())
+        return {
+            "imap_commands": imap_commands,
+            "imap_commands_per_message": round(
+                imap_commands / max(count, 1), 2
+            ),
+            "imap_commands_by_type": dict(self.conn.commands),
+        }
+
+
+class BatchedGmailFolderSyncEngine(GmailFolderSyncEngine):
+    """Downloads and commits `download_count` messages per batch."""
+
+    download_count = MAX_DOWNLOAD_COUNT
+
+    def batch_download_uids(  # type: ignore[no-untyped-def]
+        self, crispin_client, uids, metadata, **kwargs
+    ) -> None:
+        kwargs.setdefault("max_download_count", self.download_count)
+        super().batch_download_uids(crispin_client, uids, metadata, **kwargs)
+
+
+def transactions_follow_messages(namespace_id: int) -> bool:
+    """
+    Whether the message insert transactions are in the same order as the
+    messages they record, which is what delta consumers rely on.
+    """
+    with session_scope(namespace_id) as db_session:
+        record_ids = [
+            record_id
+            for (record_id,) in db_session.query(Transaction.record_id)
+            .filter(
+                Transaction.namespace_id == namespace_id,
+                Transaction.object_type == "message",
+                Transaction.command == "insert",
+            )
+            .order_by(Transaction.id)
+        ]
+    return record_ids == sorted(record_ids)
+
+
+def create_folder(account_id: int, provider: str) -> str:
+    folder_name = "[Gmail]/All Mail" if provider == "gmail" else "INBOX"
+    canonical_name = "all" if provider == "gmail" else "inbox"
+    with session_scope(account_id) as db_session:
+        account = db_session.query(Account).get(account_id)
+        folder = Folder.find_or_create(
+            db_session, account, folder_name, canonical_name
+        )
+        folder.imapsyncstatus = ImapFolderSyncStatus(  # type: ignore[call-arg]
+            account=account
+        )
+        db_session.commit()
+    return folder_name
+
+
+@click.command()
+@click.option(
+    "--provider",
+    type=click.Choice(["generic", "gmail"]),
+    default="generic",
+    help="Run FolderSyncEngine (generic) or GmailFolderSyncEngine (gmail).",
+)
+@click.option("--messages", default=1000, help="Messages in the mailbox.")
+@click.option(
+    "--median-size",
+    default=8192,
+    help="Median message size in bytes; sizes are log-normal.",
+)
+@click.option(
+    "--attachment-ratio",
+    default=0.2,
+    help="Fraction of messages with an attachment.",
+)
+@click.option(
+    "--thread-length", default=3.0, help="Average messages per thread."
+)
+@click.option(
+    "--inbox-ratio", default=0.2, help="Fraction of messages in the inbox."
+)
+@click.option("--polls", default=3, help="Incremental polls to run.")
+@click.option(
+    "--new-per-poll", default=20, help="Messages arriving before each poll."
+)
+@click.option(
+    "--flag-changes-per-poll",
+    default=50,
+    help="Flag changes happening before each poll.",
+)
+@click.option(
+    "--condstore/--no-condstore",
+    default=True,
+    help="Whether the fake server advertises CONDSTORE.",
+)
+@click.option(
+    "--download-batch-size",
+    type=int,
+    default=None,
+    help="Messages per Gmail download batch, GMAIL_MAX_DOWNLOAD_COUNT "
+    "by default.",
+)
+@click.option("--seed", default=0, help="Seed for the synthetic mailbox.")
+@click.option(
+    "--keep-account",
+    is_flag=True,
+    help="Don't delete the benchmark account afterwards.",
+)
+def main(
+    provider: str,
+    messages: int,
+    median_size: int,
+    attachment_ratio: float,
+    thread_length: float,
+    inbox_ratio: float,
+    polls: int,
+    new_per_poll: int,
+    flag_changes_per_poll: int,
+    condstore: bool,
+    download_batch_size: int | None,
+    seed: int,
+    keep_account: bool,
+) -> None:
+    """
+    Benchmark IMAP sync throughput against a synthetic mailbox.
+
+    Runs an initial sync followed by incremental polls of a single folder
+    against an in-process IMAPClient stand-in, using the configured
+    database. Prints one JSON document with messages per second, database
+    queries and IMAP commands per message and peak RSS for every phase, so
+    that runs against different revisions can be compared. It also reports
+    whether the message transactions are in message id order, e.g. to
+    compare Gmail runs with different --download-batch-size values.
+
+    Creates a throwaway account; only run this against a development or
+    test database.
+    """
+    generator = MailboxGenerator(
+        seed, median_size, attachment_ratio, thread_length, inbox_ratio
+    )
+    capabilities = [b"IMAP4rev1"]
+    if condstore:
+        capabilities.append(b"CONDSTORE")
+    if provider == "gmail":
+        capabilities.append(b"X-GM-EXT-1")
+    conn = BenchmarkIMAPClient(
+        GMAIL_FOLDERS if provider == "gmail" else GENERIC_FOLDERS,
+        capabilities,
+    )
+
+    account_id, namespace_id, _ = create_account(provider)
+    folder_name = create_folder(account_id, provider)
+    mailbox = generator.generate(messages)
+    conn.add_folder_data(folder_name, mailbox)
+
+    engine_class: type[FolderSyncEngine] = FolderSyncEngine
+    if provider == "gmail":
+        engine_class = BatchedGmailFolderSyncEngine
+        if download_batch_size is not None:
+            BatchedGmailFolderSyncEngine.download_count = download_batch_size
+    results = new_results(
+        provider=provider,
+        parameters={
+            "messages": messages,
+            "median_size": median_size,
+            "attachment_ratio": attachment_ratio,
+            "thread_length": thread_length,
+            "condstore": condstore,
+            "download_batch_size": (
+                BatchedGmailFolderSyncEngine.download_count
+                if provider == "gmail"
+                else None
+            ),
+            "seed": seed,
+        },
+        phases={},
+    )
+    measurement = IMAPMeasurement(conn, namespace_id)
+
+    try:
+        with mock.patch(
+            "inbox.crispin.CrispinConnectionPool._new_raw_connection",
+            return_value=conn,
+        ):
+            sync_engine = engine_class(
+                account_id,
+                namespace_id,
+                folder_name,
+                f"benchmark@{provider}.test",
+                "gmail" if provider == "gmail" else "custom",
+                BoundedSemaphore(1),
+            )
+            with measurement.phase(results["phases"], "initial", messages):
+                sync_engine.initial_sync()
+
+            for poll in range(1, polls + 1):
+                mailbox.update(generator.generate(new_per_poll))
+                generator.change_flags(mailbox, flag_changes_per_poll)
+                with (
+                    measurement.phase(
+                        results["phases"], f"poll_{poll}", new_per_poll
+                    ),
+                    sync_engine.conn_pool.get() as crispin_client,
+                ):
+                    crispin_client.select_folder(folder_name, uidvalidity_cb)
+                    sync_engine.check_uid_changes(crispin_client)
+
+        results["transactions_follow_messages"] = (
+            transactions_follow_messages(namespace_id)
+        )
+    finally:
+        if not keep_account:
+            delete_namespace(namespace_id)
+
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,7 @@ from inbox.config import config
 from inbox.error_handling import maybe_enable_error_reporting
 from inbox.logging import configure_logging, get_logger
 from inbox.models.util import batch_delete_namespaces, get_accounts_to_delete
+from inbox.util.call_site import call_site
 
 configure_logging(logging.INFO)
 log = get_logger()
@@ -44,13 +45,14 @@ def run(throttle, dry_run) -> None:  # type: ignore[no-untyped-def]
 def delete_account_data(  # type: ignore[no-untyped-def]
     host, throttle, dry_run
 ) -> None:
-    while True:
-        for shard in host["SHARDS"]:
-            # Ensure shard is explicitly not marked as disabled
-            if "DISABLED" in shard and not shard["DISABLED"]:
-                namespace_ids = get_accounts_to_delete(shard["ID"])
-                batch_delete_namespaces(namespace_ids, throttle, dry_run)
-        time.sleep(600)
+    with call_site("delete-marked-accounts"):
+        while True:
+            for shard in host["SHARDS"]:
+                # Ensure shard is explicitly not marked as disabled
+                if "DISABLED" in shard and not shard["DISABLED"]:
+                    namespace_ids = get_accounts_to_delete(shard["ID"])
+                    batch_delete_namespaces(namespace_ids, throttle, dry_run)
+            time.sleep(600)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Maintains the partitions of a range-partitioned transaction table: creates
+empty partitions ahead of the highest transaction id and drops partitions
+whose transactions are all older than `days_ago` days.
+
+Pass --convert once per shard to switch an existing table to the
+partitioned layout.
+"""
+
+import logging
+
+import click
+
+from inbox.config import config
+from inbox.error_handling import maybe_enable_error_reporting
+from inbox.logging import configure_logging, get_logger
+from inbox.models.util import (
+    TRANSACTION_PARTITION_SIZE,
+    create_transaction_partitions,
+    drop_expired_transaction_partitions,
+    partition_transaction_table,
+)
+from inbox.util.call_site import call_site
+
+configure_logging(logging.INFO)
+log = get_logger()
+
+
+@click.command()
+@click.option("--days-ago", type=int, default=60)
+@click.option("--partition-size", type=int, default=TRANSACTION_PARTITION_SIZE)
+@click.option(
+    "--ahead",
+    type=int,
+    default=2,
+    help="Number of empty partitions to keep above the highest id.",
+)
+@click.option(
+    "--convert",
+    is_flag=True,
+    help="Partition the transaction table first. Rebuilds the table.",
+)
+@click.option("--dry-run", is_flag=True)
+def run(
+    days_ago: int,
+    partition_size: int,
+    ahead: int,
+    convert: bool,
+    dry_run: bool,
+) -> None:
+    maybe_enable_error_reporting()
+    with call_site("partition-transaction-log"):
+        for host in config["DATABASE_HOSTS"]:
+            for shard in host["SHARDS"]:
+                if shard.get("DISABLED"):
+                    log.info("Skipping disabled shard", shard_id=shard["ID"])
+                    continue
+
+                shard_id = shard["ID"]
+                if convert:
+                    partition_transaction_table(
+                        shard_id, partition_size, ahead, dry_run
+                    )
+                create_transaction_partitions(
+                    shard_id, partition_size, ahead, dry_run
+                )
+                dropped = drop_expired_transaction_partitions(
+                    shard_id, days_ago, dry_run
+                )
+                log.info(
+                    "Finished transaction partition maintenance",
+                    shard_id=shard_id,
+                    dropped_partitions=dropped,
+                )
+
+
+if __name__ == "__main__":
+    run()
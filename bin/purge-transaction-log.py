@@ -16,6 +16,7 @@ from inbox.config import config
 from inbox.error_handling import maybe_enable_error_reporting
 from inbox.logging import configure_logging, get_logger
 from inbox.models.util import purge_transactions
+from inbox.util.call_site import call_site
 
 configure_logging(logging.INFO)
 log = get_logger()
@@ -50,23 +51,24 @@ def run(  # type: ignore[no-untyped-def]
 def purge_old_transactions(  # type: ignore[no-untyped-def]
     host, days_ago, limit, throttle, dry_run
 ) -> None:
-    while True:
-        for shard in host["SHARDS"]:
-            # Ensure shard is explicitly not marked as disabled
-            if "DISABLED" in shard and not shard["DISABLED"]:
-                log.info(
-                    "Spawning transaction purge process for shard",
-                    shard_id=shard["ID"],
-                )
-                purge_transactions(
-                    shard["ID"], days_ago, limit, throttle, dry_run
-                )
-            else:
-                log.info(
-                    "Will not spawn process for disabled shard",
-                    shard_id=shard["ID"],
-                )
-        time.sleep(600)
+    with call_site("purge-transaction-log"):
+        while True:
+            for shard in host["SHARDS"]:
+                # Ensure shard is explicitly not marked as disabled
+                if "DISABLED" in shard and not shard["DISABLED"]:
+                    log.info(
+                        "Spawning transaction purge process for shard",
+                        shard_id=shard["ID"],
+                    )
+                    purge_transactions(
+                        shard["ID"], days_ago, limit, throttle, dry_run
+                    )
+                else:
+                    log.info(
+                        "Will not spawn process for disabled shard",
+                        shard_id=shard["ID"],
+                    )
+            time.sleep(600)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,17 @@
 #!/usr/bin/env python
+import collections
+import contextvars
+import dataclasses
 import datetime
 import enum
+import functools
+import json
 import logging
-from collections.abc import Iterable
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import click
 from sqlalchemy.orm import Query, joinedload  # type: ignore[import-untyped]
@@ -17,6 +26,8 @@ configure_logging(logging.ERROR)
 log = get_logger()
 
 
+# Blocks are processed in ranges of that many ids; each range is checked and
+# deleted by one worker and then checkpointed.
 BATCH_SIZE = 1000
 
 
@@ -26,11 +37,40 @@ class Resolution(enum.Enum):
     WOULD_DELETE = "would-delete"
 
 
-def find_blocks(
-    limit: "int | None",
-    after: "datetime.datetime | None",
-    before: "datetime.datetime | None",
-) -> "Iterable[tuple[Block, int]]":
+@dataclasses.dataclass
+class BlockResult:
+    id: int
+    created_at: datetime.datetime
+    data_sha256: str
+    size: "int | None"
+    parts: int
+    resolution: Resolution
+
+
+class RateLimiter:
+    """Spread work out so that it doesn't exceed `rate` units per second."""
+
+    def __init__(self, rate: "float | None") -> None:
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self, units: int) -> None:
+        if not self.rate:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + units / self.rate
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def block_query(
+    after: "datetime.datetime | None", before: "datetime.datetime | None"
+) -> Query:
     query = (
         Query([Block])
         .options(joinedload(Block.parts))  # type: ignore[attr-defined]
@@ -43,40 +83,130 @@ def find_blocks(
     if before:
         query = query.filter(Block.created_at < before)
 
-    inner_max_id_query = query.with_entities(Block.id)
+    return query
+
+
+def find_id_range(
+    query: Query, start_id: int, limit: "int | None"
+) -> "tuple[int, int] | None":
+    inner_id_query = query.with_entities(Block.id).filter(Block.id > start_id)
     if limit is not None:
-        inner_max_id_query = inner_max_id_query.limit(limit)
+        inner_id_query = inner_id_query.limit(limit)
+    inner_id_subquery = inner_id_query.subquery()
 
     with global_session_scope() as db_session:
-        max_id = db_session.query(
-            func.max(inner_max_id_query.subquery().c.id)
-        ).scalar()
-
-    yielded = 0
-    last_id = 0
-
-    while True:
-        with global_session_scope() as db_session:
-            block_batch = (
-                query.filter(Block.id > last_id)
-                .limit(
-                    min(limit, BATCH_SIZE) if limit is not None else BATCH_SIZE
-                )
-                .with_session(db_session)
-                .all()
+        min_id, max_id = db_session.query(
+            func.min(inner_id_subquery.c.id), func.max(inner_id_subquery.c.id)
+        ).one()
+
+    if min_id is None:
+        return None
+    return min_id, max_id
+
+
+def process_blocks(
+    query: Query,
+    first_id: int,
+    last_id: int,
+    dry_run: bool,
+    check_existence: bool,
+    rate_limiter: RateLimiter,
+) -> "list[BlockResult]":
+    with global_session_scope() as db_session:
+        blocks = (
+            query.filter(Block.id >= first_id, Block.id <= last_id)
+            .with_session(db_session)
+            .all()
+        )
+        results = [
+            BlockResult(
+                id=block.id,
+                created_at=block.created_at,
+                data_sha256=block.data_sha256,
+                size=block.size,
+                parts=len(block.parts),
+                resolution=(
+                    Resolution.DELETE
+                    if not dry_run
+                    else Resolution.WOULD_DELETE
+                ),
             )
+            for block in blocks
+        ]
 
-        if not block_batch:
-            return
+    rate_limiter.wait(len(results))
+
+    for result in results:
+        if check_existence:
+            # Only a HEAD request or a stat, the data isn't downloaded. The
+            # stored size may be compressed, so only its presence is used
+            # and block.size is still reported.
+            if (
+                blockstore.get_size_from_blockstore(result.data_sha256)
+                is None
+            ):
+                result.resolution = Resolution.NOT_PRESENT
+                result.size = None
+        # Otherwise assume it exists, it's OK to delete non-existent data.
+
+    to_delete = [
+        result.data_sha256
+        for result in results
+        if result.resolution is Resolution.DELETE
+    ]
+    if to_delete:
+        # Deleted from S3 up to 1000 keys per request.
+        blockstore.delete_from_blockstore(*to_delete)
+
+    return results
+
+
+def read_checkpoint(checkpoint_file: "str | None") -> int:
+    if not checkpoint_file or not os.path.exists(checkpoint_file):  # noqa: PTH110
+        return 0
+    with open(checkpoint_file) as f:  # noqa: PTH123
+        return json.load(f)["last_id"]
+
+
+def write_checkpoint(checkpoint_file: "str | None", last_id: int) -> None:
+    if not checkpoint_file:
+        return
+    temporary_file = f"{checkpoint_file}.tmp"
+    with open(temporary_file, "w") as f:  # noqa: PTH123
+        json.dump({"last_id": last_id}, f)
+    os.replace(temporary_file, checkpoint_file)  # noqa: PTH105
 
-        for block in block_batch:
-            if limit is not None and yielded >= limit:
-                return
 
-            yield block, max_id
-            yielded += 1
+def process_ranges(
+    id_ranges: "Iterable[tuple[int, int]]",
+    workers: int,
+    process_range: "Callable[[int, int], list[BlockResult]]",
+) -> "Iterable[tuple[int, list[BlockResult]]]":
+    """
+    Process id ranges concurrently and yield the last id and the results of
+    each range in order, keeping only a few ranges in flight at a time.
+    """
+    in_flight: collections.deque[tuple[int, Future[list[BlockResult]]]] = (
+        collections.deque()
+    )
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for first_id, last_id in id_ranges:
+            in_flight.append((
+                last_id,
+                executor.submit(
+                    contextvars.copy_context().run,
+                    process_range,
+                    first_id,
+                    last_id,
+                ),
+            ))
+            if len(in_flight) >= 2 * workers:
+                range_last_id, future = in_flight.popleft()
+                yield range_last_id, future.result()
 
-        last_id = block_batch[-1].id
+        while in_flight:
+            range_last_id, future = in_flight.popleft()
+            yield range_last_id, future.result()
 
 
 @click.command()
@@ -85,45 +215,83 @@ def find_blocks(
 @click.option("--before", type=str, default=None)
 @click.option("--dry-run/--no-dry-run", default=True)
 @click.option("--check-existence/--no-check-existence", default=False)
+@click.option(
+    "--workers", type=int, default=1, help="Ranges processed concurrently."
+)
+@click.option(
+    "--max-blocks-per-second",
+    type=float,
+    default=None,
+    help="Limit how fast blocks are checked and deleted.",
+)
+@click.option(
+    "--checkpoint-file",
+    type=str,
+    default=None,
+    help="Record progress in this file and resume from it.",
+)
 def run(
     limit: "int | None",
     after: "str | None",
     before: "str | None",
     dry_run: bool,
     check_existence: bool,
+    workers: int,
+    max_blocks_per_second: "float | None",
+    checkpoint_file: "str | None",
 ) -> None:
-    blocks = find_blocks(
-        limit,
+    query = block_query(
         (datetime.datetime.fromisoformat(after) if after else None),
         (datetime.datetime.fromisoformat(before) if before else None),
     )
 
-    for block, max_id in blocks:
-        if check_existence:
-            data = blockstore.get_from_blockstore(block.data_sha256)
-        else:
-            data = (
-                ...  # type: ignore[assignment]
-            )  # assume it exists, it's OK to delete non-existent data
-
-        if data is None:
-            resolution = Resolution.NOT_PRESENT
-        else:
-            resolution = (
-                Resolution.DELETE if not dry_run else Resolution.WOULD_DELETE
+    start_id = read_checkpoint(checkpoint_file)
+    id_range = find_id_range(query, start_id, limit)
+    if id_range is None:
+        return
+    min_id, max_id = id_range
+
+    id_ranges = (
+        (first_id, min(first_id + BATCH_SIZE - 1, max_id))
+        for first_id in range(min_id, max_id + 1, BATCH_SIZE)
+    )
+
+    start = time.perf_counter()
+    processed_blocks = processed_bytes = 0
+
+    process_range = functools.partial(
+        process_blocks,
+        query,
+        dry_run=dry_run,
+        check_existence=check_existence,
+        rate_limiter=RateLimiter(max_blocks_per_second),
+    )
+    for last_id, results in process_ranges(id_ranges, workers, process_range):
+        for result in results:
+            print(
+                f"{result.id}/{max_id}",
+                result.created_at.date(),
+                result.resolution.value,
+                result.data_sha256,
+                result.size,
+                result.parts,
             )
+            processed_blocks += 1
+            processed_bytes += result.size or 0
 
-        print(
-            f"{block.id}/{max_id}",
-            block.created_at.date(),
-            resolution.value,
-            block.data_sha256,
-            (block.size if data else None),
-            len(block.parts),  # type: ignore[attr-defined]
-        )
+        if not dry_run:
+            write_checkpoint(checkpoint_file, last_id)
 
-        if resolution is Resolution.DELETE:
-            blockstore.delete_from_blockstore(block.data_sha256)
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps({
+            "blocks": processed_blocks,
+            "bytes": processed_bytes,
+            "seconds": round(elapsed, 3),
+            "blocks_per_second": round(processed_blocks / elapsed, 2),
+            "bytes_per_second": round(processed_bytes / elapsed, 2),
+        })
+    )
 
 
 if __name__ == "__main__":
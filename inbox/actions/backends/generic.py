@@ -37,11 +37,12 @@ __all__ = [
 # * should add support for rolling back message.categories() on failure.
 
 
-def uids_by_folder(message_id, db_session):  # type: ignore[no-untyped-def]
+def uids_by_folder(message_ids, db_session):  # type: ignore[no-untyped-def]
     results = (
         db_session.query(ImapUid.msg_uid, Folder.name)
         .join(Folder)
-        .filter(ImapUid.message_id == message_id)
+        .filter(ImapUid.message_id.in_(set(message_ids)))
+        .order_by(ImapUid.msg_uid)
         .all()
     )
     mapping = defaultdict(list)
@@ -72,15 +73,16 @@ def _create_email(account, message):  # type: ignore[no-untyped-def]
 
 
 def _set_flag(  # type: ignore[no-untyped-def]
-    crispin_client, account_id, message_id, flag_name, is_add
+    crispin_client, account_id, message_ids, flag_name, is_add
 ) -> None:
     with session_scope(account_id) as db_session:
-        uids_for_message = uids_by_folder(message_id, db_session)
-    if not uids_for_message:
-        log.warning("No UIDs found for message", message_id=message_id)
+        uids_for_messages = uids_by_folder(message_ids, db_session)
+    if not uids_for_messages:
+        log.warning("No UIDs found for messages", message_ids=message_ids)
         return
 
-    for folder_name, uids in uids_for_message.items():
+    # One STORE per folder, whichever number of messages we were given.
+    for folder_name, uids in uids_for_messages.items():
         crispin_client.select_folder_if_necessary(folder_name, uidvalidity_cb)
         if is_add:
             crispin_client.conn.add_flags(uids, [flag_name], silent=True)
@@ -89,27 +91,29 @@ def _set_flag(  # type: ignore[no-untyped-def]
 
 
 def set_remote_starred(  # type: ignore[no-untyped-def]
-    crispin_client, account, message_id, starred
+    crispin_client, account, message_ids, starred
 ) -> None:
-    _set_flag(crispin_client, account, message_id, "\\Flagged", starred)
+    _set_flag(crispin_client, account, message_ids, "\\Flagged", starred)
 
 
 def set_remote_unread(  # type: ignore[no-untyped-def]
-    crispin_client, account, message_id, unread
+    crispin_client, account, message_ids, unread
 ) -> None:
-    _set_flag(crispin_client, account, message_id, "\\Seen", not unread)
+    _set_flag(crispin_client, account, message_ids, "\\Seen", not unread)
 
 
 def remote_move(  # type: ignore[no-untyped-def]
-    crispin_client, account_id, message_id, destination
+    crispin_client, account_id, message_ids, destination
 ) -> None:
     with session_scope(account_id) as db_session:
-        uids_for_message = uids_by_folder(message_id, db_session)
-    if not uids_for_message:
-        log.warning("No UIDs found for message", message_id=message_id)
+        uids_for_messages = uids_by_folder(message_ids, db_session)
+    if not uids_for_messages:
+        log.warning("No UIDs found for messages", message_ids=message_ids)
         return
 
-    for folder_name, uids in uids_for_message.items():
+    # One MOVE (or COPY and EXPUNGE) per folder, whichever number of
+    # messages we were given.
+    for folder_name, uids in uids_for_messages.items():
         crispin_client.select_folder_if_necessary(folder_name, uidvalidity_cb)
 
         if crispin_client.move_supported():
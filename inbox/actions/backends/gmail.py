@@ -22,14 +22,8 @@ def _encode_labels(labels):  # type: ignore[no-untyped-def]
 def remote_change_labels(  # type: ignore[no-untyped-def]
     crispin_client, account_id, message_ids, removed_labels, added_labels
 ) -> None:
-    uids_for_message: dict[str, list[str]] = {}
     with session_scope(account_id) as db_session:
-        for message_id in message_ids:
-            folder_uids_map = uids_by_folder(message_id, db_session)
-            for folder_name, uids in folder_uids_map.items():
-                if folder_name not in uids_for_message:
-                    uids_for_message[folder_name] = []
-                uids_for_message[folder_name].extend(uids)
+        uids_for_message = uids_by_folder(message_ids, db_session)
 
     for folder_name, uids in uids_for_message.items():
         crispin_client.select_folder_if_necessary(folder_name, uidvalidity_cb)
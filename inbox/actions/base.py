@@ -52,28 +52,33 @@ log = get_logger()
 
 
 def can_handle_multiple_records(action_name):  # type: ignore[no-untyped-def]  # noqa: ANN201
-    return action_name == "change_labels"
+    return action_name in (
+        "change_labels",
+        "mark_unread",
+        "mark_starred",
+        "move",
+    )
 
 
 def mark_unread(  # type: ignore[no-untyped-def]
-    crispin_client, account_id, message_id, args
+    crispin_client, account_id, message_ids, args
 ) -> None:
     unread = args["unread"]
-    set_remote_unread(crispin_client, account_id, message_id, unread)
+    set_remote_unread(crispin_client, account_id, message_ids, unread)
 
 
 def mark_starred(  # type: ignore[no-untyped-def]
-    crispin_client, account_id, message_id, args
+    crispin_client, account_id, message_ids, args
 ) -> None:
     starred = args["starred"]
-    set_remote_starred(crispin_client, account_id, message_id, starred)
+    set_remote_starred(crispin_client, account_id, message_ids, starred)
 
 
 def move(  # type: ignore[no-untyped-def]
-    crispin_client, account_id, message_id, args
+    crispin_client, account_id, message_ids, args
 ) -> None:
     destination = args["destination"]
-    remote_move(crispin_client, account_id, message_id, destination)
+    remote_move(crispin_client, account_id, message_ids, destination)
 
 
 def change_labels(  # type: ignore[no-untyped-def]
@@ -0,0 +1,88 @@
+"""
+Conditional GETs for API objects and lists.
+
+Every change to an API object of a namespace is recorded in its transaction
+log, so the response to a GET request of the namespace may only change when
+the log does. Transaction ids are assigned when they're inserted rather than
+when they're committed, so a change can become visible after a transaction
+with a higher id, without changing the latest id. The ETag of a response
+therefore combines the latest transaction id with a counter of the commits
+that wrote to the log, which is bumped after each commit, and with a digest
+of everything else the response depends on. A request whose If-None-Match
+matches it is answered with a 304 before the objects are loaded and
+serialized.
+"""
+
+import datetime
+import functools
+import hashlib
+from collections.abc import Callable
+from typing import Any
+
+from flask import Response, g, make_response, request
+from sqlalchemy import func  # type: ignore[import-untyped]
+
+from inbox.models import Transaction
+from inbox.models.transaction import get_commit_counter
+
+
+def get_latest_transaction_id(  # type: ignore[no-untyped-def]
+    db_session, namespace_id: int
+) -> int:
+    """
+    Get the id of the latest transaction of a namespace, 0 if it has none.
+
+    Takes the latest transaction of each object type, which the index on
+    (namespace_id, object_type, id) finds without scanning the namespace's
+    transactions.
+    """
+    return max(
+        (
+            latest_id
+            for (latest_id,) in db_session.query(func.max(Transaction.id))
+            .filter(Transaction.namespace_id == namespace_id)
+            .group_by(Transaction.object_type)
+        ),
+        default=0,
+    )
+
+
+def get_etag() -> str:
+    # The objects of a response are loaded after this, so they are never
+    # older than the id and the counter.
+    commit_counter = get_commit_counter(g.namespace.id)
+    latest_transaction_id = get_latest_transaction_id(
+        g.db_session, g.namespace.id
+    )
+    # Responses also depend on how the request asked for them, and on the
+    # current date through the expansion of recurring events.
+    digest = hashlib.sha256(
+        repr((
+            g.namespace.public_id,
+            g.api_version,
+            request.environ.get("IS_N1", False),
+            request.path,
+            sorted(request.args.items(multi=True)),
+            request.headers.get("Accept"),
+            datetime.datetime.utcnow().date().isoformat(),
+        )).encode()
+    ).hexdigest()
+    return f"{latest_transaction_id}-{commit_counter}-{digest[:16]}"
+
+
+def conditional_get(view: Callable[..., Any]) -> Callable[..., Response]:
+    """Decorate an API view to answer with a 304 if nothing changed."""
+
+    @functools.wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Response:
+        etag = get_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = make_response("", 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        return response
+
+    return wrapper
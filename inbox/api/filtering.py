@@ -14,6 +14,7 @@ from sqlalchemy.orm import (  # type: ignore[import-untyped]
 
 from inbox.api.err import InputError
 from inbox.api.validation import valid_public_id
+from inbox.config import config
 from inbox.models import (
     Block,
     Calendar,
@@ -26,6 +27,7 @@ from inbox.models import (
     MessageContactAssociation,
     Part,
     Thread,
+    ThreadCategory,
 )
 from inbox.models.event import RecurringEvent
 from inbox.models.message import load_events_for_messages
@@ -158,6 +160,10 @@ def threads(  # type: ignore[no-untyped-def]  # noqa: ANN201
         )
         query = query.filter(Thread.id.in_(files_query))
 
+    # The thread summary is only complete once it has been backfilled for
+    # existing threads, until then answer from the messages themselves.
+    use_thread_summary = config.get("THREAD_SUMMARY_FILTERS", False)
+
     if in_ is not None:
         category_filters = [Category.name == in_, Category.display_name == in_]
         try:
@@ -165,39 +171,55 @@ def threads(  # type: ignore[no-untyped-def]  # noqa: ANN201
             category_filters.append(Category.public_id == in_)
         except InputError:
             pass
-        category_query = (
-            db_session.query(Message.thread_id)
-            .prefix_with("STRAIGHT_JOIN")
-            .join(Message.messagecategories)  # type: ignore[attr-defined]
-            .join(MessageCategory.category)
-            .filter(
-                Category.namespace_id == namespace_id, or_(*category_filters)
+        if use_thread_summary:
+            category_query = db_session.query(ThreadCategory.thread_id).join(
+                Category, ThreadCategory.category_id == Category.id
             )
-            .subquery()
-        )
+        else:
+            category_query = (
+                db_session.query(Message.thread_id)
+                .prefix_with("STRAIGHT_JOIN")
+                .join(Message.messagecategories)  # type: ignore[attr-defined]
+                .join(MessageCategory.category)
+            )
+        category_query = category_query.filter(
+            Category.namespace_id == namespace_id, or_(*category_filters)
+        ).subquery()
         query = query.filter(Thread.id.in_(category_query))
 
     if unread is not None:
-        read = not unread
-        unread_query = (
-            db_session.query(Message.thread_id)
-            .filter(
-                Message.namespace_id == namespace_id, Message.is_read == read
+        if not use_thread_summary:
+            read = not unread
+            unread_query = (
+                db_session.query(Message.thread_id)
+                .filter(
+                    Message.namespace_id == namespace_id,
+                    Message.is_read == read,
+                )
+                .subquery()
             )
-            .subquery()
-        )
-        query = query.filter(Thread.id.in_(unread_query))
+            query = query.filter(Thread.id.in_(unread_query))
+        elif unread:
+            # Threads with at least one message in the requested state.
+            query = query.filter(Thread.unread_count > 0)
+        else:
+            query = query.filter(Thread.message_count > Thread.unread_count)
 
     if starred is not None:
-        starred_query = (
-            db_session.query(Message.thread_id)
-            .filter(
-                Message.namespace_id == namespace_id,
-                Message.is_starred == starred,
+        if not use_thread_summary:
+            starred_query = (
+                db_session.query(Message.thread_id)
+                .filter(
+                    Message.namespace_id == namespace_id,
+                    Message.is_starred == starred,
+                )
+                .subquery()
             )
-            .subquery()
-        )
-        query = query.filter(Thread.id.in_(starred_query))
+            query = query.filter(Thread.id.in_(starred_query))
+        elif starred:
+            query = query.filter(Thread.starred_count > 0)
+        else:
+            query = query.filter(Thread.message_count > Thread.starred_count)
 
     if view == "count":
         return {"count": query.one()[0]}
@@ -856,7 +878,7 @@ def events(  # type: ignore[no-untyped-def]  # noqa: ANN201
 
 
 def messages_for_contact_scores(  # type: ignore[no-untyped-def]  # noqa: ANN201
-    db_session, namespace_id, starts_after=None
+    db_session, namespace_id, starts_after=None, after_id=None
 ):
     query = (
         db_session.query(
@@ -877,4 +899,7 @@ def messages_for_contact_scores(  # type: ignore[no-untyped-def]  # noqa: ANN201
     if starts_after:
         query = query.filter(Message.received_date > starts_after)
 
+    if after_id is not None:
+        query = query.filter(Message.id > after_id)
+
     return query.all()
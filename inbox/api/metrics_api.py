@@ -1,3 +1,6 @@
+import datetime
+import threading
+import time
 from collections import defaultdict
 from operator import itemgetter
 from typing import Any
@@ -8,6 +11,7 @@ from sqlalchemy.orm.exc import NoResultFound  # type: ignore[import-untyped]
 
 from inbox.api.err import InputError
 from inbox.api.kellogs import APIEncoder
+from inbox.config import config
 from inbox.events.remote_sync import EVENT_SYNC_FOLDER_ID
 from inbox.heartbeat.status import get_ping_status
 from inbox.logging import get_logger
@@ -21,10 +25,14 @@ log = get_logger()
 app = Blueprint("metrics_api", __name__, url_prefix="/metrics")
 
 
-def _get_calendar_data(db_session, namespace):  # type: ignore[no-untyped-def]
+def _get_calendar_data(  # type: ignore[no-untyped-def]
+    db_session, namespace, since=None
+):
     calendars = db_session.query(Calendar)
     if namespace:
         calendars = calendars.filter_by(namespace_id=namespace.id)
+    if since:
+        calendars = calendars.filter(Calendar.updated_at >= since)
 
     calendars = calendars.options(
         joinedload(Calendar.namespace)
@@ -32,7 +40,9 @@ def _get_calendar_data(db_session, namespace):  # type: ignore[no-untyped-def]
         .noload(Namespace.account)
     )
 
-    calendar_data = defaultdict(list)
+    calendar_data: defaultdict[int, dict[int, dict[str, Any]]] = defaultdict(
+        dict
+    )
     for calendar in calendars:
         account_id = calendar.namespace.account_id
 
@@ -43,17 +53,19 @@ def _get_calendar_data(db_session, namespace):  # type: ignore[no-untyped-def]
             else:
                 state = "initial"
 
-        calendar_data[account_id].append({
+        calendar_data[account_id][calendar.id] = {
             "uid": calendar.uid,
             "name": calendar.name,
             "last_synced": calendar.last_synced,
             "state": state,
-        })
+        }
 
     return calendar_data
 
 
-def _get_folder_data(db_session, accounts):  # type: ignore[no-untyped-def]
+def _get_folder_data(  # type: ignore[no-untyped-def]
+    db_session, accounts, since=None
+):
     folder_sync_statuses = db_session.query(ImapFolderSyncStatus)
     # This assumes that the only cases for metrics we have is 1) fetching
     # metrics for a specific account, and 2) fetching metrics for all accounts.
@@ -61,6 +73,10 @@ def _get_folder_data(db_session, accounts):  # type: ignore[no-untyped-def]
         folder_sync_statuses = folder_sync_statuses.filter(
             ImapFolderSyncStatus.account_id == accounts[0].id
         )
+    if since:
+        folder_sync_statuses = folder_sync_statuses.filter(
+            ImapFolderSyncStatus.updated_at >= since
+        )
     folder_sync_statuses = folder_sync_statuses.join(Folder).with_entities(
         ImapFolderSyncStatus.account_id,
         ImapFolderSyncStatus.folder_id,
@@ -90,172 +106,343 @@ def _get_folder_data(db_session, accounts):  # type: ignore[no-untyped-def]
     return folder_data
 
 
-@app.route("/")
-def index():  # type: ignore[no-untyped-def]  # noqa: ANN201
-    with global_session_scope() as db_session:
-        if "namespace_id" in request.args:
+def _get_account_data(account) -> dict[str, Any] | None:  # type: ignore[no-untyped-def]
+    """
+    Extract the account fields the metrics are made of, so that they can be
+    kept around after the session is gone.
+    """
+    try:
+        return {
+            "id": account.id,
+            "public_id": account.public_id,
+            "namespace_private_id": account.namespace.id,
+            "namespace_id": account.namespace.public_id,
+            "provider_name": account.provider,
+            "email_address": account.email_address,
+            "sync_email": account.sync_email,
+            "sync_events": account.sync_events,
+            "sync_status": dict(account.sync_status),
+            "sync_host": account.sync_host,
+            "throttled": account.throttled,
+            "created_at": account.created_at,
+            "updated_at": account.updated_at,
+        }
+    except Exception:
+        log.exception(
+            "Error while serializing account metrics", account_id=account.id
+        )
+        return None
+
+
+def _get_account_metrics(  # type: ignore[no-untyped-def]
+    account, folder_data, calendar_data, heartbeat
+):
+    # Heartbeats are merged into copies, `folder_data` may be cached.
+    account_folder_data = {
+        folder_id: dict(folder) for folder_id, folder in folder_data.items()
+    }
+    account_calendar_data = list(calendar_data.values())
+    events_alive = False
+    email_alive = False
+
+    if heartbeat is not None:
+        for folder_status in heartbeat.folders:
+            folder_status_id = int(folder_status.id)
+            if folder_status_id in account_folder_data:
+                account_folder_data[folder_status_id].update({
+                    "alive": folder_status.alive,
+                    "heartbeat_at": folder_status.timestamp,
+                })
+            elif folder_status_id == EVENT_SYNC_FOLDER_ID:
+                events_alive = folder_status.alive
+
+        email_alive = all(f["alive"] for f in account_folder_data.values())
+
+        alive = True
+        if account["sync_email"] and not email_alive:
+            alive = False
+        if account["sync_events"] and not events_alive:
+            alive = False
+
+        email_initial_sync = any(
+            f["state"] == "initial" for f in account_folder_data.values()
+        )
+        events_initial_sync = any(
+            c["state"] == "initial" for c in account_calendar_data
+        )
+        initial_sync = email_initial_sync or events_initial_sync
+
+        total_uids = sum(
+            f["remote_uid_count"] or 0 for f in account_folder_data.values()
+        )
+        remaining_uids = sum(
+            f["download_uid_count"] or 0 for f in account_folder_data.values()
+        )
+        if total_uids:
+            progress = 100.0 / total_uids * (total_uids - remaining_uids)
+        else:
+            progress = None
+    else:
+        alive = False
+        email_initial_sync = None
+        events_initial_sync = None
+        initial_sync = None
+        progress = None
+
+    sync_status = account["sync_status"]
+    is_running = sync_status["state"] == "running"
+    if (
+        is_running
+        and not sync_status.get("sync_start_time")
+        and not sync_status.get("sync_error")
+    ):
+        sync_status_str = "starting"
+    elif is_running and alive:
+        if initial_sync:
+            sync_status_str = "initial"
+        else:
+            sync_status_str = "running"
+    elif is_running:
+        # Nylas is syncing, but not all heartbeats are reporting.
+        sync_status_str = "delayed"
+    else:
+        # Nylas is no longer syncing this account.
+        sync_status_str = "dead"
+
+    return {
+        "account_private_id": account["id"],
+        "namespace_private_id": account["namespace_private_id"],
+        "account_id": account["public_id"],
+        "namespace_id": account["namespace_id"],
+        "events_alive": events_alive,
+        "email_alive": email_alive,
+        "alive": alive,
+        "email_initial_sync": email_initial_sync,
+        "events_initial_sync": events_initial_sync,
+        "initial_sync": initial_sync,
+        "provider_name": account["provider_name"],
+        "email_address": account["email_address"],
+        "folders": sorted(
+            account_folder_data.values(), key=itemgetter("name")
+        ),
+        "calendars": sorted(account_calendar_data, key=itemgetter("name")),
+        "sync_email": account["sync_email"],
+        "sync_events": account["sync_events"],
+        "sync_status": sync_status_str,
+        "sync_error": sync_status.get("sync_error"),
+        "sync_end_time": sync_status.get("sync_end_time"),
+        "sync_disabled_reason": sync_status.get("sync_disabled_reason"),
+        "sync_host": account["sync_host"],
+        "progress": progress,
+        "throttled": account["throttled"],
+        "created_at": account["created_at"],
+        "updated_at": account["updated_at"],
+    }
+
+
+def _is_deleted(account) -> bool:  # type: ignore[no-untyped-def]
+    return (
+        account._sync_status.get("sync_disabled_reason") == "account deleted"
+    )
+
+
+class MetricsAggregator:
+    """
+    Keeps the account, folder and calendar sync state behind the metrics of
+    all accounts in memory, so that they don't have to be rebuilt from every
+    shard on every scrape.
+
+    A refresh rereads only the rows updated since the previous one, and the
+    heartbeats of all accounts, which are cheap to read from Redis. Rows that
+    disappear, e.g. deleted accounts, are only dropped by the full reload
+    done every `full_refresh_interval` seconds.
+    """
+
+    # Rows are reread from a bit before the previous refresh, to account for
+    # clock skew between hosts and second precision of updated_at.
+    UPDATED_AT_MARGIN = datetime.timedelta(minutes=1)
+
+    def __init__(
+        self, max_age: float = 30, full_refresh_interval: float = 600
+    ) -> None:
+        self.max_age = max_age
+        self.full_refresh_interval = full_refresh_interval
+        self._lock = threading.Lock()
+        self._accounts: dict[int, dict[str, Any]] = {}
+        self._folder_data: defaultdict[int, dict[int, dict[str, Any]]] = (
+            defaultdict(dict)
+        )
+        self._calendar_data: defaultdict[int, dict[int, dict[str, Any]]] = (
+            defaultdict(dict)
+        )
+        self._full_refresh_at: float | None = None
+        self._refreshed_since: datetime.datetime | None = None
+        self.metrics: list[dict[str, Any]] = []
+        self.generated_at: float | None = None
+
+    def get_metrics(self) -> tuple[list[dict[str, Any]], float]:
+        """
+        Return the metrics of all accounts and the time they were generated
+        at, refreshing them first if they are older than `max_age` seconds.
+        """
+        if (
+            self.generated_at is not None
+            and time.time() - self.generated_at < self.max_age
+        ):
+            return self.metrics, self.generated_at
+
+        # While another request refreshes, serve what we have.
+        blocking = self.generated_at is None
+        if self._lock.acquire(blocking=blocking):
             try:
-                namespace = (
-                    db_session.query(Namespace)
-                    .filter(
-                        Namespace.public_id == request.args["namespace_id"]
+                self.refresh()
+            finally:
+                self._lock.release()
+        return self.metrics, self.generated_at  # type: ignore[return-value]
+
+    def refresh(self) -> None:
+        now = time.time()
+        started_at = datetime.datetime.utcnow()
+        full = (
+            self._full_refresh_at is None
+            or now - self._full_refresh_at >= self.full_refresh_interval
+        )
+        since = None if full else self._refreshed_since
+
+        with global_session_scope() as db_session:
+            accounts = db_session.query(ImapAccount).with_polymorphic([
+                GenericAccount
+            ])
+            if since:
+                accounts = accounts.filter(ImapAccount.updated_at >= since)
+            else:
+                # Get all account IDs that aren't deleted
+                account_ids = [
+                    result[0]
+                    for result in db_session.query(
+                        ImapAccount.id, ImapAccount._sync_status
                     )
-                    .one()
-                )
-            except NoResultFound:
-                return APIEncoder().jsonify([])
-        else:
-            namespace = None
+                    if result[1].get("sync_disabled_reason")
+                    != "account deleted"
+                ]
 
-        accounts = db_session.query(ImapAccount).with_polymorphic([
-            GenericAccount
-        ])
+                # This is faster than fetching all accounts.
+                accounts = accounts.filter(ImapAccount.id.in_(account_ids))
 
-        if namespace:
-            accounts = accounts.filter(
-                Account.namespace == namespace  # type: ignore[attr-defined]
+            accounts = list(accounts)
+            folder_data = _get_folder_data(db_session, [], since)
+            calendar_data = _get_calendar_data(db_session, None, since)
+
+        if full:
+            self._accounts = {}
+            self._folder_data = defaultdict(dict)
+            self._calendar_data = defaultdict(dict)
+            self._full_refresh_at = now
+
+        for account in accounts:
+            account_data = None
+            if not _is_deleted(account):
+                account_data = _get_account_data(account)
+            if account_data is None:
+                self._accounts.pop(account.id, None)
+            else:
+                self._accounts[account.id] = account_data
+        for account_id, folders in folder_data.items():
+            self._folder_data[account_id].update(folders)
+        for account_id, calendars in calendar_data.items():
+            self._calendar_data[account_id].update(calendars)
+        self._refreshed_since = started_at - self.UPDATED_AT_MARGIN
+
+        heartbeat = get_ping_status(account_ids=list(self._accounts))
+        self.metrics = [
+            _get_account_metrics(
+                account,
+                self._folder_data[account_id],
+                self._calendar_data[account_id],
+                heartbeat.get(account_id),
             )
-        else:
-            # Get all account IDs that aren't deleted
-            account_ids = [
-                result[0]
-                for result in db_session.query(
-                    ImapAccount.id, ImapAccount._sync_status
-                )
-                if result[1].get("sync_disabled_reason") != "account deleted"
-            ]
+            for account_id, account in self._accounts.items()
+        ]
+        self.generated_at = now
 
-            # This is faster than fetching all accounts.
-            accounts = accounts.filter(ImapAccount.id.in_(account_ids))
 
-        accounts = list(accounts)
+aggregator = MetricsAggregator(
+    max_age=config.get("METRICS_SNAPSHOT_MAX_AGE", 30),
+    full_refresh_interval=config.get("METRICS_FULL_REFRESH_INTERVAL", 600),
+)
 
-        folder_data = _get_folder_data(db_session, accounts)
-        calendar_data = _get_calendar_data(db_session, namespace)
-        heartbeat = get_ping_status(account_ids=[acc.id for acc in accounts])
+# Fields the metrics of all accounts can be filtered on.
+FILTERABLE_FIELDS = ("provider_name", "sync_host", "sync_status")
 
-        data = []
 
-        for account in accounts:
-            if account.id in heartbeat:
-                account_heartbeat = heartbeat[account.id]
-                account_folder_data = folder_data[account.id]
-                account_calendar_data = calendar_data[account.id]
-
-                events_alive = False
-
-                for folder_status in account_heartbeat.folders:
-                    folder_status_id = int(folder_status.id)
-                    if folder_status_id in account_folder_data:
-                        account_folder_data[folder_status_id].update({
-                            "alive": folder_status.alive,
-                            "heartbeat_at": folder_status.timestamp,
-                        })
-                    elif folder_status_id == EVENT_SYNC_FOLDER_ID:
-                        events_alive = folder_status.alive
-
-                email_alive = all(
-                    f["alive"] for f in account_folder_data.values()
-                )
+@app.route("/")
+def index():  # type: ignore[no-untyped-def]  # noqa: ANN201
+    if "namespace_id" in request.args:
+        return _namespace_metrics(request.args["namespace_id"])
 
-                alive = True
-                if account.sync_email and not email_alive:
-                    alive = False
-                if account.sync_events and not events_alive:
-                    alive = False
+    # With caching disabled, build the metrics from scratch every time.
+    metrics_aggregator = (
+        aggregator if aggregator.max_age > 0 else MetricsAggregator(max_age=0)
+    )
+    data, generated_at = metrics_aggregator.get_metrics()
 
-                email_initial_sync = any(
-                    f["state"] == "initial"
-                    for f in account_folder_data.values()
-                )
-                events_initial_sync = any(
-                    c["state"] == "initial" for c in account_calendar_data
-                )
-                initial_sync = email_initial_sync or events_initial_sync
+    filters = {
+        field: request.args[field]
+        for field in FILTERABLE_FIELDS
+        if field in request.args
+    }
+    if filters:
+        data = [
+            metrics
+            for metrics in data
+            if all(metrics[field] == value for field, value in filters.items())
+        ]
 
-                total_uids = sum(
-                    f["remote_uid_count"] or 0
-                    for f in account_folder_data.values()
-                )
-                remaining_uids = sum(
-                    f["download_uid_count"] or 0
-                    for f in account_folder_data.values()
-                )
-                if total_uids:
-                    progress = (
-                        100.0 / total_uids * (total_uids - remaining_uids)
-                    )
-                else:
-                    progress = None
-            else:
-                alive = False
-                email_initial_sync = None
-                events_initial_sync = None
-                initial_sync = None
-                progress = None
-
-            sync_status = account.sync_status
-            is_running = sync_status["state"] == "running"
-            if (
-                is_running
-                and not sync_status.get("sync_start_time")
-                and not sync_status.get("sync_error")
-            ):
-                sync_status_str = "starting"
-            elif is_running and alive:
-                if initial_sync:
-                    sync_status_str = "initial"
-                else:
-                    sync_status_str = "running"
-            elif is_running:
-                # Nylas is syncing, but not all heartbeats are reporting.
-                sync_status_str = "delayed"
-            else:
-                # Nylas is no longer syncing this account.
-                sync_status_str = "dead"
+    response = APIEncoder().jsonify(data)
+    response.headers["X-Metrics-Generated-At"] = str(generated_at)
+    return response
 
-            try:
-                data.append({
-                    "account_private_id": account.id,
-                    "namespace_private_id": account.namespace.id,
-                    "account_id": account.public_id,
-                    "namespace_id": account.namespace.public_id,
-                    "events_alive": events_alive,  # type: ignore[possibly-undefined]
-                    "email_alive": email_alive,  # type: ignore[possibly-undefined]
-                    "alive": alive,
-                    "email_initial_sync": email_initial_sync,
-                    "events_initial_sync": events_initial_sync,
-                    "initial_sync": initial_sync,
-                    "provider_name": account.provider,
-                    "email_address": account.email_address,
-                    "folders": sorted(
-                        folder_data[account.id].values(),
-                        key=itemgetter("name"),
-                    ),
-                    "calendars": sorted(
-                        calendar_data[account.id], key=itemgetter("name")
-                    ),
-                    "sync_email": account.sync_email,
-                    "sync_events": account.sync_events,
-                    "sync_status": sync_status_str,
-                    "sync_error": sync_status.get("sync_error"),
-                    "sync_end_time": sync_status.get("sync_end_time"),
-                    "sync_disabled_reason": sync_status.get(
-                        "sync_disabled_reason"
-                    ),
-                    "sync_host": account.sync_host,
-                    "progress": progress,
-                    "throttled": account.throttled,
-                    "created_at": account.created_at,
-                    "updated_at": account.updated_at,
-                })
-            except Exception:
-                log.exception(
-                    "Error while serializing account metrics",
-                    account_id=account.id,
+
+def _namespace_metrics(namespace_public_id):  # type: ignore[no-untyped-def]
+    with global_session_scope() as db_session:
+        try:
+            namespace = (
+                db_session.query(Namespace)
+                .filter(Namespace.public_id == namespace_public_id)
+                .one()
+            )
+        except NoResultFound:
+            return APIEncoder().jsonify([])
+
+        accounts = list(
+            db_session.query(ImapAccount)
+            .with_polymorphic([GenericAccount])
+            .filter(
+                Account.namespace == namespace  # type: ignore[attr-defined]
+            )
+        )
+
+        folder_data = _get_folder_data(db_session, accounts)
+        calendar_data = _get_calendar_data(db_session, namespace)
+        heartbeat = get_ping_status(account_ids=[acc.id for acc in accounts])
+
+        data = []
+        for account in accounts:
+            account_data = _get_account_data(account)
+            if account_data is None:
+                continue
+            data.append(
+                _get_account_metrics(
+                    account_data,
+                    folder_data[account.id],
+                    calendar_data[account.id],
+                    heartbeat.get(account.id),
                 )
+            )
 
-        return APIEncoder().jsonify(data)
+        response = APIEncoder().jsonify(data)
+        response.headers["X-Metrics-Generated-At"] = str(time.time())
+        return response
 
 
 @app.route("/global-deltas")
@@ -24,6 +24,7 @@ from sqlalchemy.exc import OperationalError  # type: ignore[import-untyped]
 from sqlalchemy.orm import (  # type: ignore[import-untyped]
     joinedload,
     load_only,
+    subqueryload,
 )
 from sqlalchemy.orm.exc import NoResultFound  # type: ignore[import-untyped]
 
@@ -37,6 +38,7 @@ from inbox.api.err import (
     NotFoundError,
     err,
 )
+from inbox.api.etag import conditional_get
 from inbox.api.kellogs import APIEncoder
 from inbox.api.sending import (
     send_draft,
@@ -44,7 +46,13 @@ from inbox.api.sending import (
     send_raw_mime,
     update_draft_on_send,
 )
-from inbox.api.update import update_message, update_thread
+from inbox.api.update import (
+    MAX_BULK_UPDATE_IDS,
+    update_message,
+    update_messages,
+    update_thread,
+    update_threads,
+)
 from inbox.api.validation import (
     ValidatableArgument,
     bounded_str,
@@ -71,10 +79,12 @@ from inbox.api.validation import (
 )
 from inbox.config import config
 from inbox.contacts.algorithms import (
-    calculate_contact_scores,
-    calculate_group_counts,
-    calculate_group_scores,
-    is_stale,
+    contact_scores,
+    fold_contact_scores,
+    fold_group_scores,
+    group_scores,
+    is_current_scores_state,
+    new_scores_state,
 )
 from inbox.crispin import writable_connection_pool
 from inbox.events.ical import generate_rsvp, send_rsvp
@@ -350,6 +360,7 @@ def status():  # type: ignore[no-untyped-def]  # noqa: ANN201
 # Threads
 #
 @app.route("/threads/")
+@conditional_get
 def thread_query_api():  # type: ignore[no-untyped-def]  # noqa: ANN201
     g.parser.add_argument("subject", type=bounded_str, location="args")
     g.parser.add_argument("to", type=bounded_str, location="args")
@@ -464,6 +475,7 @@ def thread_streaming_search_api():  # type: ignore[no-untyped-def]  # noqa: ANN2
 
 
 @app.route("/threads/<public_id>")
+@conditional_get
 def thread_api(public_id):  # type: ignore[no-untyped-def]  # noqa: ANN201
     g.parser.add_argument("view", type=view, location="args")
     args = strict_parse_args(g.parser, request.args)
@@ -518,6 +530,77 @@ def thread_api_update(public_id):  # type: ignore[no-untyped-def]  # noqa: ANN20
     return g.encoder.jsonify(thread)
 
 
+def bulk_update(query, update_records):  # type: ignore[no-untyped-def]  # noqa: ANN201
+    """
+    Apply the update in the request body to the records of `query` whose
+    public ids are listed in its "ids" attribute, and return the status of
+    each of them. The update itself is validated as a whole.
+    """
+    data = request.get_json(force=True)
+    if not isinstance(data, dict):
+        raise InputError("Invalid request body")
+    public_ids = data.pop("ids", None)
+    if not isinstance(public_ids, list) or not public_ids:
+        raise InputError('"ids" must be a non-empty list')
+    if len(public_ids) > MAX_BULK_UPDATE_IDS:
+        raise InputError(
+            f"At most {MAX_BULK_UPDATE_IDS} ids can be updated at once"
+        )
+    for public_id in public_ids:
+        valid_public_id(public_id)
+
+    model = query.column_descriptions[0]["entity"]
+    records = {
+        record.public_id: record
+        for record in query.filter(model.public_id.in_(set(public_ids)))
+    }
+    errors = update_records(
+        list(records.values()),
+        data,
+        g.db_session,
+        g.namespace,
+        g.api_features.optimistic_updates,
+    )
+
+    results = []
+    for public_id in public_ids:
+        record = records.get(public_id)
+        if record is None:
+            results.append({
+                "id": public_id,
+                "status": NotFoundError.status_code,
+                "type": "invalid_request_error",
+                "message": f"Couldn't find {model.__tablename__} {public_id}",
+            })
+        elif record.id in errors:
+            results.append({
+                "id": public_id,
+                "status": InputError.status_code,
+                "type": "invalid_request_error",
+                "message": errors[record.id],
+            })
+        else:
+            results.append({"id": public_id, "status": 200})
+    return g.encoder.jsonify({"results": results})
+
+
+@app.route("/threads/bulk", methods=["PUT", "PATCH"])
+def thread_api_bulk_update():  # type: ignore[no-untyped-def]  # noqa: ANN201
+    query = (
+        g.db_session.query(Thread)
+        .filter(
+            Thread.deleted_at.is_(None),
+            Thread.namespace_id == g.namespace.id,
+        )
+        .options(
+            subqueryload(Thread.messages)  # type: ignore[attr-defined]
+            .subqueryload(Message.messagecategories)  # type: ignore[attr-defined]
+            .joinedload("category")
+        )
+    )
+    return bulk_update(query, update_threads)
+
+
 #
 #  Delete thread
 #
@@ -531,6 +614,7 @@ def thread_api_delete(public_id) -> Never:  # type: ignore[no-untyped-def]
 # Messages
 ##
 @app.route("/messages/")
+@conditional_get
 def message_query_api():  # type: ignore[no-untyped-def]  # noqa: ANN201
     g.parser.add_argument("subject", type=bounded_str, location="args")
     g.parser.add_argument("to", type=bounded_str, location="args")
@@ -647,7 +731,28 @@ def message_streaming_search_api():  # type: ignore[no-untyped-def]  # noqa: ANN
         return err(store_status.http_code, store_status.meaning, **kwargs)
 
 
+def send_stream(  # type: ignore[no-untyped-def]  # noqa: ANN201
+    stream: blockstore.BlockstoreStream, **kwargs
+):
+    """
+    Send a blockstore stream without reading it into memory. Range requests
+    are supported when the length of the stream is known.
+    """
+    response = send_file(
+        stream,  # type: ignore[arg-type]
+        conditional=False,
+        **kwargs,
+    )
+    if stream.length is not None:
+        response.content_length = stream.length
+        response.make_conditional(
+            request, accept_ranges=True, complete_length=stream.length
+        )
+    return response
+
+
 @app.route("/messages/<public_id>", methods=["GET"])
+@conditional_get
 def message_read_api(public_id):  # type: ignore[no-untyped-def]  # noqa: ANN201
     g.parser.add_argument("view", type=view, location="args")
     args = strict_parse_args(g.parser, request.args)
@@ -662,9 +767,9 @@ def message_read_api(public_id):  # type: ignore[no-untyped-def]  # noqa: ANN201
         raise NotFoundError(f"Couldn't find message {public_id}")  # noqa: B904
 
     if request.headers.get("Accept", None) == "message/rfc822":
-        raw_message = blockstore.get_raw_mime(message.data_sha256)
+        raw_message = blockstore.stream_raw_mime(message.data_sha256)
         if raw_message is not None:
-            return Response(raw_message, mimetype="message/rfc822")
+            return send_stream(raw_message, mimetype="message/rfc822")
         else:
             # Try getting the message from the email provider.
             account = g.namespace.account
@@ -756,6 +861,20 @@ def message_update_api(public_id):  # type: ignore[no-untyped-def]  # noqa: ANN2
     return g.encoder.jsonify(message)
 
 
+@app.route("/messages/bulk", methods=["PUT", "PATCH"])
+def message_api_bulk_update():  # type: ignore[no-untyped-def]  # noqa: ANN201
+    query = (
+        g.db_session.query(Message)
+        .filter(Message.namespace_id == g.namespace.id)
+        .options(
+            subqueryload(
+                Message.messagecategories  # type: ignore[attr-defined]
+            ).joinedload("category")
+        )
+    )
+    return bulk_update(query, update_messages)
+
+
 # Folders / Labels
 @app.route("/folders")
 @app.route("/labels")
@@ -1013,6 +1132,7 @@ def folder_label_delete_api(public_id):  # type: ignore[no-untyped-def]  # noqa:
 # Contacts
 ##
 @app.route("/contacts/", methods=["GET"])
+@conditional_get
 def contact_api():  # type: ignore[no-untyped-def]  # noqa: ANN201
     g.parser.add_argument(
         "filter", type=bounded_str, default="", location="args"
@@ -1051,6 +1171,7 @@ def contact_api():  # type: ignore[no-untyped-def]  # noqa: ANN201
 
 
 @app.route("/contacts/<public_id>", methods=["GET"])
+@conditional_get
 def contact_read_api(public_id):  # type: ignore[no-untyped-def]  # noqa: ANN201
     # Get all data for an existing contact.
     valid_public_id(public_id)
@@ -1064,6 +1185,7 @@ def contact_read_api(public_id):  # type: ignore[no-untyped-def]  # noqa: ANN201
 # Events
 ##
 @app.route("/events/", methods=["GET"])
+@conditional_get
 def event_api():  # type: ignore[no-untyped-def]  # noqa: ANN201
     g.parser.add_argument("event_id", type=valid_public_id, location="args")
     g.parser.add_argument("calendar_id", type=valid_public_id, location="args")
@@ -1186,6 +1308,7 @@ def event_create_api():  # type: ignore[no-untyped-def]  # noqa: ANN201
 
 
 @app.route("/events/<public_id>", methods=["GET"])
+@conditional_get
 def event_read_api(public_id):  # type: ignore[no-untyped-def]  # noqa: ANN201
     """Get all data for an existing event."""
     valid_public_id(public_id)
@@ -1601,18 +1724,31 @@ def file_download_api(public_id):  # type: ignore[no-untyped-def]  # noqa: ANN20
             # HACK just append the major part of the content type
             name = "attachment.{}".format(ct.split("/")[0])
 
-    # TODO the part.data object should really behave like a stream we can read
-    # & write to
     try:
         account = g.namespace.account
         statsd_string = f"api.direct_fetching.{account.provider}.{account.id}"
 
-        response = send_file(
-            BytesIO(f.data),
-            mimetype="application/octet-stream",
-            as_attachment=True,
-            download_name=name,
-        )
+        stream = (
+            blockstore.stream_from_blockstore(f.data_sha256)
+            if f.size
+            else None
+        )
+        if stream is not None:
+            response = send_stream(
+                stream,
+                mimetype="application/octet-stream",
+                as_attachment=True,
+                download_name=name,
+            )
+        else:
+            # Not in the blockstore anymore, f.data gets it from the raw
+            # message or from the email provider.
+            response = send_file(
+                BytesIO(f.data),
+                mimetype="application/octet-stream",
+                as_attachment=True,
+                download_name=name,
+            )
         statsd_client.incr(f"{statsd_string}.successes")
 
     except TemporaryEmailFetchException:
@@ -2316,38 +2452,27 @@ def groups_intrinsic():  # type: ignore[no-untyped-def]  # noqa: ANN201
             namespace_id=g.namespace.id
         )
 
-    last_updated = dpcache.contact_groups_last_updated
-    cached_data = dpcache.contact_groups
-
-    use_cached_data = (
-        not (is_stale(last_updated) or cached_data is None)
-        and args["force_recalculate"] is not True
+    state = dpcache.contact_groups
+    recalculate = args["force_recalculate"] is True or not (
+        is_current_scores_state(state)
     )
+    if recalculate:
+        state = new_scores_state()
 
-    if not use_cached_data:
-        last_updated = None
-
+    # Only fold in the messages sent since the scores were last updated.
     messages = filtering.messages_for_contact_scores(
-        g.db_session, g.namespace.id, last_updated
+        g.db_session, g.namespace.id, after_id=state["last_message_id"]
     )
 
-    from_email = g.namespace.email_address
-
-    if use_cached_data:
-        result = cached_data
-        new_guys = calculate_group_counts(messages, from_email)
-        for k, v in new_guys.items():
-            if k in result:
-                result[k] += v
-            else:
-                result[k] = v
-    else:
-        result = calculate_group_scores(messages, from_email)
-        dpcache.contact_groups = result
+    if recalculate or messages:
+        fold_group_scores(state, messages, g.namespace.email_address)
+        dpcache.contact_groups = state
         g.db_session.add(dpcache)
         g.db_session.commit()
 
-    result = sorted(result.items(), key=lambda x: x[1], reverse=True)
+    result = sorted(
+        group_scores(state).items(), key=lambda x: x[1], reverse=True
+    )
     return g.encoder.jsonify(result)
 
 
@@ -2368,34 +2493,25 @@ def contact_rankings():  # type: ignore[no-untyped-def]  # noqa: ANN201
             namespace_id=g.namespace.id
         )
 
-    last_updated = dpcache.contact_rankings_last_updated
-    cached_data = dpcache.contact_rankings
-
-    use_cached_data = (
-        not (is_stale(last_updated) or cached_data is None)
-        and args["force_recalculate"] is not True
+    state = dpcache.contact_rankings
+    recalculate = args["force_recalculate"] is True or not (
+        is_current_scores_state(state)
     )
+    if recalculate:
+        state = new_scores_state()
 
-    if not use_cached_data:
-        last_updated = None
-
+    # Only fold in the messages sent since the scores were last updated.
     messages = filtering.messages_for_contact_scores(
-        g.db_session, g.namespace.id, last_updated
+        g.db_session, g.namespace.id, after_id=state["last_message_id"]
     )
 
-    if use_cached_data:
-        new_guys = calculate_contact_scores(messages, time_dependent=False)
-        result = cached_data
-        for k, v in new_guys.items():
-            if k in result:
-                result[k] += v
-            else:
-                result[k] = v
-    else:
-        result = calculate_contact_scores(messages)
-        dpcache.contact_rankings = result
+    if recalculate or messages:
+        fold_contact_scores(state, messages)
+        dpcache.contact_rankings = state
         g.db_session.add(dpcache)
         g.db_session.commit()
 
-    result = sorted(result.items(), key=lambda x: x[1], reverse=True)
+    result = sorted(
+        contact_scores(state).items(), key=lambda x: x[1], reverse=True
+    )
     return g.encoder.jsonify(result)
@@ -23,6 +23,7 @@ from inbox.models.backends.gmail import GOOGLE_EMAIL_SCOPES, GmailAccount
 from inbox.models.backends.outlook import OutlookAccount
 from inbox.models.secret import SecretType
 from inbox.models.session import global_session_scope
+from inbox.util.call_site import reset_call_site, set_call_site
 from inbox.util.logging_helper import reconfigure_logging
 from inbox.webhooks.google_notifications import app as google_webhooks_api
 from inbox.webhooks.microsoft_notifications import (
@@ -49,6 +50,20 @@ def handle_input_error(error):  # type: ignore[no-untyped-def]  # noqa: ANN201
     return response
 
 
+@app.before_request
+def tag_call_site() -> None:
+    # Unmatched routes (404s) have no endpoint.
+    endpoint = request.endpoint or "unmatched"
+    g.call_site_token = set_call_site(f"api.{endpoint}")
+
+
+@app.teardown_request
+def untag_call_site(exc: BaseException | None) -> None:
+    token = g.pop("call_site_token", None)
+    if token is not None:
+        reset_call_site(token)
+
+
 @app.before_request
 def auth():  # type: ignore[no-untyped-def]  # noqa: ANN201
     """Check for account ID on all non-root URLS"""
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from datetime import datetime
 
 from sqlalchemy.orm.exc import NoResultFound  # type: ignore[import-untyped]
@@ -5,13 +6,16 @@ from sqlalchemy.orm.exc import NoResultFound  # type: ignore[import-untyped]
 from inbox.api.err import InputError
 from inbox.api.validation import valid_public_id
 from inbox.logging import get_logger
-from inbox.models import Category, MessageCategory
-from inbox.models.action_log import schedule_action
+from inbox.models import Category, Message, MessageCategory
+from inbox.models.action_log import schedule_actions
 
 log = get_logger()
 
 # STOPSHIP(emfree): better naming/structure for this module
 
+# Most messages or threads that can be changed by one bulk update.
+MAX_BULK_UPDATE_IDS = 1000
+
 
 def update_message(  # type: ignore[no-untyped-def]
     message, request_data, db_session, optimistic
@@ -80,6 +84,134 @@ def update_thread(  # type: ignore[no-untyped-def]
             )
 
 
+def _parse_bulk_update(  # type: ignore[no-untyped-def]
+    request_data, db_session, namespace
+):
+    unread, starred = parse_flags(request_data)
+    labels = folder = None
+    if namespace.account.provider == "gmail":
+        labels = parse_labels(request_data, db_session, namespace.id)
+    else:
+        folder = parse_folder(request_data, db_session, namespace.id)
+    if request_data:
+        raise InputError(f"Unexpected attribute: {list(request_data)[0]}")
+    return unread, starred, labels, folder
+
+
+def _check_label_changes(  # type: ignore[no-untyped-def]
+    db_session, added_categories, removed_categories
+) -> str | None:
+    try:
+        validate_labels(db_session, added_categories, removed_categories)
+        get_label_names(added_categories, removed_categories)
+    except InputError as e:
+        return e.message
+    return None
+
+
+def update_messages(  # type: ignore[no-untyped-def]
+    messages, request_data, db_session, namespace, optimistic
+) -> dict[int, str]:
+    """
+    Apply the same update to many messages of a namespace, with the same
+    result as calling update_message on each of them, but with the
+    categories looked up once and the actions scheduled in bulk.
+
+    Messages the update can't be applied to are left untouched and returned
+    by id along with the reason.
+    """
+    unread, starred, labels, folder = _parse_bulk_update(
+        request_data, db_session, namespace
+    )
+
+    errors = {}
+    label_changes = []
+    if labels is not None:
+        for message in messages:
+            added_categories = labels - set(message.categories)
+            removed_categories = set(message.categories) - labels
+            error = _check_label_changes(
+                db_session, added_categories, removed_categories
+            )
+            if error:
+                errors[message.id] = error
+            else:
+                label_changes.append((
+                    message,
+                    added_categories,
+                    removed_categories,
+                ))
+        messages = [
+            message for message in messages if message.id not in errors
+        ]
+
+    update_messages_flags(messages, db_session, optimistic, unread, starred)
+    if labels is not None:
+        update_messages_labels(label_changes, db_session, optimistic)
+    elif folder is not None:
+        update_messages_folder(messages, db_session, folder, optimistic)
+
+    return errors
+
+
+def update_threads(  # type: ignore[no-untyped-def]
+    threads, request_data, db_session, namespace, optimistic
+) -> dict[int, str]:
+    """
+    Apply the same update to many threads of a namespace, with the same
+    result as calling update_thread on each of them, but with the
+    categories looked up once and the actions scheduled in bulk.
+
+    Threads the update can't be applied to are left untouched and returned
+    by id along with the reason.
+    """
+    unread, starred, labels, folder = _parse_bulk_update(
+        request_data, db_session, namespace
+    )
+
+    errors = {}
+    label_changes: list[tuple[Message, set[Category], set[Category]]] = []
+    moved_messages: list[Message] = []
+    flagged_messages: list[Message] = []
+    for thread in threads:
+        if labels is not None:
+            new_labels = labels - set(thread.categories)
+            removed_labels = set(thread.categories) - labels
+            error = _check_label_changes(
+                db_session, new_labels, removed_labels
+            )
+            if error:
+                errors[thread.id] = error
+                continue
+            label_changes.extend(
+                (message, new_labels, removed_labels)
+                for message in thread.messages
+                if not message.is_draft
+            )
+        elif folder is not None:
+            # Exclude drafts and sent messages from thread-level moves.
+            moved_messages.extend(
+                message
+                for message in thread.messages
+                if not message.is_draft
+                and not message.is_sent
+                and "sent" not in {c.name for c in message.categories}
+            )
+        flagged_messages.extend(
+            message for message in thread.messages if not message.is_draft
+        )
+
+    if labels is not None:
+        update_messages_labels(label_changes, db_session, optimistic)
+    elif folder is not None:
+        update_messages_folder(moved_messages, db_session, folder, optimistic)
+    update_messages_flags(
+        flagged_messages, db_session, optimistic, unread, starred
+    )
+
+    return errors
+
+
 ## FLAG UPDATES ##
 
 
@@ -97,26 +229,37 @@ def parse_flags(request_data):  # type: ignore[no-untyped-def]  # noqa: ANN201
 def update_message_flags(  # type: ignore[no-untyped-def]
     message, db_session, optimistic, unread=None, starred=None
 ) -> None:
+    update_messages_flags([message], db_session, optimistic, unread, starred)
+
+
+def update_messages_flags(  # type: ignore[no-untyped-def]
+    messages, db_session, optimistic, unread=None, starred=None
+) -> None:
+    if not messages:
+        return
+
     if unread is not None:
         if optimistic:
-            message.is_read = not unread
+            for message in messages:
+                message.is_read = not unread
 
-        schedule_action(
+        schedule_actions(
             "mark_unread",
-            message,
-            message.namespace_id,
+            messages,
+            messages[0].namespace_id,
             db_session,
             unread=unread,
         )
 
     if starred is not None:
         if optimistic:
-            message.is_starred = starred
+            for message in messages:
+                message.is_starred = starred
 
-        schedule_action(
+        schedule_actions(
             "mark_starred",
-            message,
-            message.namespace_id,
+            messages,
+            messages[0].namespace_id,
             db_session,
             starred=starred,
         )
@@ -158,15 +301,25 @@ def parse_folder(  # type: ignore[no-untyped-def]  # noqa: ANN201
 def update_message_folder(  # type: ignore[no-untyped-def]
     message, db_session, category, optimistic
 ) -> None:
+    update_messages_folder([message], db_session, category, optimistic)
+
+
+def update_messages_folder(  # type: ignore[no-untyped-def]
+    messages, db_session, category, optimistic
+) -> None:
+    if not messages:
+        return
+
     # STOPSHIP(emfree): what about sent/inbox duality?
     if optimistic:
-        message.categories = [category]
-        message.categories_changes = True
+        for message in messages:
+            message.categories = [category]
+            message.categories_changes = True
 
-    schedule_action(
+    schedule_actions(
         "move",
-        message,
-        message.namespace_id,
+        messages,
+        messages[0].namespace_id,
         db_session,
         destination=category.display_name,
     )
@@ -198,26 +351,33 @@ def parse_labels(  # type: ignore[no-untyped-def]  # noqa: ANN201
     for id_ in label_public_ids:
         valid_public_id(id_)
 
-    labels = set()
+    categories = {
+        category.public_id: category
+        for category in db_session.query(Category).filter(
+            Category.namespace_id == namespace_id,
+            Category.public_id.in_(set(label_public_ids)),
+        )
+    }
     for id_ in label_public_ids:
-        try:
-            category = (
-                db_session.query(Category)
-                .filter(
-                    Category.namespace_id == namespace_id,
-                    Category.public_id == id_,
-                )
-                .one()
-            )
-            labels.add(category)
-        except NoResultFound:
-            raise InputError(f"The label {id_} does not exist")  # noqa: B904
-    return labels
+        if id_ not in categories:
+            raise InputError(f"The label {id_} does not exist")
+    return set(categories.values())
 
 
 def update_message_labels(  # type: ignore[no-untyped-def]
     message, db_session, added_categories, removed_categories, optimistic
 ) -> None:
+    update_messages_labels(
+        [(message, added_categories, removed_categories)],
+        db_session,
+        optimistic,
+    )
+
+
+def get_label_names(  # type: ignore[no-untyped-def]  # noqa: ANN201
+    added_categories, removed_categories
+):
+    """Get the Gmail label names to add and to remove."""
     special_label_map = {
         "inbox": "\\Inbox",
         "important": "\\Important",
@@ -226,8 +386,6 @@ def update_message_labels(  # type: ignore[no-untyped-def]
         "spam": "\\Spam",
     }
 
-    validate_labels(db_session, added_categories, removed_categories)
-
     added_labels = []
     removed_labels = []
     for category in added_categories:
@@ -246,58 +404,78 @@ def update_message_labels(  # type: ignore[no-untyped-def]
         else:
             removed_labels.append(category.display_name)
 
+    return added_labels, removed_labels
+
+
+def update_messages_labels(  # type: ignore[no-untyped-def]
+    label_changes, db_session, optimistic
+) -> None:
+    """
+    Add and remove labels of messages, given as (message, added categories,
+    removed categories) tuples.
+    """
     # Use a consistent time across creating categories, message updated_at
     # and the subsequent transaction that may be created.
     update_time = datetime.utcnow()
 
-    # Optimistically update message state,
-    # in a manner consistent with Gmail.
-    for category in added_categories:
-        # message.categories.add(cat)
-        # Explicitly create association record so we can control the
-        # created_at value. Taken from
-        # https://docs.sqlalchemy.org/en/13/orm/extensions/
-        # associationproxy.html#simplifying-association-objects
-        MessageCategory(  # type: ignore[call-arg]
-            category=category, message=message, created_at=update_time
+    messages_by_change = defaultdict(list)
+    for message, added_categories, removed_categories in label_changes:
+        validate_labels(db_session, added_categories, removed_categories)
+        added_labels, removed_labels = get_label_names(
+            added_categories, removed_categories
         )
 
-    for category in removed_categories:
-        # Removing '\\All'/ \\Trash'/ '\\Spam' does not do anything on Gmail
-        # i.e. does not move the message to a different folder, so don't
-        # discard the corresponding category yet.
-        # If one of these has been *added* too, apply_gmail_label_rules()
-        # will do the right thing to ensure mutual exclusion.
-        if category.name not in ("all", "trash", "spam"):
-            message.categories.discard(category)
-
-    # Update the message updated_at field so that it can be used in
-    # the transaction that will be created for category changes.
-    # Although no data actually changes for the message
-    # record in MySQL, Nylas expresses category changes as message changes
-    # in transactions. Since we are explicitly setting updated_at we should
-    # be able to assume even if message gets changed later in this
-    # transaction it will still use the time set here which will match the
-    # category change times. This will cause the message row to be updated
-    # even though only the categories may have changed and are stored in
-    # a different table.
-    if removed_categories or added_categories:
-        message.updated_at = update_time
-
-    apply_gmail_label_rules(
-        db_session, message, added_categories, removed_categories
-    )
+        # Optimistically update message state,
+        # in a manner consistent with Gmail.
+        for category in added_categories:
+            # message.categories.add(cat)
+            # Explicitly create association record so we can control the
+            # created_at value. Taken from
+            # https://docs.sqlalchemy.org/en/13/orm/extensions/
+            # associationproxy.html#simplifying-association-objects
+            MessageCategory(  # type: ignore[call-arg]
+                category=category, message=message, created_at=update_time
+            )
+
+        for category in removed_categories:
+            # Removing '\\All'/ \\Trash'/ '\\Spam' does not do anything on
+            # Gmail i.e. does not move the message to a different folder, so
+            # don't discard the corresponding category yet.
+            # If one of these has been *added* too, apply_gmail_label_rules()
+            # will do the right thing to ensure mutual exclusion.
+            if category.name not in ("all", "trash", "spam"):
+                message.categories.discard(category)
+
+        # Update the message updated_at field so that it can be used in
+        # the transaction that will be created for category changes.
+        # Although no data actually changes for the message
+        # record in MySQL, Nylas expresses category changes as message
+        # changes in transactions. Since we are explicitly setting updated_at
+        # we should be able to assume even if message gets changed later in
+        # this transaction it will still use the time set here which will
+        # match the category change times. This will cause the message row
+        # to be updated even though only the categories may have changed and
+        # are stored in a different table.
+        if removed_categories or added_categories:
+            message.updated_at = update_time
+
+        apply_gmail_label_rules(
+            db_session, message, added_categories, removed_categories
+        )
 
-    if removed_labels or added_labels:
-        message.categories_changes = True
+        if removed_labels or added_labels:
+            message.categories_changes = True
+            messages_by_change[
+                (tuple(removed_labels), tuple(added_labels))
+            ].append(message)
 
-    if removed_labels or added_labels:
-        schedule_action(
+    for (removed_labels, added_labels), messages in messages_by_change.items():
+        schedule_actions(
             "change_labels",
-            message,
-            message.namespace_id,
-            removed_labels=removed_labels,
-            added_labels=added_labels,
+            messages,
+            messages[0].namespace_id,
+            removed_labels=list(removed_labels),
+            added_labels=list(added_labels),
             db_session=db_session,
         )
 
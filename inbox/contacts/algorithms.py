@@ -19,6 +19,13 @@ JACCARD_THRESHOLD = 0.35  # probably shouldn't tune this
 SOCIAL_MOLECULE_EXPANSION_LIMIT = 1000  # Don't add too many molecules!
 SOCIAL_MOLECULE_LIMIT = 5000  # Give up if there are too many messages
 
+# For the incrementally maintained scores. Message weights only depend on the
+# message date, so messages are kept as per-day counts and sums of timestamps
+# instead of being reread to recompute the weights.
+SCORES_STATE_VERSION = 1
+SCORE_BUCKET_SECONDS = 86400
+EPOCH = datetime.datetime(1970, 1, 1)
+
 
 ##
 # Helper functions
@@ -31,8 +38,44 @@ def _get_message_weight(now, message_date):  # type: ignore[no-untyped-def]
     return max(weight, MIN_MESSAGE_WEIGHT)
 
 
-def _jaccard_similarity(set1, set2):  # type: ignore[no-untyped-def]
-    return len(set1.intersection(set2)) / float(len(set1.union(set2)))
+def _timestamp(date: datetime.datetime) -> float:
+    return (date - EPOCH).total_seconds()
+
+
+def _add_to_buckets(buckets, message_date) -> None:  # type: ignore[no-untyped-def]
+    timestamp = _timestamp(message_date)
+    bucket = buckets.setdefault(
+        str(int(timestamp // SCORE_BUCKET_SECONDS)), [0, 0.0]
+    )
+    bucket[0] += 1
+    bucket[1] += timestamp
+
+
+def _get_buckets_weight(now, buckets) -> float:  # type: ignore[no-untyped-def]
+    """
+    The sum of the weights (see _get_message_weight) of the messages in
+    `buckets`. Exact, except for the bucket holding the messages that are
+    just reaching MIN_MESSAGE_WEIGHT.
+    """  # noqa: D401
+    now_timestamp = _timestamp(now)
+    # Messages older than this are weighed MIN_MESSAGE_WEIGHT.
+    cutoff = now_timestamp - (1 - MIN_MESSAGE_WEIGHT) * LOOKBACK_TIME
+    weight = 0.0
+    for key, (count, timestamp_sum) in buckets.items():
+        start = int(key) * SCORE_BUCKET_SECONDS
+        if start >= cutoff:
+            weight += (
+                count - (count * now_timestamp - timestamp_sum) / LOOKBACK_TIME
+            )
+        elif start + SCORE_BUCKET_SECONDS <= cutoff:
+            weight += count * MIN_MESSAGE_WEIGHT
+        else:
+            mean_timestamp = timestamp_sum / count
+            weight += count * max(
+                1 - (now_timestamp - mean_timestamp) / LOOKBACK_TIME,
+                MIN_MESSAGE_WEIGHT,
+            )
+    return weight
 
 
 def _get_participants(  # type: ignore[no-untyped-def]
@@ -86,21 +129,6 @@ def calculate_contact_scores(  # type: ignore[no-untyped-def]  # noqa: ANN201
     return res
 
 
-def calculate_group_counts(  # type: ignore[no-untyped-def]  # noqa: ANN201
-    messages, user_email
-):
-    """
-    Strips out most of the logic from calculate_group_scores
-    algorithm and just returns raw counts for each group.
-    """  # noqa: D401
-    res: defaultdict[str, int] = defaultdict(int)
-    for msg in messages:
-        participants = _get_participants(msg, [user_email])
-        if len(participants) >= MIN_GROUP_SIZE:
-            res[", ".join(participants)] += 1
-    return res
-
-
 def calculate_group_scores(  # type: ignore[no-untyped-def]  # noqa: ANN201
     messages, user_email
 ):
@@ -115,32 +143,137 @@ def calculate_group_scores(  # type: ignore[no-untyped-def]  # noqa: ANN201
         date - datetime.datetime object
     """  # noqa: D401, D404
     now = datetime.datetime.now()
-    message_ids_to_scores: dict[str, float] = {}
-    molecules_dict = defaultdict(set)  # (emails, ...) -> {message ids, ...}
+    # (emails, ...) -> weight of the messages sent to exactly these emails
+    group_weights: defaultdict[tuple[str, ...], float] = defaultdict(float)
+    for msg in messages:
+        participants = _get_participants(msg, [user_email])
+        if len(participants) >= MIN_GROUP_SIZE:
+            group_weights[tuple(participants)] += _get_message_weight(
+                now, msg.date
+            )
 
-    def get_message_list_weight(message_ids):  # type: ignore[no-untyped-def]
-        return sum(message_ids_to_scores[m_id] for m_id in message_ids)
+    return _score_molecules(group_weights)
 
-    # Gather initial candidate social molecules
+
+##
+# Incrementally maintained versions of the above. The state is JSON
+# serializable, and new messages are folded into it as they are sent.
+##
+
+
+def new_scores_state():  # type: ignore[no-untyped-def]  # noqa: ANN201
+    return {
+        "version": SCORES_STATE_VERSION,
+        "calculated_at": datetime.datetime.now().isoformat(),
+        "last_message_id": None,
+        "buckets": {},
+    }
+
+
+def is_current_scores_state(state, lifespan: int = 14) -> bool:  # type: ignore[no-untyped-def]
+    """
+    Whether `state` can still have messages folded into it, as opposed to
+    being recalculated from all messages, which is done every `lifespan` days
+    to forget deleted messages.
+    """
+    return (
+        isinstance(state, dict)
+        and state.get("version") == SCORES_STATE_VERSION
+        and not is_stale(
+            datetime.datetime.fromisoformat(state["calculated_at"]), lifespan
+        )
+    )
+
+
+def _fold_message_id(state, message) -> None:  # type: ignore[no-untyped-def]
+    if (
+        state["last_message_id"] is None
+        or message.id > state["last_message_id"]
+    ):
+        state["last_message_id"] = message.id
+
+
+def fold_contact_scores(state, messages) -> None:  # type: ignore[no-untyped-def]
+    buckets = state["buckets"]
+    for message in messages:
+        recipients = message.to_addr + message.cc_addr + message.bcc_addr
+        for _, email in recipients:
+            _add_to_buckets(buckets.setdefault(email, {}), message.date)
+        _fold_message_id(state, message)
+
+
+def contact_scores(state):  # type: ignore[no-untyped-def]  # noqa: ANN201
+    now = datetime.datetime.now()
+    return {
+        email: _get_buckets_weight(now, buckets)
+        for email, buckets in state["buckets"].items()
+    }
+
+
+def fold_group_scores(state, messages, user_email) -> None:  # type: ignore[no-untyped-def]
+    buckets = state["buckets"]
     for msg in messages:
         participants = _get_participants(msg, [user_email])
         if len(participants) >= MIN_GROUP_SIZE:
-            molecules_dict[tuple(participants)].add(msg.id)
-            message_ids_to_scores[msg.id] = _get_message_weight(now, msg.date)
+            _add_to_buckets(
+                buckets.setdefault(", ".join(participants), {}), msg.date
+            )
+        _fold_message_id(state, msg)
+
+
+def group_scores(state):  # type: ignore[no-untyped-def]  # noqa: ANN201
+    now = datetime.datetime.now()
+    return _score_molecules({
+        tuple(emails.split(", ")): _get_buckets_weight(now, buckets)
+        for emails, buckets in state["buckets"].items()
+    })
 
-    if len(molecules_dict) > SOCIAL_MOLECULE_LIMIT:
+
+# Helper functions for calculating group scores.
+#
+# A molecule is a group of emails and the messages it was the recipient of.
+# Each message belongs to exactly one initial molecule, that of its exact
+# recipients, so the messages of any molecule are a union of initial
+# molecules. Both the emails and the messages of a molecule are represented
+# as bitsets, of email indexes and initial molecule indexes respectively.
+
+
+def _score_molecules(group_weights):  # type: ignore[no-untyped-def]
+    """
+    Score the groups of emails that often get messages together, given the
+    weight of the messages sent to each exact group of emails.
+    """
+    if len(group_weights) > SOCIAL_MOLECULE_LIMIT:
         return {}  # Not worth the calculation
 
+    email_bits: dict[str, int] = {}
+    molecule_weights = []
+    molecules: dict[int, int] = {}  # emails -> messages
+    for i, (emails, weight) in enumerate(group_weights.items()):
+        group = 0
+        for email in emails:
+            group |= 1 << email_bits.setdefault(email, len(email_bits))
+        molecules[group] = 1 << i
+        molecule_weights.append(weight)
+
+    def get_message_list_weight(messages: int) -> float:
+        weight = 0.0
+        while messages:
+            lowest = messages & -messages
+            weight += molecule_weights[lowest.bit_length() - 1]
+            messages ^= lowest
+        return weight
+
     # Expand pool of social molecules by taking pairwise intersections.
     # If there are already too many molecules, skip this step.
-    if len(molecules_dict) < SOCIAL_MOLECULE_EXPANSION_LIMIT:
-        _expand_molecule_pool(molecules_dict)
+    if len(molecules) < SOCIAL_MOLECULE_EXPANSION_LIMIT:
+        _expand_molecule_pool(molecules)
 
     # Filter out infrequent molecules
     molecules_list = [
-        (set(emails), set(msgs))
-        for emails, msgs in molecules_dict.items()
-        if get_message_list_weight(msgs) >= MIN_MESSAGE_COUNT
+        (group, messages)
+        for group, messages in molecules.items()
+        if get_message_list_weight(messages) >= MIN_MESSAGE_COUNT
     ]
 
     # Subsets get absorbed by supersets (if minimal info lost)
@@ -151,47 +284,48 @@ def calculate_group_scores(  # type: ignore[no-untyped-def]  # noqa: ANN201
     molecules_list = _combine_similar_molecules(molecules_list)
 
     # Give a score to each group.
+    emails = sorted(email_bits, key=email_bits.__getitem__)
     return {
-        ", ".join(sorted(g)): get_message_list_weight(m)
-        for (g, m) in molecules_list
+        ", ".join(
+            sorted(email for i, email in enumerate(emails) if group >> i & 1)
+        ): get_message_list_weight(messages)
+        for (group, messages) in molecules_list
     }
 
 
-# Helper functions for calculating group scores
-def _expand_molecule_pool(  # type: ignore[no-untyped-def]
-    molecules_dict,
-) -> None:
-    mditems = [(set(g), msgs) for (g, msgs) in molecules_dict.items()]
+def _expand_molecule_pool(molecules) -> None:  # type: ignore[no-untyped-def]
+    mditems = list(molecules.items())
     for i in range(len(mditems)):
         g1, m1 = mditems[i]
         for j in range(i, len(mditems)):
             g2, m2 = mditems[j]
-            new_molecule = tuple(sorted(list(g1.intersection(g2))))
-            if len(new_molecule) >= MIN_GROUP_SIZE:
-                molecules_dict[new_molecule] = (
-                    molecules_dict[new_molecule].union(m1).union(m2)
+            new_molecule = g1 & g2
+            if new_molecule.bit_count() >= MIN_GROUP_SIZE:
+                molecules[new_molecule] = (
+                    molecules.get(new_molecule, 0) | m1 | m2
                 )
 
 
 def _subsume_molecules(  # type: ignore[no-untyped-def]
     molecules_list, get_message_list_weight
 ):
-    molecules_list.sort(key=lambda x: len(x[0]), reverse=True)
+    molecules_list.sort(key=lambda x: x[0].bit_count(), reverse=True)
     is_subsumed = [False] * len(molecules_list)
     mol_weights = [get_message_list_weight(m) for (_, m) in molecules_list]
+    mol_sizes = [g.bit_count() for (g, _) in molecules_list]
 
     for i in range(1, len(molecules_list)):
-        g1, m1 = molecules_list[i]  # Smaller group  # noqa: F841
+        g1 = molecules_list[i][0]  # Smaller group
         m1_size = mol_weights[i]
         for j in range(i):
             if is_subsumed[j]:
                 continue
-            g2, m2 = molecules_list[j]  # Bigger group  # noqa: F841
+            g2 = molecules_list[j][0]  # Bigger group
             m2_size = mol_weights[j]
-            if g1.issubset(g2):
-                sharing_error = ((len(g2) - len(g1)) * (m1_size - m2_size)) / (
-                    1.0 * (len(g2) * m1_size)
-                )
+            if g1 & g2 == g1:
+                sharing_error = (
+                    (mol_sizes[j] - mol_sizes[i]) * (m1_size - m2_size)
+                ) / (1.0 * (mol_sizes[j] * m1_size))
                 if sharing_error < SELF_IDENTITY_THRESHOLD:
                     is_subsumed[i] = True
                     break
@@ -210,9 +344,9 @@ def _combine_similar_molecules(molecules_list):  # type: ignore[no-untyped-def]
                 if combined[i]:
                     continue
                 (g1, m1), (g2, m2) = (molecules_list[i], molecules_list[j])
-                js = _jaccard_similarity(g1, g2)
+                js = (g1 & g2).bit_count() / float((g1 | g2).bit_count())
                 if js > JACCARD_THRESHOLD:
-                    new_guys.append((g1.union(g2), m1.union(m2)))
+                    new_guys.append((g1 | g2, m1 | m2))
                     (combined[i], combined[j]) = (True, True)
                     break
 
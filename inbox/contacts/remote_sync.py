@@ -1,15 +1,16 @@
 import typing
 from collections import Counter
 from datetime import datetime
-from typing import Literal
+from typing import Any, Literal
 
-from sqlalchemy.orm.exc import NoResultFound  # type: ignore[import-untyped]
+import more_itertools
+from sqlalchemy import and_, false, or_  # type: ignore[import-untyped]
 
 from inbox.contacts.abc import AbstractContactsProvider
 from inbox.contacts.google import GoogleContactsProvider
 from inbox.contacts.icloud import ICloudContactsProvider
 from inbox.logging import get_logger
-from inbox.models import Account, Contact
+from inbox.models import Account, Contact, Namespace
 from inbox.models.session import session_scope
 from inbox.sync.base_sync import BaseSyncMonitor
 from inbox.util.debug import bind_context
@@ -24,6 +25,9 @@ CONTACT_SYNC_PROVIDER_MAP = {
 CONTACT_SYNC_FOLDER_ID = -1
 CONTACT_SYNC_FOLDER_NAME = "Contacts"
 
+# Number of remote contacts looked up, applied and committed together.
+CONTACT_SYNC_CHUNK_SIZE = 500
+
 
 class ContactSync(BaseSyncMonitor):
     """
@@ -90,61 +94,19 @@ class ContactSync(BaseSyncMonitor):
                 sync_from_dt=last_sync_dt
             )
 
-            # Do a batch insertion of every 100 contact objects
             change_counter: (  # type: ignore[unreachable]
                 typing.Counter[Literal["deleted", "updated", "added"]]
             ) = Counter()
-            for new_contact in all_contacts:
-                new_contact.namespace = account.namespace
-                assert new_contact.uid is not None, (
-                    "Got remote item with null uid"
+            for contacts_chunk in more_itertools.chunked(
+                all_contacts, CONTACT_SYNC_CHUNK_SIZE
+            ):
+                self._sync_contacts(
+                    db_session,
+                    account.namespace,
+                    contacts_chunk,
+                    change_counter,
                 )
-                assert isinstance(new_contact.uid, str)
-
-                if (
-                    not new_contact.deleted
-                    and db_session.query(Contact)
-                    .filter(
-                        Contact.namespace == account.namespace,
-                        Contact.email_address == new_contact.email_address,
-                        Contact.name == new_contact.name,
-                    )
-                    .first()
-                ):
-                    # Skip creating a new contact if we've already imported one
-                    # (e.g., from mail).
-                    continue
-
-                try:
-                    existing_contact = (
-                        db_session.query(Contact)
-                        .filter(
-                            Contact.namespace == account.namespace,
-                            Contact.provider_name
-                            == self.provider.PROVIDER_NAME,
-                            Contact.uid == new_contact.uid,
-                        )
-                        .one()
-                    )
-
-                    # If the remote item was deleted, purge the corresponding
-                    # database entries.
-                    if new_contact.deleted:
-                        db_session.delete(existing_contact)
-                        change_counter["deleted"] += 1
-                    else:
-                        # Update fields in our old item with the new.
-                        # Don't save the newly returned item to the database.
-                        existing_contact.merge_from(new_contact)
-                        change_counter["updated"] += 1
-
-                except NoResultFound:
-                    # We didn't know about this before! Add this item.
-                    db_session.add(new_contact)
-                    change_counter["added"] += 1
-
-                if sum(change_counter.values()) % 10:
-                    db_session.commit()
+                db_session.commit()
 
         # Update last sync
         with session_scope(  # type: ignore[unreachable]
@@ -159,3 +121,117 @@ class ContactSync(BaseSyncMonitor):
             updated=change_counter["updated"],
             deleted=change_counter["deleted"],
         )
+
+    def _sync_contacts(
+        self,
+        db_session: Any,
+        namespace: Namespace,
+        new_contacts: list[Contact],
+        change_counter: typing.Counter[Literal["deleted", "updated", "added"]],
+    ) -> None:
+        """
+        Add, update or delete a chunk of remote contacts, processing them
+        in order as if each was looked up on its own.
+
+        """
+        for new_contact in new_contacts:
+            new_contact.namespace = namespace
+            assert new_contact.uid is not None, "Got remote item with null uid"
+            assert isinstance(new_contact.uid, str)
+
+        existing_contacts = {
+            contact.uid: contact
+            for contact in db_session.query(Contact).filter(
+                Contact.namespace_id == namespace.id,
+                Contact.provider_name == self.provider.PROVIDER_NAME,
+                Contact.uid.in_({contact.uid for contact in new_contacts}),
+            )
+        }
+
+        # How many contacts of the namespace there are for each name and
+        # address of the chunk, to skip importing contacts we already have.
+        known_contacts = Counter(
+            _name_and_address_key(name, address)
+            for name, address in db_session.query(
+                Contact.name, Contact._canonicalized_address
+            ).filter(
+                Contact.namespace_id == namespace.id,
+                _name_and_address_filter([
+                    contact for contact in new_contacts if not contact.deleted
+                ]),
+            )
+        )
+
+        for new_contact in new_contacts:
+            new_key = _name_and_address_key(
+                new_contact.name,
+                new_contact._canonicalized_address,
+            )
+            if not new_contact.deleted and known_contacts[new_key] > 0:
+                # Skip creating a new contact if we've already imported one
+                # (e.g., from mail).
+                continue
+
+            existing_contact = existing_contacts.get(new_contact.uid)
+            if existing_contact is not None:
+                known_contacts[
+                    _name_and_address_key(
+                        existing_contact.name,
+                        existing_contact._canonicalized_address,
+                    )
+                ] -= 1
+
+                # If the remote item was deleted, purge the corresponding
+                # database entries.
+                if new_contact.deleted:
+                    db_session.delete(existing_contact)
+                    del existing_contacts[new_contact.uid]
+                    change_counter["deleted"] += 1
+                else:
+                    # Update fields in our old item with the new.
+                    # Don't save the newly returned item to the database.
+                    existing_contact.merge_from(new_contact)
+                    known_contacts[
+                        _name_and_address_key(
+                            existing_contact.name,
+                            existing_contact._canonicalized_address,
+                        )
+                    ] += 1
+                    change_counter["updated"] += 1
+            else:
+                # We didn't know about this before! Add this item.
+                db_session.add(new_contact)
+                existing_contacts[new_contact.uid] = new_contact
+                known_contacts[new_key] += 1
+                change_counter["added"] += 1
+
+
+def _name_and_address_key(
+    name: str | None, canonicalized_address: str | None
+) -> tuple[str | None, str | None]:
+    # Names are compared case-insensitively, like the column's collation
+    # does, and addresses in their canonicalized form.
+    return (name.lower() if name is not None else None, canonicalized_address)
+
+
+def _name_and_address_filter(contacts: list[Contact]) -> Any:
+    addresses = {contact._canonicalized_address for contact in contacts}
+    # NULL doesn't match IN, so contacts without an address are looked up by
+    # their name instead.
+    names = {
+        contact.name
+        for contact in contacts
+        if contact._canonicalized_address is None
+    }
+    conditions = [Contact._canonicalized_address.in_(addresses - {None})]
+    if names:
+        conditions.append(
+            and_(
+                Contact._canonicalized_address.is_(None),
+                or_(
+                    Contact.name.in_(names - {None}),
+                    Contact.name.is_(None) if None in names else false(),
+                ),
+            )
+        )
+    return or_(*conditions)
@@ -352,13 +352,18 @@ class CrispinConnectionPool:
 
     def _new_connection(self):  # type: ignore[no-untyped-def]
         conn = self._new_raw_connection()
-        return self.client_cls(
+        client = self.client_cls(
             self.account_id,
             self.provider_info,
             self.email_address,
             conn,
             readonly=self.readonly,
         )
+        if self.readonly:
+            # Only sync connections use QRESYNC. It has to be enabled before
+            # a folder is selected.
+            client.enable_qresync()
+        return client
 
 
 def _exc_callback(exc) -> None:  # type: ignore[no-untyped-def]
@@ -481,6 +486,7 @@ class CrispinClient:
         self._folder_names: defaultdict[str, list[str]] | None = None
         self.conn = conn
         self.readonly = readonly
+        self.qresync_enabled = False
 
     def _fetch_folder_list(self) -> list[tuple[tuple[bytes, ...], bytes, str]]:
         r"""
@@ -869,6 +875,26 @@ class CrispinClient:
         capabilities: tuple[bytes, ...] = self.conn.capabilities()
         return b"CONDSTORE" in capabilities or b"QRESYNC" in capabilities
 
+    def enable_qresync(self) -> bool:
+        """
+        Enable QRESYNC (RFC 7162) on the connection if the server supports
+        it, so that expunged UIDs can be fetched with
+        `qresync_changed_flags`. Must be called before selecting a folder.
+        """
+        interruptible_threading.check_interrupted()
+        capabilities: tuple[bytes, ...] = self.conn.capabilities()
+        if b"QRESYNC" not in capabilities or b"ENABLE" not in capabilities:
+            return False
+
+        try:
+            enabled = self.conn.enable("QRESYNC")
+        except imapclient.IMAPClient.Error:
+            log.warning("Error enabling QRESYNC", exc_info=True)
+            return False
+
+        self.qresync_enabled = b"QRESYNC" in enabled
+        return self.qresync_enabled
+
     def idle_supported(self) -> bool:
         interruptible_threading.check_interrupted()
 
@@ -1298,10 +1324,73 @@ class CrispinClient:
             for uid, ret in data.items()
         }
 
+    def qresync_changed_flags(
+        self, modseq: int
+    ) -> tuple[dict[int, GmailFlags | Flags], list[tuple[int, int]]]:
+        """
+        Fetch flags that changed and UIDs that were expunged since the
+        given modseq, using a single
+        `UID FETCH 1:* (FLAGS) (CHANGEDSINCE modseq VANISHED)` command.
+
+        Requires QRESYNC to be enabled on the connection. Expunged UIDs are
+        returned as inclusive (first, last) ranges since servers are allowed
+        to report UIDs we never saw, which can make the ranges very large.
+
+        See https://datatracker.ietf.org/doc/html/rfc7162#section-3.2.6
+        """
+        assert self.qresync_enabled
+
+        interruptible_threading.check_interrupted()
+        data: dict[int, dict[bytes, Any]] = self.conn.fetch(
+            "1:*",
+            ["FLAGS", "MODSEQ"],
+            modifiers=[f"CHANGEDSINCE {modseq}", "VANISHED"],
+        )
+        # imaplib keeps untagged responses it doesn't know about around,
+        # keyed by their name.
+        vanished: list[bytes] = self.conn._imap.untagged_responses.pop(
+            "VANISHED", []
+        )
+        changed_flags: dict[int, GmailFlags | Flags] = {
+            uid: Flags(
+                ret[b"FLAGS"],
+                (ret[b"MODSEQ"][0] if b"MODSEQ" in ret else None),
+            )
+            for uid, ret in data.items()
+            if b"FLAGS" in ret
+        }
+        return changed_flags, parse_vanished_responses(vanished)
+
+
+def parse_vanished_responses(
+    responses: list[bytes],
+) -> list[tuple[int, int]]:
+    """
+    Parse the data of untagged VANISHED responses, e.g.
+    `(EARLIER) 41,43:116,118`, into a list of inclusive UID ranges.
+    """
+    ranges = []
+    for response in responses:
+        response = response.strip()
+        if response.upper().startswith(b"(EARLIER)"):
+            response = response[len(b"(EARLIER)") :].strip()
+        for item in response.split(b","):
+            if not item:
+                continue
+            first, _, last = item.partition(b":")
+            low, high = sorted((int(first), int(last or first)))
+            ranges.append((low, high))
+    return ranges
+
 
 class GmailCrispinClient(CrispinClient):
     PROVIDER = "gmail"
 
+    def enable_qresync(self) -> bool:
+        # Gmail doesn't support QRESYNC, and flag changes need to include
+        # labels which qresync_changed_flags doesn't fetch.
+        return False
+
     def sync_folders(self) -> list[str]:
         """
         Gmail-specific list of folders to sync.
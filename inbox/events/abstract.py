@@ -1,5 +1,6 @@
 import abc
 import datetime
+from collections.abc import Iterator
 
 from inbox.events.util import CalendarSyncResponse
 from inbox.logging import get_logger
@@ -55,6 +56,51 @@ class AbstractEventsProvider(abc.ABC):
         """
         raise NotImplementedError()
 
+    def sync_event_pages(
+        self,
+        calendar_uid: str,
+        sync_from_time: datetime.datetime | None = None,
+    ) -> Iterator[list[Event]]:
+        """
+        Fetch event data for an individual calendar in pages, so that each
+        page can be persisted before the next one is fetched.
+
+        Providers that don't page their results return a single page.
+
+        Arguments:
+                calendar_uid: the calendar identifier
+                sync_from_time: Only sync events which have been added or
+                    changed since this time.
+
+        Returns:
+            An iterator of lists of uncommited Event instances
+
+        """
+        yield self.sync_events(calendar_uid, sync_from_time)
+
+    def get_resumed_listing_start(
+        self,
+        calendar_uid: str,
+        sync_from_time: datetime.datetime | None = None,
+    ) -> datetime.datetime | None:
+        """
+        Get the start time of an interrupted listing of event pages that the
+        next call to sync_event_pages() resumes.
+
+        The resumed listing skips the pages handled before it was
+        interrupted, so changes made to their events since then are only
+        picked up if the calendar is synced from no later than this time.
+
+        Arguments:
+                calendar_uid: the calendar identifier
+                sync_from_time: the time the listing syncs events from
+
+        Returns:
+            The start time, or None if the next listing starts over
+
+        """
+        return None
+
     @abc.abstractmethod
     def webhook_notifications_enabled(self, account: Account) -> bool:
         """
@@ -2,11 +2,13 @@
 
 import datetime
 import email.utils
+import itertools
 import json
 import random
 import time
 import urllib.parse
 import uuid
+from collections.abc import Iterator
 from typing import Any
 
 import arrow  # type: ignore[import-untyped]
@@ -28,6 +30,7 @@ from inbox.models import Account, Calendar
 from inbox.models.backends.oauth import token_manager
 from inbox.models.event import EVENT_STATUSES, Event
 from inbox.util.concurrency import iterate_and_periodically_check_interrupted
+from inbox.util.http import get_session
 
 CALENDARS_URL = "https://www.googleapis.com/calendar/v3/users/me/calendarList"
 STATUS_MAP = {
@@ -44,6 +47,8 @@ WEBHOOK_ENABLED_CLIENT_IDS = config.get("WEBHOOK_ENABLED_CLIENT_IDS", [])
 CALENDAR_LIST_WEBHOOK_URL = URL_PREFIX + "/w/calendar_list_update/{}"
 EVENTS_LIST_WEBHOOK_URL = URL_PREFIX + "/w/calendar_update/{}"
 
+EVENTS_URL = "https://www.googleapis.com/calendar/v3/calendars/{}/events"
+
 WATCH_CALENDARS_URL = CALENDARS_URL + "/watch"
 WATCH_EVENTS_URL = (
     "https://www.googleapis.com/calendar/v3/calendars/{}/events/watch"
@@ -73,6 +78,14 @@ class GoogleEventsProvider(AbstractEventsProvider):
 
         return CalendarSyncResponse(deletes, updates)
 
+    def __init__(self, account_id: int, namespace_id: int) -> None:
+        super().__init__(account_id, namespace_id)
+        # Page tokens to resume interrupted listings from, and the times the
+        # listings started, keyed by the URL and parameters of the listing.
+        self._resume_page_tokens: dict[
+            tuple[str, str], tuple[str, datetime.datetime]
+        ] = {}
+
     def sync_events(
         self,
         calendar_uid: str,
@@ -95,33 +108,79 @@ class GoogleEventsProvider(AbstractEventsProvider):
             A list of uncommited Event instances
 
         """
-        updates = []
-        raw_events = self._get_raw_events(calendar_uid, sync_from_time)
+        return list(
+            itertools.chain.from_iterable(
+                self.sync_event_pages(calendar_uid, sync_from_time)
+            )
+        )
+
+    def sync_event_pages(
+        self,
+        calendar_uid: str,
+        sync_from_time: datetime.datetime | None = None,
+    ) -> Iterator[list[Event]]:
+        """
+        Fetch event data for an individual calendar, one API page at a time.
+
+        The next page is only fetched once the caller is done with the
+        previous one. If the listing fails part way, the next listing of the
+        same calendar from the same time resumes from the page the caller
+        didn't get to handle.
+        """
         read_only_calendar = self.calendars_table.get(calendar_uid, True)
-        for raw_event in iterate_and_periodically_check_interrupted(
-            raw_events
+        for raw_events in self._get_raw_event_pages(
+            calendar_uid, sync_from_time
         ):
-            try:
-                parsed = parse_event_response(raw_event, read_only_calendar)
-                updates.append(parsed)
-            except (arrow.parser.ParserError, ValueError):
-                self.log.warning(
-                    "Skipping unparseable event", exc_info=True, raw=raw_event
-                )
+            updates = []
+            for raw_event in iterate_and_periodically_check_interrupted(
+                raw_events
+            ):
+                try:
+                    parsed = parse_event_response(
+                        raw_event, read_only_calendar
+                    )
+                    updates.append(parsed)
+                except (arrow.parser.ParserError, ValueError):
+                    self.log.warning(
+                        "Skipping unparseable event",
+                        exc_info=True,
+                        raw=raw_event,
+                    )
+            yield updates
 
-        return updates
+    def get_resumed_listing_start(
+        self,
+        calendar_uid: str,
+        sync_from_time: datetime.datetime | None = None,
+    ) -> datetime.datetime | None:
+        """
+        Get the time the interrupted listing that the next listing of the
+        calendar from the given time resumes was started, if there is one.
+        """
+        url = EVENTS_URL.format(urllib.parse.quote(calendar_uid))
+        # The listing of all events is resumed if the listing of changed
+        # events gets a 410 again.
+        listing_starts = [
+            self._resume_page_tokens[resume_key][1]
+            for resume_key in (
+                _resume_key(url, _event_list_params(sync_from_time)),
+                _resume_key(url, {}),
+            )
+            if resume_key in self._resume_page_tokens
+        ]
+        return min(listing_starts, default=None)
 
     def _get_raw_calendars(self) -> list[dict[str, Any]]:
         """Gets raw data for the user's calendars."""  # noqa: D401
         return self._get_resource_list(CALENDARS_URL)
 
-    def _get_raw_events(
+    def _get_raw_event_pages(
         self,
         calendar_uid: str,
         sync_from_time: datetime.datetime | None = None,
-    ) -> list[dict[str, Any]]:
+    ) -> Iterator[list[dict[str, Any]]]:
         """
-        Gets raw event data for the given calendar.
+        Gets raw event data for the given calendar, page by page.
 
         Parameters
         ----------
@@ -133,23 +192,13 @@ class GoogleEventsProvider(AbstractEventsProvider):
 
         Returns
         -------
-        list of dictionaries representing JSON.
+        iterator of lists of dictionaries representing JSON.
 
         """  # noqa: D401
-        if sync_from_time is not None:
-            # Note explicit offset is required by Google calendar API.
-            sync_from_time_str = (
-                datetime.datetime.isoformat(sync_from_time) + "Z"
-            )
-        else:
-            sync_from_time_str = None
-
-        url = "https://www.googleapis.com/calendar/v3/calendars/{}/events".format(
-            urllib.parse.quote(calendar_uid)
-        )
+        url = EVENTS_URL.format(urllib.parse.quote(calendar_uid))
         try:
-            return self._get_resource_list(
-                url, updatedMin=sync_from_time_str, eventTypes="default"
+            yield from self._get_resource_pages(
+                url, **_event_list_params(sync_from_time)
             )
         except requests.exceptions.HTTPError as exc:
             assert exc.response is not None  # noqa: PT017
@@ -157,7 +206,7 @@ class GoogleEventsProvider(AbstractEventsProvider):
                 # The calendar API may return 410 if you pass a value for
                 # updatedMin that's too far in the past. In that case, refetch
                 # all events.
-                return self._get_resource_list(url)
+                yield from self._get_resource_pages(url)
             else:
                 raise
 
@@ -165,32 +214,42 @@ class GoogleEventsProvider(AbstractEventsProvider):
         self, url: str, **params
     ) -> list[dict[str, Any]]:
         """Handles response pagination."""  # noqa: D401
+        return list(
+            itertools.chain.from_iterable(
+                self._get_resource_pages(url, **params)
+            )
+        )
+
+    def _get_resource_pages(  # type: ignore[no-untyped-def]
+        self, url: str, **params
+    ) -> Iterator[list[dict[str, Any]]]:
+        """Yields the items of each page of a paginated resource."""  # noqa: D401
         token = self._get_access_token()
-        items = []
-        next_page_token: str | None = None
         params["showDeleted"] = True
+        resume_key = _resume_key(url, params)
+        next_page_token: str | None = None
+        listing_started_at = datetime.datetime.utcnow()
+        resuming = resume_key in self._resume_page_tokens
+        if resuming:
+            self.log.info("Resuming interrupted listing", url=url)
+            next_page_token, listing_started_at = self._resume_page_tokens[
+                resume_key
+            ]
         while True:
             if next_page_token is not None:
                 params["pageToken"] = next_page_token
+                # The caller handled every page before this one.
+                self._resume_page_tokens[resume_key] = (
+                    next_page_token,
+                    listing_started_at,
+                )
             try:
-                r = requests.get(
+                # Connection errors and server errors were already retried
+                # by the session.
+                r = get_session("google").get(
                     url, params=params, auth=OAuthRequestsWrapper(token)
                 )
                 r.raise_for_status()
-                data = r.json()
-                items += data["items"]
-                next_page_token = data.get("nextPageToken")
-                if next_page_token is None:
-                    return items
-
-            except requests.exceptions.SSLError:
-                self.log.warning(
-                    "SSLError making Google Calendar API request, retrying.",
-                    url=url,
-                    exc_info=True,
-                )
-                time.sleep(30 + random.randrange(0, 60))
-                continue
             except requests.HTTPError as e:
                 self.log.warning(
                     "HTTP error making Google Calendar API request",
@@ -207,12 +266,18 @@ class GoogleEventsProvider(AbstractEventsProvider):
                     )
                     token = self._get_access_token(force_refresh=True)
                     continue
-                elif r.status_code in (  # type: ignore[possibly-undefined]
-                    500,
-                    503,
+                elif resuming and r.status_code in (  # type: ignore[possibly-undefined]
+                    400,
+                    410,
                 ):
-                    self.log.warning("Backend error in calendar API; retrying")
-                    time.sleep(30 + random.randrange(0, 60))
+                    self.log.warning(
+                        "Can't resume listing; starting over", url=url
+                    )
+                    del self._resume_page_tokens[resume_key]
+                    del params["pageToken"]
+                    next_page_token = None
+                    listing_started_at = datetime.datetime.utcnow()
+                    resuming = False
                     continue
                 elif r.status_code == 403:  # type: ignore[possibly-undefined]
                     try:
@@ -243,6 +308,14 @@ class GoogleEventsProvider(AbstractEventsProvider):
                 # Unexpected error; raise.
                 raise
 
+            resuming = False
+            data = r.json()
+            next_page_token = data.get("nextPageToken")
+            yield data["items"]
+            if next_page_token is None:
+                self._resume_page_tokens.pop(resume_key, None)
+                return
+
     def _make_event_request(  # type: ignore[no-untyped-def]
         self,
         method: str,
@@ -256,7 +329,7 @@ class GoogleEventsProvider(AbstractEventsProvider):
             urllib.parse.quote(calendar_uid), urllib.parse.quote(event_uid)
         )
         token = self._get_access_token()
-        response = requests.request(
+        response = get_session("google").request(
             method, url, auth=OAuthRequestsWrapper(token), **kwargs
         )
         return response
@@ -373,7 +446,7 @@ class GoogleEventsProvider(AbstractEventsProvider):
             "expiration": expiration_date,
         }
         headers = {"content-type": "application/json"}
-        r = requests.post(
+        r = get_session("google").post(
             WATCH_CALENDARS_URL,
             data=json.dumps(data),
             headers=headers,
@@ -431,7 +504,7 @@ class GoogleEventsProvider(AbstractEventsProvider):
         }
         headers = {"content-type": "application/json"}
         try:
-            r = requests.post(
+            r = get_session("google").post(
                 watch_url,
                 data=json.dumps(data),
                 headers=headers,
@@ -524,6 +597,21 @@ class GoogleEventsProvider(AbstractEventsProvider):
             )
 
 
+def _event_list_params(
+    sync_from_time: datetime.datetime | None,
+) -> dict[str, Any]:
+    if sync_from_time is not None:
+        # Note explicit offset is required by Google calendar API.
+        sync_from_time_str = datetime.datetime.isoformat(sync_from_time) + "Z"
+    else:
+        sync_from_time_str = None
+    return {"updatedMin": sync_from_time_str, "eventTypes": "default"}
+
+
+def _resume_key(url: str, params: dict[str, Any]) -> tuple[str, str]:
+    return (url, json.dumps({**params, "showDeleted": True}, sort_keys=True))
+
+
 def parse_calendar_response(  # noqa: D417
     calendar: dict[str, Any],
 ) -> Calendar:
@@ -1,3 +1,5 @@
+import concurrent.futures
+import contextvars
 import datetime
 from collections.abc import Iterable
 from typing import cast
@@ -44,6 +46,11 @@ EVENTS_LIST_WEBHOOK_URL = URL_PREFIX + "/w/microsoft/calendar_update/{}"
 # for exceptions and cancellations we need to establish a limit.
 MAX_RECURRING_EVENT_WINDOW = datetime.timedelta(days=365)
 
+# How many recurring events to fetch instances of at the same time.
+INSTANCE_FETCH_CONCURRENCY = config.get(
+    "MICROSOFT_INSTANCE_FETCH_CONCURRENCY", 4
+)
+
 
 EVENT_FIELDS = [
     "id",
@@ -135,7 +142,8 @@ class MicrosoftEventsProvider(AbstractEventsProvider):
             # we attach timezone here.
             sync_from_time = sync_from_time.replace(tzinfo=pytz.UTC)
 
-        updates = []
+        updates: list[Event] = []
+        masters = []
         raw_events = cast(
             Iterable[MsGraphEvent],
             self.client.iter_events(
@@ -153,19 +161,116 @@ class MicrosoftEventsProvider(AbstractEventsProvider):
                 continue
 
             event = parse_event(raw_event, read_only=read_only)
+            if isinstance(event, RecurringEvent):
+                masters.append((raw_event, event))
+            else:
+                updates.append(event)
+
+        changed_masters = self._get_changed_masters(calendar_uid, masters)
+        self.log.info(
+            "Getting overrides for changed recurring events",
+            recurring_event_count=len(masters),
+            changed_count=len(changed_masters),
+        )
+        overrides = self._get_events_overrides(
+            changed_masters, read_only=read_only
+        )
+
+        # Overrides go before their master. Updates are committed in order,
+        # so a master that is stored with its latest modification time
+        # always has its overrides stored, which _get_changed_masters
+        # relies on.
+        for _, event in masters:
+            if event.uid in overrides:
+                (exceptions, cancellations) = overrides[event.uid]
+                updates.extend(exceptions)  # type: ignore[arg-type]
+                updates.extend(cancellations)  # type: ignore[arg-type]
             updates.append(event)
 
-            if isinstance(event, RecurringEvent):
-                (exceptions, cancellations) = self._get_event_overrides(
+        return updates
+
+    def _get_changed_masters(
+        self,
+        calendar_uid: str,
+        masters: list[tuple[MsGraphEvent, RecurringEvent]],
+    ) -> list[tuple[MsGraphEvent, RecurringEvent]]:
+        """
+        Filter out recurring events that didn't change since we stored them.
+
+        Changing or cancelling an instance of a series changes the series
+        master, so the exceptions and cancellations of an unchanged master
+        are the ones we already have.
+
+        Arguments:
+            calendar_uid: the calendar identifier
+            masters: Recurring master events as returned by the API and parsed
+
+        Returns:
+            The recurring master events that changed
+
+        """
+        if not masters:
+            return []
+
+        with session_scope(self.namespace_id) as db_session:
+            stored_last_modified = dict(
+                db_session.query(
+                    RecurringEvent.uid, RecurringEvent.last_modified
+                )
+                .join(Calendar, RecurringEvent.calendar_id == Calendar.id)
+                .filter(
+                    RecurringEvent.namespace_id == self.namespace_id,
+                    Calendar.uid == calendar_uid,
+                    RecurringEvent.uid.in_([
+                        event.uid for _, event in masters
+                    ]),
+                )
+            )
+
+        return [
+            (raw_event, event)
+            for raw_event, event in masters
+            if stored_last_modified.get(event.uid) is None
+            or stored_last_modified[event.uid] != event.last_modified
+        ]
+
+    def _get_events_overrides(
+        self,
+        masters: list[tuple[MsGraphEvent, RecurringEvent]],
+        *,
+        read_only: bool,
+    ) -> dict[str, tuple[list[MsGraphEvent], list[MsGraphEvent]]]:
+        """
+        Fetch exceptions and cancellations of several recurring events,
+        INSTANCE_FETCH_CONCURRENCY at a time.
+
+        Arguments:
+            masters: Recurring master events as returned by the API and parsed
+            read_only: Do master events come from a read-only calendar
+
+        Returns:
+            Exceptions and cancellations by master event uid
+
+        """
+        if not masters:
+            return {}
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(INSTANCE_FETCH_CONCURRENCY, len(masters))
+        ) as executor:
+            futures = {
+                event.uid: executor.submit(
+                    contextvars.copy_context().run,
+                    self._get_event_overrides,
                     raw_event,
                     event,
                     ms_graph_event_id=raw_event["id"],
                     read_only=read_only,
                 )
-                updates.extend(exceptions)  # type: ignore[arg-type]
-                updates.extend(cancellations)  # type: ignore[arg-type]
+                for raw_event, event in masters
+            }
 
-        return updates
+            return {uid: future.result() for uid, future in futures.items()}
 
     def _get_event_overrides(
         self,
@@ -1,6 +1,7 @@
 import contextlib
 import datetime
 import enum
+import threading
 import time
 from collections.abc import Callable, Container, Iterable
 from typing import Any
@@ -69,6 +70,10 @@ class MicrosoftGraphClient:
         # lowering the number of TCP connections needed
         # to make many requests
         self._session = requests.Session()
+        # Requests made from several threads back off together, since
+        # Microsoft throttles per user and app rather than per request.
+        self._backoff_lock = threading.Lock()
+        self._backoff_until = 0.0
 
     def request(
         self,
@@ -84,7 +89,8 @@ class MicrosoftGraphClient:
         """
         Perform request.
 
-        Automatically recover from 429 Too Many Requests.
+        Automatically recover from 429 Too Many Requests. Other requests
+        made with this client wait out the Retry-After too.
 
         Arguments:
             method: HTTP method
@@ -102,6 +108,8 @@ class MicrosoftGraphClient:
 
         headers = {"Authorization": "Bearer " + self._get_token()}
 
+        self._wait_for_backoff()
+
         retry = 0
         while retry < max_retries:
             response = self._session.request(
@@ -114,6 +122,10 @@ class MicrosoftGraphClient:
             )
             if response.status_code in retry_on:
                 sleep_seconds = int(response.headers.get("Retry-After", 5))
+                with self._backoff_lock:
+                    self._backoff_until = max(
+                        self._backoff_until, time.monotonic() + sleep_seconds
+                    )
                 time.sleep(sleep_seconds)
                 retry += 1
                 continue
@@ -132,6 +144,12 @@ class MicrosoftGraphClient:
         else:
             return response.json()
 
+    def _wait_for_backoff(self) -> None:
+        with self._backoff_lock:
+            wait_seconds = self._backoff_until - time.monotonic()
+        if wait_seconds > 0:
+            time.sleep(wait_seconds)
+
     def _iter(
         self, initial_url: str, *, params: dict[str, str] | None = None
     ) -> Iterable[dict[str, Any]]:
@@ -73,6 +73,67 @@ def link_master(db_session, event):  # type: ignore[no-untyped-def]  # noqa: ANN
     return event.master  # This may be None.
 
 
+def link_events_in_bulk(  # type: ignore[no-untyped-def]
+    db_session, namespace_id: int, calendar_id: int, events
+) -> None:
+    # Same as calling link_events on each of `events`, which must already be
+    # flushed to the given calendar, but with one query to find the masters
+    # of all the overrides and one to find the overrides of all the masters.
+    # uids are compared case-insensitively, like their columns' collation.
+    masters = {
+        (event.uid.lower(), event.source): event
+        for event in events
+        if isinstance(event, RecurringEvent)
+    }
+    orphans = [
+        event
+        for event in events
+        if isinstance(event, RecurringEventOverride)
+        and not event.master
+        and event.master_event_uid
+    ]
+
+    if orphans:
+        known_masters: dict[tuple[str, str], RecurringEvent] = {}
+        for master in (
+            db_session.query(RecurringEvent)
+            .filter(
+                RecurringEvent.namespace_id == namespace_id,
+                RecurringEvent.calendar_id == calendar_id,
+                RecurringEvent.uid.in_({
+                    event.master_event_uid for event in orphans
+                }),
+            )
+            .order_by(RecurringEvent.id)
+        ):
+            known_masters.setdefault(
+                (master.uid.lower(), master.source), master
+            )
+        for event in orphans:
+            master = known_masters.get((
+                event.master_event_uid.lower(),
+                event.source,
+            ))
+            if master:
+                event.master = master
+
+    if masters:
+        for override in db_session.query(RecurringEventOverride).filter(
+            RecurringEventOverride.namespace_id == namespace_id,
+            RecurringEventOverride.calendar_id == calendar_id,
+            RecurringEventOverride.master_event_uid.in_({
+                uid for uid, _ in masters
+            }),
+        ):
+            if not override.master:
+                master = masters.get((
+                    override.master_event_uid.lower(),
+                    override.source,
+                ))
+                if master:
+                    override.master = master
+
+
 def parse_rrule(event):  # type: ignore[no-untyped-def]  # noqa: ANN201
     # Parse the RRULE string and return a dateutil.rrule.rrule object
     if event.rrule is not None:
@@ -8,13 +8,13 @@ from inbox.config import config
 from inbox.contacts.processing import update_contacts_from_event
 from inbox.events.abstract import AbstractEventsProvider, CalendarGoneException
 from inbox.events.google import URL_PREFIX
-from inbox.events.recurring import link_events
+from inbox.events.recurring import link_events_in_bulk
 from inbox.exceptions import AccessNotEnabledError, OAuthError
 from inbox.logging import get_logger
 from inbox.models import Calendar, Event
 from inbox.models.account import Account
 from inbox.models.calendar import is_default_calendar
-from inbox.models.event import RecurringEvent, RecurringEventOverride
+from inbox.models.event import RecurringEvent
 from inbox.models.session import session_scope
 from inbox.sync.base_sync import BaseSyncMonitor
 from inbox.util.debug import bind_context
@@ -35,6 +35,9 @@ PUSH_NOTIFICATION_POLL_FREQUENCY = 10
 # push notification.
 MAX_TIME_WITHOUT_SYNC = timedelta(seconds=3600)
 
+# Number of event updates looked up, applied and committed together.
+EVENT_UPDATES_CHUNK_SIZE = 100
+
 
 class EventSync(BaseSyncMonitor):
     """Per-account event sync engine."""
@@ -100,15 +103,25 @@ class EventSync(BaseSyncMonitor):
                     .filter(Calendar.id == id_)
                     .scalar()
                 )
-
-            event_changes = self.provider.sync_events(
-                uid, sync_from_time=last_sync
+            # A resumed listing doesn't fetch the pages the interrupted one
+            # handled, so don't move past when the interrupted one started.
+            sync_timestamp = (
+                self.provider.get_resumed_listing_start(uid, last_sync)
+                or sync_timestamp
             )
 
             with session_scope(self.namespace_id) as db_session:
-                handle_event_updates(
-                    self.namespace_id, id_, event_changes, self.log, db_session
-                )
+                # Each page is committed before the next one is fetched.
+                for event_changes in self.provider.sync_event_pages(
+                    uid, sync_from_time=last_sync
+                ):
+                    handle_event_updates(
+                        self.namespace_id,
+                        id_,
+                        event_changes,
+                        self.log,
+                        db_session,
+                    )
                 cal = db_session.query(Calendar).get(id_)
                 cal.last_synced = sync_timestamp
                 db_session.commit()
@@ -190,32 +203,54 @@ def handle_event_updates(
     """Persists new or updated Event objects to the database."""  # noqa: D401
     added_count = 0
     updated_count = 0
-    existing_event_query = (
-        db_session.query(Event)
-        .filter(
-            Event.namespace_id == namespace_id,
-            Event.calendar_id == calendar_id,
+    for events_chunk in more_itertools.chunked(
+        events, EVENT_UPDATES_CHUNK_SIZE
+    ):
+        added, updated = _upsert_events(
+            namespace_id, calendar_id, events_chunk, db_session
         )
-        .exists()
+        added_count += added
+        updated_count += updated
+
+        # Commit every chunk to avoid long transactions that may lock
+        # calendar rows.
+        db_session.commit()
+
+    log.info(
+        "synced added and updated events",
+        calendar_id=calendar_id,
+        added=added_count,
+        updated=updated_count,
     )
-    events_exist = db_session.query(existing_event_query).scalar()
+
+
+def _upsert_events(
+    namespace_id: int,
+    calendar_id: int,
+    events: list[Event],
+    db_session: Any,
+) -> tuple[int, int]:
+    added_count = 0
+    updated_count = 0
     for event in events:
         assert event.uid is not None, "Got remote item with null uid"
 
-        local_event = None
-        if events_exist:
-            # Skip this lookup if there are no local events at all, for faster
-            # first sync.
-            local_event = (
-                db_session.query(Event)
-                .filter(
-                    Event.namespace_id == namespace_id,
-                    Event.calendar_id == calendar_id,
-                    Event.uid == event.uid,
-                )
-                .first()
-            )
+    # uids are compared case-insensitively, like the column's collation.
+    local_events_by_uid: dict[str, Event] = {}
+    for local_event in (
+        db_session.query(Event)
+        .filter(
+            Event.namespace_id == namespace_id,
+            Event.calendar_id == calendar_id,
+            Event.uid.in_({event.uid for event in events}),
+        )
+        .order_by(Event.id)
+    ):
+        local_events_by_uid.setdefault(local_event.uid.lower(), local_event)
 
+    local_events = []
+    for event in events:
+        local_event = local_events_by_uid.get(event.uid.lower())
         if local_event is not None:
             # We also need to mark all overrides as cancelled if we're
             # cancelling a recurring event. However, note the original event
@@ -237,27 +272,24 @@ def handle_event_updates(
             local_event.namespace_id = namespace_id
             local_event.calendar_id = calendar_id
             db_session.add(local_event)
+            # Later updates to the same uid in this chunk apply to this
+            # event, as they would after a lookup.
+            local_events_by_uid[event.uid.lower()] = local_event
             added_count += 1
 
-        db_session.flush()
+        if local_event not in local_events:
+            local_events.append(local_event)
 
-        update_contacts_from_event(db_session, local_event, namespace_id)
+    db_session.flush()
 
-        # If we just updated/added a recurring event or override, make sure
-        # we link it to the right master event.
-        if isinstance(event, RecurringEvent | RecurringEventOverride):
-            link_events(db_session, event)
+    for local_event in local_events:
+        update_contacts_from_event(db_session, local_event, namespace_id)
 
-        # Batch commits to avoid long transactions that may lock calendar rows.
-        if (added_count + updated_count) % 10 == 0:
-            db_session.commit()
+    # Make sure recurring events and overrides we just updated/added are
+    # linked to the right master event.
+    link_events_in_bulk(db_session, namespace_id, calendar_id, local_events)
 
-    log.info(
-        "synced added and updated events",
-        calendar_id=calendar_id,
-        added=added_count,
-        updated=updated_count,
-    )
+    return added_count, updated_count
 
 
 class WebhookEventSync(EventSync):
@@ -419,14 +451,26 @@ class WebhookEventSync(EventSync):
         db_session.commit()
 
     def _sync_calendar(self, calendar: Calendar, db_session: Any) -> None:
-        sync_timestamp = datetime.utcnow()
-        event_changes = self.provider.sync_events(
-            calendar.uid, sync_from_time=calendar.last_synced
-        )
-
-        handle_event_updates(
-            self.namespace_id, calendar.id, event_changes, self.log, db_session
+        # A resumed listing doesn't fetch the pages the interrupted one
+        # handled, so the calendar is synced no later than from when the
+        # interrupted listing started.
+        sync_timestamp = (
+            self.provider.get_resumed_listing_start(
+                calendar.uid, calendar.last_synced
+            )
+            or datetime.utcnow()
         )
+        # Each page is committed before the next one is fetched.
+        for event_changes in self.provider.sync_event_pages(
+            calendar.uid, sync_from_time=calendar.last_synced
+        ):
+            handle_event_updates(
+                self.namespace_id,
+                calendar.id,
+                event_changes,
+                self.log,
+                db_session,
+            )
         calendar.last_synced = sync_timestamp
         db_session.commit()
 
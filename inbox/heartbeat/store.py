@@ -1,16 +1,25 @@
 import itertools
+import threading
 import time
 
 # We're doing this weird rename import to make it easier to monkeypatch
 # get_redis_client. That's the only way we have to test our very brittle
 # status code.
 import inbox.heartbeat.config as heartbeat_config
-from inbox.heartbeat.config import CONTACTS_FOLDER_ID, EVENTS_FOLDER_ID
+from inbox.heartbeat.config import (
+    ALIVE_EXPIRY,
+    CONTACTS_FOLDER_ID,
+    EVENTS_FOLDER_ID,
+)
 from inbox.logging import get_logger
 from inbox.util.itert import chunk
 
 log = get_logger()
 
+# Per-account hash of the recent CPU usage (fraction of a core) of each of
+# its folder syncs.
+CPU_USAGE_KEY = "cpu:{}"
+
 
 def safe_failure(f):  # type: ignore[no-untyped-def]  # noqa: ANN201
     def wrapper(*args, **kwargs):  # type: ignore[no-untyped-def]
@@ -77,12 +86,18 @@ class HeartbeatStatusProxy:
         self.folder_id = folder_id
         self.device_id = device_id
         self.store = HeartbeatStore.store()
+        # (thread ident, wall clock, thread CPU time) of the last publish,
+        # used to report the CPU time the syncing thread spent in between.
+        self._cpu_sample: tuple[int, float, float] | None = None
 
     @safe_failure
     def publish(self, **kwargs) -> None:  # type: ignore[no-untyped-def]
         try:
             self.heartbeat_at = time.time()
             self.store.publish(self.key, self.heartbeat_at)
+            cpu_usage = self._sample_cpu_usage()
+            if cpu_usage is not None:
+                self.store.publish_cpu_usage(self.key, cpu_usage)
         except Exception:
             log = get_logger()
             log.exception(
@@ -92,6 +107,19 @@ class HeartbeatStatusProxy:
                 device_id=self.device_id,
             )
 
+    def _sample_cpu_usage(self) -> float | None:
+        # Heartbeats are published from the thread doing the syncing, so the
+        # calling thread's CPU time is the folder sync's CPU time. Returns
+        # the fraction of a core used since the previous publish.
+        sample = (threading.get_ident(), time.monotonic(), time.thread_time())
+        previous, self._cpu_sample = self._cpu_sample, sample
+        if previous is None or previous[0] != sample[0]:
+            return None
+        elapsed = sample[1] - previous[1]
+        if elapsed <= 0:
+            return None
+        return (sample[2] - previous[2]) / elapsed
+
     @safe_failure
     def clear(self) -> None:
         self.store.remove_folders(
@@ -125,6 +153,18 @@ class HeartbeatStore:
         # Update indexes
         self.update_folder_index(key, float(timestamp))
 
+    @safe_failure
+    def publish_cpu_usage(  # type: ignore[no-untyped-def]
+        self, key, cpu_usage
+    ) -> None:
+        client = heartbeat_config.get_redis_client(key.account_id)
+        cpu_key = CPU_USAGE_KEY.format(key.account_id)
+        pipeline = client.pipeline()
+        pipeline.hset(cpu_key, key.folder_id, cpu_usage)
+        # Folders that stop publishing stop counting towards the account.
+        pipeline.expire(cpu_key, ALIVE_EXPIRY)
+        pipeline.execute()
+
     def remove(  # type: ignore[no-untyped-def]
         self, key, device_id=None, client=None
     ) -> None:
@@ -199,11 +239,13 @@ class HeartbeatStore:
         if isinstance(key, str):
             key = HeartbeatStatusKey.from_string(key)
         client.zrem(key.account_id, key.folder_id)
+        client.hdel(CPU_USAGE_KEY.format(key.account_id), key.folder_id)
 
     def remove_from_account_index(  # type: ignore[no-untyped-def]
         self, account_id, client
     ) -> None:
         client.delete(account_id)
+        client.delete(CPU_USAGE_KEY.format(account_id))
         client.zrem("account_index", account_id)
 
     def get_account_folders(self, account_id):  # type: ignore[no-untyped-def]  # noqa: ANN201
@@ -251,3 +293,30 @@ class HeartbeatStore:
                     results[account_id] = pipe_results[i]
 
         return results
+
+    def get_accounts_cpu_usage(
+        self, account_ids: list[int]
+    ) -> dict[int, float]:
+        """
+        Return the recent CPU usage of each account's syncs, as a fraction of
+        a core, for the accounts that reported any.
+        """
+        shard_num = heartbeat_config.account_redis_shard_number
+        results = {}
+        for _, group in itertools.groupby(
+            sorted(account_ids, key=shard_num), key=shard_num
+        ):
+            account_group = list(group)
+            client = heartbeat_config.get_redis_client(account_group[0])
+            for chnk in chunk(account_group, 10000):
+                pipe = client.pipeline()
+                for account_id in chnk:
+                    pipe.hvals(CPU_USAGE_KEY.format(account_id))
+                for account_id, values in zip(
+                    chnk, pipe.execute(), strict=True
+                ):
+                    if values:
+                        results[int(account_id)] = sum(
+                            float(value) for value in values
+                        )
+        return results
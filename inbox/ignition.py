@@ -1,3 +1,4 @@
+import random
 import time
 import weakref
 from collections.abc import MutableMapping
@@ -16,6 +17,7 @@ from inbox.sqlalchemy_ext.util import (
     ForceStrictModePool,
     disabled_dubiously_many_queries_warning,
 )
+from inbox.util.call_site import get_call_site
 from inbox.util.stats import statsd_client
 
 filterwarnings("ignore", message="Invalid utf8mb4 character string")
@@ -26,6 +28,13 @@ DB_POOL_SIZE = config.get_required("DB_POOL_SIZE")
 # Sane default of max overflow=5 if value missing in config.
 DB_POOL_MAX_OVERFLOW = config.get("DB_POOL_MAX_OVERFLOW") or 5
 DB_POOL_TIMEOUT = config.get("DB_POOL_TIMEOUT") or 60
+# Fraction of connection checkouts for which the stack is walked to record the
+# exact source line. Every checkout is attributed to its call site anyway.
+DB_STACK_CAPTURE_SAMPLE_RATE = config.get("DB_STACK_CAPTURE_SAMPLE_RATE", 0.01)
+# Stacks are captured for every checkout once this fraction of a pool's
+# connections, overflow included, are checked out, so that the sources
+# holding them are known when the pool runs out.
+DB_POOL_EXHAUSTION_RATIO = 0.8
 
 
 pool_tracker: MutableMapping[Any, dict[str, Any]] = weakref.WeakKeyDictionary()
@@ -47,6 +56,17 @@ def build_uri(  # type: ignore[no-untyped-def]  # noqa: ANN201
     )
 
 
+def should_capture_stack(pool) -> bool:  # type: ignore[no-untyped-def]
+    """
+    Whether to walk the stack for a connection checkout from `pool`: for a
+    sample of checkouts, and for all of them when the pool nears exhaustion.
+    """
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    if pool.checkedout() >= capacity * DB_POOL_EXHAUSTION_RATIO:
+        return True
+    return random.random() < DB_STACK_CAPTURE_SAMPLE_RATE
+
+
 def engine(  # type: ignore[no-untyped-def]  # noqa: ANN201
     database_name,
     database_uri,
@@ -104,19 +124,25 @@ def engine(  # type: ignore[no-untyped-def]  # noqa: ANN201
                 connection_proxy._pool.overflow(),
             )
 
-        # Keep track of where and why this connection was checked out.
-        log = get_logger()
-        context = log._context._dict.copy()
-        f, name = find_first_app_frame_and_name(
-            ignores=["sqlalchemy", "inbox.ignition", "inbox.logging"]
-        )
-        source = f"{name}:{f.f_lineno}"
-
-        pool_tracker[dbapi_connection] = {
-            "source": source,
-            "context": context,
+        # Keep track of where and why this connection was checked out. The
+        # call site is cheap to get, the exact source line and log context
+        # are only captured when they are likely to be needed.
+        call_site = get_call_site()
+        tracked = {
+            "call_site": call_site,
+            "source": call_site,
+            "context": None,
             "checkedout_at": time.time(),
         }
+        if should_capture_stack(connection_proxy._pool):
+            log = get_logger()
+            f, name = find_first_app_frame_and_name(
+                ignores=["sqlalchemy", "inbox.ignition", "inbox.logging"]
+            )
+            tracked["source"] = f"{name}:{f.f_lineno}"
+            tracked["context"] = log._context._dict.copy()
+
+        pool_tracker[dbapi_connection] = tracked
 
     @event.listens_for(engine, "checkin")
     def receive_checkin(  # type: ignore[no-untyped-def]
@@ -28,6 +28,8 @@ from typing import Any, Concatenate, TypeVar
 
 from typing_extensions import ParamSpec
 
+from inbox.util.call_site import set_call_site
+
 
 class InterruptibleThreadExit(BaseException):
     """
@@ -111,6 +113,11 @@ class InterruptibleThread(threading.Thread):
         return self.__exception
 
     def run(self) -> None:
+        # Attribute the thread's database sessions and connections to it.
+        name = type(self).__name__
+        if self.__run_target:
+            name = getattr(self.__run_target.target, "__qualname__", name)
+        set_call_site(name)
         try:
             self._run()
         except InterruptibleThreadExit:
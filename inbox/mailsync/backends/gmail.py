@@ -26,19 +26,25 @@ from datetime import datetime, timedelta
 from threading import Semaphore
 from typing import TYPE_CHECKING, ClassVar
 
+from sqlalchemy.exc import OperationalError  # type: ignore[import-untyped]
 from sqlalchemy.orm import (  # type: ignore[import-untyped]
     joinedload,
     load_only,
 )
 
 from inbox import interruptible_threading
+from inbox.config import config
 from inbox.logging import get_logger
 from inbox.mailsync.backends.base import THROTTLE_COUNT, THROTTLE_WAIT
 from inbox.mailsync.backends.imap import common
-from inbox.mailsync.backends.imap.generic import ChangePoller, FolderSyncEngine
+from inbox.mailsync.backends.imap.generic import (
+    ChangePoller,
+    FolderSyncEngine,
+    batch_data_sha256s,
+)
 from inbox.mailsync.backends.imap.monitor import ImapSyncMonitor
 from inbox.mailsync.gc import LabelRenameHandler
-from inbox.models import Account, Category, Folder, Label, Message, Namespace
+from inbox.models import Account, Category, Folder, Label
 from inbox.models.backends.imap import ImapFolderInfo, ImapThread, ImapUid
 from inbox.models.category import EPOCH
 from inbox.models.session import session_scope
@@ -46,7 +52,9 @@ from inbox.util.debug import bind_context
 from inbox.util.itert import chunk
 
 if TYPE_CHECKING:
-    from inbox.crispin import CrispinClient
+    from sqlalchemy.orm import Session
+
+    from inbox.crispin import CrispinClient, RawMessage
 
 log = get_logger()
 
@@ -56,7 +64,9 @@ SYNC_MONITOR_CLS = "GmailSyncMonitor"
 
 MAX_DOWNLOAD_BYTES = 2**20
 # USE MAX_DOWNLOAD_COUNT = 1 instead of 30 until N1 launch herding dies.
-MAX_DOWNLOAD_COUNT = 1
+# Messages of a download batch are committed together, so raising this
+# through the config also reduces the number of commits per message.
+MAX_DOWNLOAD_COUNT = config.get("GMAIL_MAX_DOWNLOAD_COUNT", 1)
 
 
 class GmailFolderSyncEngine(FolderSyncEngine):
@@ -259,7 +269,9 @@ class GmailFolderSyncEngine(FolderSyncEngine):
         We deduplicate messages based on g_msgid: if we've previously saved a
         Message object for this raw message, we don't create a new one. But we
         do create a new ImapUid, associate it to the message, and update flags
-        and categories accordingly.
+        and categories accordingly. Existing messages are looked up through
+        the account's dedupe index, which must have been warmed for this
+        batch.
         Note: we could do this prior to downloading the actual message
         body, but that's really more complicated than it's worth. This
         operation is not super common unless you're regularly moving lots
@@ -267,16 +279,16 @@ class GmailFolderSyncEngine(FolderSyncEngine):
         downloading the body is generally not that high.
 
         """
-        new_g_msgids = {msg.g_msgid for msg in raw_messages}
-        existing_g_msgids = g_msgids(
-            self.namespace_id, db_session, in_=new_g_msgids
-        )
-        brand_new_messages = [
-            m for m in raw_messages if m.g_msgid not in existing_g_msgids
-        ]
-        previously_synced_messages = [
-            m for m in raw_messages if m.g_msgid in existing_g_msgids
-        ]
+        brand_new_messages = []
+        previously_synced_messages = []
+        for raw_message in raw_messages:
+            message_obj = self.dedupe_index.get_by_g_msgid(
+                db_session, raw_message.g_msgid
+            )
+            if message_obj is None:
+                brand_new_messages.append(raw_message)
+            else:
+                previously_synced_messages.append((raw_message, message_obj))
         if previously_synced_messages:
             log.info(
                 "saving new uids for existing messages",
@@ -284,25 +296,10 @@ class GmailFolderSyncEngine(FolderSyncEngine):
             )
             account = Account.get(self.account_id, db_session)
             folder = Folder.get(self.folder_id, db_session)
-            for raw_message in previously_synced_messages:
-                message_obj = (
-                    db_session.query(Message)
-                    .filter(
-                        Message.namespace_id == self.namespace_id,
-                        Message.g_msgid == raw_message.g_msgid,
-                    )
-                    .first()
-                )
-                if message_obj is None:
-                    log.warning(
-                        "Message disappeared while saving new uid",
-                        g_msgid=raw_message.g_msgid,
-                        uid=raw_message.uid,
-                    )
-                    brand_new_messages.append(raw_message)
-                    continue
+            for raw_message, message_obj in previously_synced_messages:
                 already_have_uid = (raw_message.uid, self.folder_id) in {
-                    (u.msg_uid, u.folder_id) for u in message_obj.imapuids
+                    (u.msg_uid, u.folder_id)
+                    for u in message_obj.imapuids  # type: ignore[attr-defined]
                 }
                 if already_have_uid:
                     log.warning(
@@ -322,7 +319,8 @@ class GmailFolderSyncEngine(FolderSyncEngine):
                 common.update_message_metadata(
                     db_session, account, message_obj, uid.is_draft
                 )
-                db_session.commit()
+                # Committed together with the rest of the batch.
+                db_session.flush()
 
         return brand_new_messages
 
@@ -344,6 +342,38 @@ class GmailFolderSyncEngine(FolderSyncEngine):
                 db_session, self.namespace_id, message_obj
             )
 
+    def create_message_in_savepoint(
+        self,
+        db_session: "Session",
+        account: Account,
+        folder: Folder,
+        raw_message: "RawMessage",
+    ) -> ImapUid | None:
+        """
+        Create a message inside a savepoint, so that a message we fail to
+        save is skipped without rolling back the rest of its batch.
+        """
+        try:
+            with db_session.begin_nested():
+                uid = self.create_message(
+                    db_session, account, folder, raw_message
+                )
+                if uid is not None:
+                    db_session.add(uid)
+        except OperationalError:
+            # Deadlocks and lost connections abort the whole transaction,
+            # not just the savepoint; let the sync retry the batch.
+            raise
+        except Exception:
+            log.exception(
+                "Error saving message, skipping it",
+                account_id=self.account_id,
+                folder_id=self.folder_id,
+                uid=raw_message.uid,
+            )
+            return None
+        return uid
+
     def download_and_commit_uids(  # type: ignore[no-untyped-def]
         self, crispin_client, uids
     ) -> int | None:
@@ -358,18 +388,27 @@ class GmailFolderSyncEngine(FolderSyncEngine):
         ):
             account = Account.get(self.account_id, db_session)
             folder = Folder.get(self.folder_id, db_session)
-            raw_messages = self.__deduplicate_message_object_creation(
-                db_session, raw_messages, account
-            )
-            if not raw_messages:
-                return 0
+            with self.dedupe_index.batch(
+                db_session,
+                data_sha256s=batch_data_sha256s(raw_messages),
+                g_msgids={msg.g_msgid for msg in raw_messages},
+            ):
+                raw_messages = self.__deduplicate_message_object_creation(
+                    db_session, raw_messages, account
+                )
+                if not raw_messages:
+                    return 0
 
-            for msg in raw_messages:
-                uid = self.create_message(db_session, account, folder, msg)
-                if uid is not None:
-                    db_session.add(uid)
-                    db_session.commit()
-                    new_uids.add(uid)
+                for msg in raw_messages:
+                    uid = self.create_message_in_savepoint(
+                        db_session, account, folder, msg
+                    )
+                    if uid is not None:
+                        new_uids.add(uid)
+            # All messages of the batch are committed at once, which saves
+            # a commit, a Redis transaction id bump and a pass over the
+            # session for every message.
+            db_session.commit()
 
         log.debug(
             "Committed new UIDs", new_committed_message_count=len(new_uids)
@@ -462,33 +501,6 @@ class GmailFolderSyncEngine(FolderSyncEngine):
         return throttled
 
 
-def g_msgids(namespace_id, session, in_):  # type: ignore[no-untyped-def]  # noqa: ANN201
-    if not in_:
-        return []
-    # Easiest way to account-filter Messages is to namespace-filter from
-    # the associated thread. (Messages may not necessarily have associated
-    # ImapUids.)
-    in_ = {int(i) for i in in_}  # in case they are strings
-    if len(in_) > 1000:
-        # If in_ is really large, passing all the values to MySQL can get
-        # deadly slow. (Approximate threshold empirically determined)
-        query = (
-            session.query(Message.g_msgid)
-            .join(Namespace)
-            .filter(Message.namespace_id == namespace_id)
-            .all()
-        )
-        return sorted(g_msgid for (g_msgid,) in query if g_msgid in in_)
-    # But in the normal case that in_ only has a few elements, it's way better
-    # to not fetch a bunch of values from MySQL only to return a few of them.
-    query = (
-        session.query(Message.g_msgid)
-        .filter(Message.namespace_id == namespace_id, Message.g_msgid.in_(in_))
-        .all()
-    )
-    return {g_msgid for (g_msgid,) in query}
-
-
 class GmailSyncMonitor(ImapSyncMonitor):
     sync_engine_class: ClassVar[type[FolderSyncEngine]] = GmailFolderSyncEngine
 
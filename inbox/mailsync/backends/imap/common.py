@@ -26,7 +26,7 @@ from inbox.models import Account, ActionLog, Folder, Message, MessageCategory
 from inbox.models.backends.imap import ImapFolderInfo, ImapUid
 from inbox.models.category import Category
 from inbox.models.session import session_scope
-from inbox.models.util import reconcile_message
+from inbox.models.util import MessageDedupeIndex, reconcile_message
 from inbox.sqlalchemy_ext.util import get_db_api_cursor_with_query
 
 log = get_logger()
@@ -312,6 +312,7 @@ def create_imap_message(
     account: Account,
     folder: Folder,
     raw_message: RawMessage,
+    dedupe_index: MessageDedupeIndex | None = None,
 ) -> ImapUid:
     """
     IMAP-specific message creation logic.
@@ -339,7 +340,7 @@ def create_imap_message(
 
     # Check to see if this is a copy of a message that was first created
     # by the Nylas API. If so, don't create a new object; just use the old one.
-    existing_copy = reconcile_message(new_message, db_session)
+    existing_copy = reconcile_message(new_message, db_session, dedupe_index)
     if existing_copy is not None:
         new_message = existing_copy
 
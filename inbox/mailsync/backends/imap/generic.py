@@ -65,6 +65,7 @@ import imaplib
 import threading
 import time
 from datetime import datetime, timedelta
+from hashlib import sha256
 from typing import Any, NoReturn
 
 from sqlalchemy import func  # type: ignore[import-untyped]
@@ -101,6 +102,10 @@ from inbox.mailsync.backends.base import (  # noqa: E402
     MailsyncError,
 )
 from inbox.mailsync.backends.imap import common  # noqa: E402
+from inbox.mailsync.backends.imap.planner import (  # noqa: E402
+    RECENT_MAIL_WINDOW,
+    InitialSyncPlanner,
+)
 from inbox.models import Account, Folder, Message  # noqa: E402
 from inbox.models.backends.imap import (  # noqa: E402
     ImapFolderInfo,
@@ -109,6 +114,7 @@ from inbox.models.backends.imap import (  # noqa: E402
     ImapUid,
 )
 from inbox.models.session import session_scope  # noqa: E402
+from inbox.models.util import MessageDedupeIndex  # noqa: E402
 
 # Idle doesn't necessarily pick up flag changes, so we don't want to
 # idle for very long, or we won't detect things like messages being
@@ -127,6 +133,13 @@ MAX_UIDINVALID_RESYNCS = 5
 
 CONDSTORE_FLAGS_REFRESH_BATCH_SIZE = 200
 
+# With QRESYNC, expunges are detected from VANISHED responses. We still
+# compare the full list of remote UIDs against ours every so often in case
+# the server missed reporting some, and whenever the reported UID ranges are
+# too large to expand.
+QRESYNC_FULL_EXPUNGE_CHECK_INTERVAL = timedelta(seconds=3600)
+QRESYNC_MAX_VANISHED_UIDS = 100000
+
 
 class ChangePoller(InterruptibleThread):
     def __init__(self, engine: "FolderSyncEngine") -> None:
@@ -166,6 +179,8 @@ class FolderSyncEngine(InterruptibleThread):
         email_address,
         provider_name,
         syncmanager_lock,
+        dedupe_index: MessageDedupeIndex | None = None,
+        initial_sync_planner: InitialSyncPlanner | None = None,
     ) -> None:
         with session_scope(namespace_id) as db_session:
             try:
@@ -200,9 +215,18 @@ class FolderSyncEngine(InterruptibleThread):
         else:
             self.poll_frequency = DEFAULT_POLL_FREQUENCY
         self.syncmanager_lock = syncmanager_lock
+        # Shared by all the folder engines of an account so that messages
+        # saved from one folder are known when syncing the others.
+        if dedupe_index is None:
+            dedupe_index = MessageDedupeIndex(namespace_id)
+        self.dedupe_index = dedupe_index
+        if initial_sync_planner is None:
+            initial_sync_planner = InitialSyncPlanner(provider_name)
+        self.initial_sync_planner = initial_sync_planner
         self.state: str | None = None
         self.provider_name = provider_name
         self.last_fast_refresh = None
+        self.last_full_expunge_check: datetime | None = None
         self.flags_fetch_results = {}  # type: ignore[var-annotated]
         self.conn_pool = connection_pool(self.account_id)
         self.polling_logged_at: float = 0
@@ -299,6 +323,8 @@ class FolderSyncEngine(InterruptibleThread):
     def _run_impl(self):  # type: ignore[no-untyped-def]
         old_state = self.state
         assert old_state
+        if old_state == "poll":
+            self.initial_sync_planner.mark_recent_synced(self.folder_name)
         try:
             self.state = self.state_handlers[old_state]()
             self.heartbeat_status.publish(state=self.state)
@@ -431,6 +457,7 @@ class FolderSyncEngine(InterruptibleThread):
             self._report_initial_sync_start()
             self.is_first_sync = False
 
+        recent_only = self.initial_sync_planner.is_pending(self.folder_name)
         with self.conn_pool.get() as crispin_client:
             crispin_client.select_folder(self.folder_name, uidvalidity_cb)
             # Ensure we have an ImapFolderInfo row created prior to sync start.
@@ -450,7 +477,19 @@ class FolderSyncEngine(InterruptibleThread):
                     db_session.add(imapfolderinfo)
                 db_session.commit()
 
-            self.initial_sync_impl(crispin_client)
+            if recent_only:
+                self.recent_sync_impl(crispin_client)
+            else:
+                self.initial_sync_impl(crispin_client)
+
+        if recent_only:
+            # Let the other priority folders download their recent mail
+            # before backfilling the rest of this one.
+            self.initial_sync_planner.mark_recent_synced(
+                self.folder_name, downloaded=True
+            )
+            self.initial_sync_planner.wait_for_recent_mail()
+            return "initial"
 
         if self.is_initial_sync:
             self._report_initial_sync_end()
@@ -519,18 +558,7 @@ class FolderSyncEngine(InterruptibleThread):
             bind_context(
                 change_poller, "changepoller", self.account_id, self.folder_id
             )
-            for count, uid in enumerate(new_uids, start=1):
-                # The speedup from batching appears to be less clear for
-                # non-Gmail accounts, so for now just download one-at-a-time.
-                self.download_and_commit_uids(crispin_client, [uid])
-                self.heartbeat_status.publish()
-                if throttled and count >= THROTTLE_COUNT:
-                    # Throttled accounts' folders sync at a rate of
-                    # 1 message/ minute, after the first approx. THROTTLE_COUNT
-                    # messages per folder are synced.
-                    # Note this is an approx. limit since we use the #(uids),
-                    # not the #(messages).
-                    interruptible_threading.sleep(THROTTLE_WAIT)
+            self.download_new_uids(crispin_client, new_uids, throttled)
 
             del new_uids  # free up memory as soon as possible
         finally:
@@ -538,6 +566,49 @@ class FolderSyncEngine(InterruptibleThread):
                 # schedule change_poller to die
                 change_poller.kill()
 
+    def recent_sync_impl(self, crispin_client: CrispinClient) -> None:
+        """
+        Download only the messages of the last RECENT_MAIL_WINDOW, newest
+        first. The rest of the folder is backfilled by initial_sync_impl.
+        """
+        assert crispin_client.selected_folder_name == self.folder_name
+        since = datetime.utcnow() - RECENT_MAIL_WINDOW
+        recent_uids = set(
+            crispin_client.search_uids([
+                "SINCE",
+                since,  # type: ignore[list-item]
+            ])
+        )
+        with session_scope(self.namespace_id) as db_session:
+            local_uids = common.local_uids(
+                self.account_id, db_session, self.folder_id
+            )
+            account = db_session.query(Account).get(self.account_id)
+            throttled = account.throttled
+
+        new_uids = sorted(recent_uids - local_uids, reverse=True)
+        log.info("Downloading recent mail first", recent_uids=len(new_uids))
+        self.download_new_uids(crispin_client, new_uids, throttled)
+
+    def download_new_uids(
+        self,
+        crispin_client: CrispinClient,
+        new_uids: list[int],
+        throttled: bool,
+    ) -> None:
+        for count, uid in enumerate(new_uids, start=1):
+            # The speedup from batching appears to be less clear for
+            # non-Gmail accounts, so for now just download one-at-a-time.
+            self.download_and_commit_uids(crispin_client, [uid])
+            self.heartbeat_status.publish()
+            if throttled and count >= THROTTLE_COUNT:
+                # Throttled accounts' folders sync at a rate of
+                # 1 message/ minute, after the first approx. THROTTLE_COUNT
+                # messages per folder are synced.
+                # Note this is an approx. limit since we use the #(uids),
+                # not the #(messages).
+                interruptible_threading.sleep(THROTTLE_WAIT)
+
     def should_idle(self, crispin_client):  # type: ignore[no-untyped-def]  # noqa: ANN201
         if not hasattr(self, "_should_idle"):
             self._should_idle = (
@@ -658,11 +729,12 @@ class FolderSyncEngine(InterruptibleThread):
             return None
 
         new_uid = common.create_imap_message(
-            db_session, account, folder, raw_message
+            db_session, account, folder, raw_message, self.dedupe_index
         )
         self.add_message_to_thread(db_session, new_uid.message, raw_message)
 
         db_session.flush()
+        self.dedupe_index.add(new_uid.message)
 
         # We're calling import_attached_events here instead of some more
         # obvious place (like Message.create_from_synced) because the function
@@ -756,12 +828,15 @@ class FolderSyncEngine(InterruptibleThread):
         ):
             account = Account.get(self.account_id, db_session)
             folder = Folder.get(self.folder_id, db_session)
-            for msg in raw_messages:
-                uid = self.create_message(db_session, account, folder, msg)
-                if uid is not None:
-                    db_session.add(uid)
-                    db_session.flush()
-                    new_uids.add(uid)
+            with self.dedupe_index.batch(
+                db_session, data_sha256s=batch_data_sha256s(raw_messages)
+            ):
+                for msg in raw_messages:
+                    uid = self.create_message(db_session, account, folder, msg)
+                    if uid is not None:
+                        db_session.add(uid)
+                        db_session.flush()
+                        new_uids.add(uid)
             db_session.commit()
 
         log.debug(
@@ -921,9 +996,21 @@ class FolderSyncEngine(InterruptibleThread):
             saved_highestmodseq=self.highestmodseq,
         )
         crispin_client.select_folder(self.folder_name, self.uidvalidity_cb)
-        changed_flags = crispin_client.condstore_changed_flags(
-            self.highestmodseq
+        vanished_uid_ranges = None
+        full_expunge_check_due = (
+            self.last_full_expunge_check is None
+            or datetime.utcnow()
+            > self.last_full_expunge_check
+            + QRESYNC_FULL_EXPUNGE_CHECK_INTERVAL
         )
+        if crispin_client.qresync_enabled and not full_expunge_check_due:
+            changed_flags, vanished_uid_ranges = (
+                crispin_client.qresync_changed_flags(self.highestmodseq)
+            )
+        else:
+            changed_flags = crispin_client.condstore_changed_flags(
+                self.highestmodseq
+            )
 
         # In order to be able to sync changes to tens of thousands of flags at
         # once, we commit updates in batches. We do this in ascending order by
@@ -955,18 +1042,32 @@ class FolderSyncEngine(InterruptibleThread):
 
         del changed_flags  # free memory as soon as possible
 
-        with self.global_lock:
-            remote_uids = set(crispin_client.all_uids())
+        expunged_uids = None
+        if vanished_uid_ranges is not None:
+            expunged_uids = expand_uid_ranges(
+                vanished_uid_ranges, QRESYNC_MAX_VANISHED_UIDS
+            )
 
-            with session_scope(self.namespace_id) as db_session:
-                local_uids = common.local_uids(
-                    self.account_id, db_session, self.folder_id
-                )
+        if expunged_uids is not None:
+            statsd_client.incr("mailsync.expunge_check.qresync")
+            # UIDs are assigned in ascending order, so UIDNEXT tells us the
+            # highest UID that can exist on the remote.
+            max_remote_uid = (crispin_client.selected_uidnext or 1) - 1
+        else:
+            statsd_client.incr("mailsync.expunge_check.search_all")
+            with self.global_lock:
+                remote_uids = set(crispin_client.all_uids())
 
-            expunged_uids = local_uids.difference(remote_uids)
-            del local_uids  # free memory as soon as possible
-            max_remote_uid = max(remote_uids) if remote_uids else 0
-            del remote_uids  # free memory as soon as possible
+                with session_scope(self.namespace_id) as db_session:
+                    local_uids = common.local_uids(
+                        self.account_id, db_session, self.folder_id
+                    )
+
+                expunged_uids = local_uids.difference(remote_uids)
+                del local_uids  # free memory as soon as possible
+                max_remote_uid = max(remote_uids) if remote_uids else 0
+                del remote_uids  # free memory as soon as possible
+            self.last_full_expunge_check = datetime.utcnow()
 
         if expunged_uids:
             # If new UIDs have appeared since we last checked in
@@ -1188,6 +1289,25 @@ class FolderSyncEngine(InterruptibleThread):
         return f"<{self.name}>"
 
 
+def expand_uid_ranges(
+    uid_ranges: list[tuple[int, int]], max_uids: int
+) -> set[int] | None:
+    """
+    Expand inclusive (first, last) UID ranges into a set of UIDs, or return
+    None if that would be more than `max_uids` UIDs.
+    """
+    if sum(last - first + 1 for first, last in uid_ranges) > max_uids:
+        return None
+    return {
+        uid for first, last in uid_ranges for uid in range(first, last + 1)
+    }
+
+
+def batch_data_sha256s(raw_messages: list[RawMessage]) -> set[str]:
+    """Hashes of the downloaded message bodies, as stored in data_sha256."""
+    return {sha256(msg.body).hexdigest() for msg in raw_messages if msg.body}
+
+
 class UidInvalid(Exception):
     """Raised when a folder's UIDVALIDITY changes, requiring a resync."""
 
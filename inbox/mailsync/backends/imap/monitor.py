@@ -7,10 +7,15 @@ from inbox.exceptions import IMAPDisabledError, ValidationError
 from inbox.logging import get_logger
 from inbox.mailsync.backends.base import BaseMailSyncMonitor
 from inbox.mailsync.backends.imap.generic import FolderSyncEngine
+from inbox.mailsync.backends.imap.planner import (
+    PRIORITY_FOLDER_ROLES,
+    InitialSyncPlanner,
+)
 from inbox.mailsync.gc import DeleteHandler
 from inbox.models import Account, Folder
 from inbox.models.category import Category, sanitize_name
 from inbox.models.session import session_scope
+from inbox.models.util import MessageDedupeIndex
 from inbox.util.concurrency import kill_all
 
 log = get_logger()
@@ -44,6 +49,9 @@ class ImapSyncMonitor(BaseMailSyncMonitor):
 
         BaseMailSyncMonitor.__init__(self, account, heartbeat)
 
+        self.dedupe_index = MessageDedupeIndex(self.namespace_id)
+        self.initial_sync_planner = InitialSyncPlanner(self.provider_name)
+
     @retry_crispin
     def prepare_sync(self):  # type: ignore[no-untyped-def]  # noqa: ANN201
         """
@@ -134,7 +142,22 @@ class ImapSyncMonitor(BaseMailSyncMonitor):
             monitor.folder_name: monitor for monitor in self.folder_monitors
         }
 
-        for folder_name in self.prepare_sync():
+        sync_folders = self.prepare_sync()
+        with session_scope(self.namespace_id) as db_session:
+            priority_folders = {
+                name
+                for (name,) in db_session.query(Folder.name).filter(
+                    Folder.account_id == self.account_id,
+                    Folder.canonical_name.in_(  # type: ignore[attr-defined]
+                        PRIORITY_FOLDER_ROLES
+                    ),
+                )
+            }
+        self.initial_sync_planner.prioritize(
+            priority_folders.intersection(sync_folders)
+        )
+
+        for folder_name in sync_folders:
             if folder_name in running_monitors:
                 thread = running_monitors[folder_name]
             else:
@@ -150,14 +173,24 @@ class ImapSyncMonitor(BaseMailSyncMonitor):
                     self.email_address,
                     self.provider_name,
                     self.syncmanager_lock,
+                    self.dedupe_index,
+                    self.initial_sync_planner,
                 )
                 self.folder_monitors.append(thread)
                 thread.start()
 
-            while thread.state != "poll" and not thread.ready():
+            # Priority folders only hold up the next folder until their
+            # recent mail is synced; they backfill concurrently with it.
+            while (
+                thread.state != "poll"
+                and not thread.ready()
+                and not self.initial_sync_planner.recent_synced(folder_name)
+            ):
                 interruptible_threading.sleep(self.heartbeat)
 
             if thread.ready():
+                # Don't keep other folders waiting for this one.
+                self.initial_sync_planner.mark_recent_synced(folder_name)
                 log.info(
                     "Folder sync engine exited",
                     account_id=self.account_id,
@@ -176,7 +209,6 @@ class ImapSyncMonitor(BaseMailSyncMonitor):
                 account_id=self.account_id,
                 namespace_id=self.namespace_id,
                 provider_name=self.provider_name,
-                uid_accessor=lambda m: m.imapuids,
             )
             self.delete_handler.start()  # type: ignore[attr-defined]
 
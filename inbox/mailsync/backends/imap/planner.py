@@ -0,0 +1,113 @@
+import threading
+import time
+from collections.abc import Iterable
+from datetime import timedelta
+
+from inbox import interruptible_threading
+from inbox.logging import get_logger
+from inbox.util.stats import statsd_client
+
+log = get_logger()
+
+# Folders whose recent mail is downloaded before any folder backfills older
+# history, since these are the ones users look at first.
+PRIORITY_FOLDER_ROLES = ("inbox", "sent")
+RECENT_MAIL_WINDOW = timedelta(days=30)
+# Upper bound on how long a priority folder that has synced its recent mail
+# waits for the other priority folders before backfilling its own history.
+RECENT_MAIL_WAIT_TIMEOUT = 15 * 60
+
+
+class InitialSyncPlanner:
+    """
+    Orders the initial sync of an account's folders so that the last
+    RECENT_MAIL_WINDOW of mail in the priority folders lands first.
+
+    Shared by the monitor and all the folder sync engines of an account.
+    A prioritized folder first downloads only its recent mail, then
+    releases its connection and waits for the other prioritized folders to
+    do the same before backfilling, and the monitor starts the next folder
+    as soon as a prioritized one has its recent mail.
+    """
+
+    def __init__(self, provider_name: str) -> None:
+        self.provider_name = provider_name
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._pending: set[str] = set()
+        self._recent_synced: set[str] = set()
+        self._downloaded = False
+        self._reported = False
+
+    def prioritize(self, folder_names: Iterable[str]) -> None:
+        with self._lock:
+            self._pending.update(set(folder_names) - self._recent_synced)
+
+    def is_pending(self, folder_name: str) -> bool:
+        with self._lock:
+            return folder_name in self._pending
+
+    def recent_synced(self, folder_name: str) -> bool:
+        with self._lock:
+            return folder_name in self._recent_synced
+
+    def mark_recent_synced(
+        self, folder_name: str, downloaded: bool = False
+    ) -> None:
+        """
+        Record that `folder_name` has its recent mail, either because it
+        just downloaded it or because it is past initial sync.
+        """
+        with self._lock:
+            if folder_name in self._recent_synced and not downloaded:
+                return
+            self._pending.discard(folder_name)
+            self._recent_synced.add(folder_name)
+            self._downloaded = self._downloaded or downloaded
+            report = (
+                not self._pending and self._downloaded and not self._reported
+            )
+            if report:
+                self._reported = True
+
+        if report:
+            self._report_recent_mail_synced()
+
+    def wait_for_recent_mail(
+        self, timeout: float = RECENT_MAIL_WAIT_TIMEOUT
+    ) -> None:
+        """
+        Block until all prioritized folders have their recent mail, or
+        `timeout` seconds have passed.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return
+            interruptible_threading.sleep(1)
+
+        log.warning(
+            "Timed out waiting for recent mail of priority folders",
+            pending_folders=sorted(self._pending),
+        )
+
+    def _report_recent_mail_synced(self) -> None:
+        latency = (time.monotonic() - self.started_at) * 1000
+        log.info("Recent mail synced", latency_ms=latency)
+        metrics = [
+            ".".join([
+                "mailsync",
+                "providers",
+                self.provider_name,
+                "recent_mail_synced",
+            ]),
+            ".".join([
+                "mailsync",
+                "providers",
+                "overall",
+                "recent_mail_synced",
+            ]),
+        ]
+        for metric in metrics:
+            statsd_client.timing(metric, latency)
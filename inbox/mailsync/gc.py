@@ -1,10 +1,8 @@
 import datetime
+from collections import defaultdict
 
-from sqlalchemy import func  # type: ignore[import-untyped]
+from sqlalchemy import exists, false, func  # type: ignore[import-untyped]
 from sqlalchemy.orm import load_only  # type: ignore[import-untyped]
-from sqlalchemy.orm.exc import (  # type: ignore[import-untyped]
-    ObjectDeletedError,
-)
 
 from inbox import interruptible_threading
 from inbox.crispin import connection_pool
@@ -12,11 +10,16 @@ from inbox.interruptible_threading import InterruptibleThread
 from inbox.logging import get_logger
 from inbox.mailsync.backends.imap import common
 from inbox.mailsync.backends.imap.generic import uidvalidity_cb
-from inbox.models import Message, Thread
+from inbox.models import Event, Message, Thread, ThreadCategory
+from inbox.models.backends.imap import ImapUid
+from inbox.models.block import Part
 from inbox.models.category import EPOCH, Category
+from inbox.models.contact import MessageContactAssociation
 from inbox.models.folder import Folder
 from inbox.models.message import MessageCategory
 from inbox.models.session import session_scope
+from inbox.models.thread import summarize_threads
+from inbox.models.transaction import create_deletion_revisions
 from inbox.models.util import delete_message_hashes
 from inbox.util.concurrency import retry_with_logging
 from inbox.util.debug import bind_context
@@ -27,6 +30,7 @@ log = get_logger()
 DEFAULT_MESSAGE_TTL = 2 * 60  # 2 minutes
 DEFAULT_THREAD_TTL = 60 * 60 * 24 * 7  # 7 days
 MAX_FETCH = 1000
+DELETE_BATCH_SIZE = 100
 
 
 class DeleteHandler(InterruptibleThread):
@@ -46,10 +50,6 @@ class DeleteHandler(InterruptibleThread):
     ----------
     account_id, namespace_id: int
         IDs for the namespace to check.
-    uid_accessor: function
-        Function that takes a message and returns a list of associated uid
-        objects. For IMAP sync, this would just be
-        `uid_accessor=lambda m: m.imapuids`
     message_ttl: int
         Number of seconds to wait after a message is marked for deletion before
         deleting it for good.
@@ -61,7 +61,6 @@ class DeleteHandler(InterruptibleThread):
         account_id,
         namespace_id,
         provider_name,
-        uid_accessor,
         message_ttl=DEFAULT_MESSAGE_TTL,
         thread_ttl=DEFAULT_THREAD_TTL,
     ) -> None:
@@ -69,7 +68,6 @@ class DeleteHandler(InterruptibleThread):
         self.account_id = account_id
         self.namespace_id = namespace_id
         self.provider_name = provider_name
-        self.uids_for_message = uid_accessor
         self.log = log.new(account_id=account_id)
         self.message_ttl = datetime.timedelta(seconds=message_ttl)
         self.thread_ttl = datetime.timedelta(seconds=thread_ttl)
@@ -95,113 +93,200 @@ class DeleteHandler(InterruptibleThread):
         interruptible_threading.sleep(self.message_ttl.total_seconds())
 
     def check(self, current_time) -> None:  # type: ignore[no-untyped-def]
-        dangling_sha256s = set()
-
-        with session_scope(self.namespace_id) as db_session:
-            dangling_messages = (
-                db_session.query(Message)
-                .filter(
-                    Message.namespace_id == self.namespace_id,
-                    Message.deleted_at <= current_time - self.message_ttl,
+        last_id = 0
+        while True:
+            with session_scope(self.namespace_id) as db_session:
+                message_ids = [
+                    message_id
+                    for (message_id,) in db_session.query(Message.id)
+                    .filter(
+                        Message.namespace_id == self.namespace_id,
+                        Message.deleted_at <= current_time - self.message_ttl,
+                        Message.id > last_id,
+                    )
+                    .order_by(Message.id)
+                    .limit(DELETE_BATCH_SIZE)
+                ]
+                if not message_ids:
+                    return
+                last_id = message_ids[-1]
+
+                dangling_sha256s = self.delete_messages(
+                    db_session, message_ids
                 )
-                .limit(MAX_FETCH)
-            )
-            for message in dangling_messages:
-                # If the message isn't *actually* dangling (i.e., it has
-                # imapuids associated with it), undelete it.
-                try:
-                    uids_for_message = self.uids_for_message(message)
-                except ObjectDeletedError:
-                    # It looks like we are expiring the session potentially when one message is deleted,
-                    # and then when accessing the IMAP uids, there is a lazy load trying to get the data.
-                    # If that object has also been deleted (how?) it raises this exception.
-                    continue
+                # Delete statements may cause InnoDB index locks to be
+                # acquired, so we commit after each batch in order to
+                # prevent bulk delete scenarios from creating a long-running,
+                # blocking transaction.
+                db_session.commit()
 
-                if uids_for_message:
-                    message.deleted_at = None
-                    continue
+            delete_message_hashes(
+                self.namespace_id, self.account_id, dangling_sha256s
+            )
+            interruptible_threading.check_interrupted()
 
-                thread = message.thread
+    def delete_messages(  # type: ignore[no-untyped-def]
+        self, db_session, message_ids
+    ) -> set[str]:
+        """
+        Delete the given messages marked for deletion, and the rows that
+        depend on them, with set-based statements. Returns the data_sha256
+        hashes of the deleted messages.
+        """
+        # If a message isn't *actually* dangling (i.e., it has imapuids
+        # associated with it), undelete it.
+        undeleted_ids = {
+            message_id
+            for (message_id,) in db_session.query(ImapUid.message_id)
+            .filter(ImapUid.message_id.in_(message_ids))
+            .distinct()
+        }
+        for message in db_session.query(Message).filter(
+            Message.id.in_(undeleted_ids)
+        ):
+            message.deleted_at = None
+
+        message_ids = [
+            message_id
+            for message_id in message_ids
+            if message_id not in undeleted_ids
+        ]
+        if not message_ids:
+            return set()
+
+        messages = (
+            db_session.query(
+                Message.id,
+                Message.public_id,
+                Message.is_draft,
+                Message.thread_id,
+                Message.data_sha256,
+                Message.deleted_at,
+            )
+            .filter(Message.id.in_(message_ids))
+            .all()
+        )
 
-                if not thread or message not in thread.messages:
-                    self.log.warning(
-                        "Running delete handler check but message"
-                        " is not part of referenced thread: {}",
-                        thread_id=thread.id,
-                    )
-                    # Nothing to check
-                    continue
+        # Events imported from the messages' attachments are deleted through
+        # the session, so that their deletion gets versioned.
+        for event in db_session.query(Event).filter(
+            Event.message_id.in_(message_ids)
+        ):
+            db_session.delete(event)
+        db_session.flush()
+
+        for model in (MessageCategory, MessageContactAssociation, Part):
+            db_session.query(model).filter(
+                model.message_id.in_(message_ids)
+            ).delete(synchronize_session=False)
+        db_session.query(Message).filter(
+            Message.reply_to_message_id.in_(message_ids)
+        ).update({"reply_to_message_id": None}, synchronize_session=False)
+        db_session.query(Message).filter(Message.id.in_(message_ids)).delete(
+            synchronize_session=False
+        )
+        create_deletion_revisions(
+            db_session,
+            [
+                (
+                    "draft" if message.is_draft else "message",
+                    message.id,
+                    message.public_id,
+                    self.namespace_id,
+                    message.deleted_at,
+                )
+                for message in messages
+            ],
+        )
 
-                # Remove message from thread, so that the change to the thread
-                # gets properly versioned.
-                thread.messages.remove(message)
-                # Thread.messages relationship is versioned i.e. extra
-                # logic gets executed on remove call.
-                # This early flush is needed so the configure_versioning logic
-                # in inbox.model.sessions can work reliably on newer versions of
-                # SQLAlchemy.
-                db_session.flush()
-
-                # Also need to explicitly delete, so that message shows up in
-                # db_session.deleted.
-                db_session.delete(message)
-
-                dangling_sha256s.add(message.data_sha256)
-
-                if not thread.messages:
-                    # We don't eagerly delete empty Threads because there's a
-                    # race condition between deleting a Thread and creating a
-                    # new Message that refers to the old deleted Thread.
-                    thread.mark_for_deletion()
-                else:
-                    # TODO(emfree): This is messy. We need better
-                    # abstractions for recomputing a thread's attributes
-                    # from messages, here and in mail sync.
-                    non_draft_messages = [
-                        m for m in thread.messages if not m.is_draft
-                    ]
-                    if not non_draft_messages:
-                        continue
-                    # The value of thread.messages is ordered oldest-to-newest.
-                    first_message = non_draft_messages[0]
-                    last_message = non_draft_messages[-1]
-                    thread.subject = first_message.subject
-                    thread.subjectdate = first_message.received_date
-                    thread.recentdate = last_message.received_date
-                    thread.snippet = last_message.snippet
-                # YES this is at the right indentation level. Delete statements
-                # may cause InnoDB index locks to be acquired, so we opt to
-                # simply commit after each delete in order to prevent bulk
-                # delete scenarios from creating a long-running, blocking
-                # transaction.
-                db_session.commit()
+        self.update_threads(
+            db_session,
+            {
+                message.thread_id
+                for message in messages
+                if message.thread_id is not None
+            },
+        )
+        return {message.data_sha256 for message in messages}
 
-        delete_message_hashes(
-            self.namespace_id, self.account_id, dangling_sha256s
+    def update_threads(  # type: ignore[no-untyped-def]
+        self, db_session, thread_ids
+    ) -> None:
+        """
+        Recompute the attributes of the threads that lost messages, once per
+        thread.
+        """
+        if not thread_ids:
+            return
+
+        summarize_threads(db_session, thread_ids)
+
+        # The subject comes from the oldest non-draft message of the thread,
+        # the snippet from the most recent one.
+        date_bounds = {
+            thread_id: (subjectdate, recentdate)
+            for thread_id, subjectdate, recentdate in db_session.query(
+                Message.thread_id,
+                func.min(Message.received_date),
+                func.max(Message.received_date),
+            )
+            .filter(
+                Message.thread_id.in_(thread_ids), Message.is_draft == false()
+            )
+            .group_by(Message.thread_id)
+        }
+        bound_messages: dict[int, dict[datetime.datetime, tuple[str, str]]] = (
+            defaultdict(dict)
         )
+        for thread_id, received_date, subject, snippet in db_session.query(
+            Message.thread_id,
+            Message.received_date,
+            Message.subject,
+            Message.snippet,
+        ).filter(
+            Message.thread_id.in_(date_bounds),
+            Message.is_draft == false(),
+            Message.received_date.in_({
+                date for bounds in date_bounds.values() for date in bounds
+            }),
+        ):
+            bound_messages[thread_id].setdefault(
+                received_date, (subject, snippet)
+            )
+
+        for thread in (
+            db_session.query(Thread)
+            .filter(Thread.id.in_(thread_ids))
+            .populate_existing()
+        ):
+            # Version the removal of the messages from the thread.
+            thread.dirty = True
+            if thread.message_count == 0:
+                # We don't eagerly delete empty Threads because there's a
+                # race condition between deleting a Thread and creating a
+                # new Message that refers to the old deleted Thread.
+                thread.mark_for_deletion()
+                continue
+            if thread.id not in date_bounds:
+                continue
+            subjectdate, recentdate = date_bounds[thread.id]
+            thread.subject = bound_messages[thread.id][subjectdate][0]
+            thread.subjectdate = subjectdate
+            thread.recentdate = recentdate
+            thread.snippet = bound_messages[thread.id][recentdate][1]
 
     def gc_deleted_categories(self) -> None:
-        # Delete categories which have been deleted on the backend.
-        # Go through all the categories and check if there are messages
-        # associated with it. If not, delete it.
+        # Delete categories which have been deleted on the backend and have
+        # no messages associated with them anymore.
         with session_scope(self.namespace_id) as db_session:
             categories = db_session.query(Category).filter(
                 Category.namespace_id == self.namespace_id,
                 Category.deleted_at > EPOCH,
+                ~exists().where(MessageCategory.category_id == Category.id),
             )
-
             for category in categories:
-                # Check if no message is associated with the category. If yes,
-                # delete it.
-                count = (
-                    db_session.query(func.count(MessageCategory.id))
-                    .filter(MessageCategory.category_id == category.id)
-                    .scalar()
-                )
-
-                if count == 0:
-                    db_session.delete(category)
-                    db_session.commit()
+                db_session.delete(category)
+            db_session.commit()
 
     def gc_deleted_threads(  # type: ignore[no-untyped-def]
         self, current_time
@@ -220,6 +305,9 @@ class DeleteHandler(InterruptibleThread):
                     thread.deleted_at = None
                     db_session.commit()
                     continue
+                db_session.query(ThreadCategory).filter(
+                    ThreadCategory.thread_id == thread.id
+                ).delete(synchronize_session=False)
                 db_session.delete(thread)
                 db_session.commit()
 
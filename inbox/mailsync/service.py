@@ -21,6 +21,15 @@ from inbox.models import Account
 from inbox.models.session import global_session_scope, session_scope
 from inbox.providers import providers
 from inbox.scheduling.event_queue import EventQueue, EventQueueGroup
+from inbox.scheduling.load import (
+    BASE_ACCOUNT_COST,
+    MIN_ACCOUNT_RESIDENCY,
+    REBALANCE_INTERVAL,
+    ProcessLoadRegistry,
+    choose_account_to_release,
+    estimate_account_costs,
+    should_claim,
+)
 from inbox.util.concurrency import (
     kill_all,
     retry_with_logging,
@@ -39,6 +48,10 @@ PENDING_AVGS_THRESHOLD = 10
 
 MAX_ACCOUNTS_PER_PROCESS = config.get("MAX_ACCOUNTS_PER_PROCESS", 150)
 
+# How often (in seconds) to re-estimate the cost of the accounts we sync and
+# publish our load for the other processes in the zone.
+LOAD_REFRESH_INTERVAL = 60
+
 SYNC_EVENT_QUEUE_NAME = "sync:event_queue:{}"
 SHARED_SYNC_EVENT_QUEUE_NAME = "sync:shared_event_queue:{}"
 
@@ -133,6 +146,14 @@ class SyncService:
         self._pending_avgs_provider = None
         self.last_unloaded_account = time.time()
 
+        self.load_registry = ProcessLoadRegistry(self.zone)
+        self.account_costs: dict[int, float] = {}
+        # When accounts that aren't pinned to this process (no
+        # desired_sync_host) started syncing here; only those are moved
+        # when rebalancing.
+        self.movable_accounts_started_at: dict[int, float] = {}
+        self.last_load_refresh = 0.0
+
     def run(self) -> None:
         while self.keep_running:
             retry_with_logging(self._run_impl, self.log)
@@ -154,6 +175,7 @@ class SyncService:
         self.log.info(
             "stopped email sync monitors", count=len(self.email_sync_monitors)
         )
+        self.load_registry.remove(self.process_identifier)
 
     def _run_impl(self) -> None:
         """
@@ -164,6 +186,7 @@ class SyncService:
         self.poll()
         event = None
         while self.keep_running and event is None:
+            self.refresh_load()
             event = self.queue_group.receive_event(timeout=self.poll_interval)
 
         if not event:
@@ -196,6 +219,8 @@ class SyncService:
         # concurrency per process can result in lowered database throughput
         # or availability problems, since many transactions may be held open
         # at the same time.
+        # Within those limits, only claim accounts that keep the estimated
+        # load of this process in line with the other processes in the zone.
         pending_avgs_over_threshold = False
         if self._pending_avgs_provider is not None:
             pending_avgs = (  # type: ignore[unreachable]
@@ -205,12 +230,16 @@ class SyncService:
                 pending_avgs[15] >= PENDING_AVGS_THRESHOLD
             )
 
-        if (
-            self.stealing_enabled
-            and not pending_avgs_over_threshold
-            and len(self.syncing_accounts) < MAX_ACCOUNTS_PER_PROCESS
-        ):
-            account_id = event["id"]
+        account_id = event["id"]
+        if not self.stealing_enabled:
+            reason = "stealing disabled"
+        elif pending_avgs_over_threshold:
+            reason = "process pending avgs too high"
+        elif len(self.syncing_accounts) >= MAX_ACCOUNTS_PER_PROCESS:
+            reason = "reached max accounts for process"
+        elif not self.has_capacity_for(account_id):
+            reason = "process load too high"
+        else:
             if self.start_sync(account_id):
                 self.log.info(
                     "Claimed new unassigned account sync",
@@ -218,18 +247,96 @@ class SyncService:
                 )
             return
 
-        if not self.stealing_enabled:
-            reason = "stealing disabled"
-        elif pending_avgs_over_threshold:
-            reason = "process pending avgs too high"
-        else:
-            reason = "reached max accounts for process"
         self.log.info(
             "Not claiming new account sync, sending event back to shared queue",
             reason=reason,
         )
         shared_sync_event_queue_for_zone(self.zone).send_event(event)
 
+    @property
+    def load(self) -> float:
+        return sum(
+            self.account_costs.get(account_id, BASE_ACCOUNT_COST)
+            for account_id in self.syncing_accounts
+        )
+
+    def has_capacity_for(self, account_id: int) -> bool:
+        """
+        Whether claiming the account keeps this process' load in line with
+        the other processes in the zone.
+        """
+        try:
+            cost = estimate_account_costs([account_id])[account_id]
+            process_loads = self.load_registry.get_loads()
+        except Exception:
+            # Fall back to placing accounts by count only.
+            self.log.exception(
+                "Error estimating account load", account_id=account_id
+            )
+            return True
+        process_loads[self.process_identifier] = self.load
+        if not should_claim(self.load, cost, process_loads):
+            return False
+        self.account_costs[account_id] = cost
+        return True
+
+    def refresh_load(self) -> None:
+        if time.time() - self.last_load_refresh < LOAD_REFRESH_INTERVAL:
+            return
+        self.last_load_refresh = time.time()
+
+        try:
+            self.account_costs = estimate_account_costs(
+                sorted(self.syncing_accounts)
+            )
+            self.load_registry.publish(self.process_identifier, self.load)
+            process_loads = self.load_registry.get_loads()
+        except Exception:
+            self.log.exception("Error refreshing sync load")
+            return
+        statsd_client.gauge(
+            f"mailsync.account_load.{self.host}.mailsync-{self.process_number}.load",
+            self.load,
+        )
+        self.rebalance(process_loads)
+
+    def rebalance(self, process_loads: dict[str, float]) -> None:
+        """
+        Hand an account back to the shared queue if this process carries
+        much more load than the zone's mean, so that a less loaded process
+        picks it up.
+        """
+        now = time.time()
+        # Without stealing nobody would pick the account up again.
+        if not self.stealing_enabled:
+            return
+        if now - self.last_unloaded_account < REBALANCE_INTERVAL:
+            return
+
+        process_loads[self.process_identifier] = self.load
+        movable_account_costs = {
+            account_id: self.account_costs.get(account_id, BASE_ACCOUNT_COST)
+            for account_id, started_at in self.movable_accounts_started_at.items()
+            if now - started_at >= MIN_ACCOUNT_RESIDENCY
+        }
+        account_id = choose_account_to_release(
+            self.process_identifier, movable_account_costs, process_loads
+        )
+        if account_id is None:
+            return
+
+        self.log.info(
+            "Releasing account sync to rebalance load",
+            account_id=account_id,
+            cost=movable_account_costs[account_id],
+            load=self.load,
+        )
+        self.last_unloaded_account = now
+        try:
+            self.stop_sync(account_id)
+        except OperationalError:
+            self.log.exception("Database error stopping account sync")
+
     def poll(self) -> None:
         # Determine which accounts to sync
         start_accounts = self.account_ids_to_sync()
@@ -382,6 +489,8 @@ class SyncService:
 
                 account.sync_started()
                 self.syncing_accounts.add(account.id)
+                if account.desired_sync_host is None:
+                    self.movable_accounts_started_at[account.id] = time.time()
                 # TODO (mark): Uncomment this after we've transitioned to from statsd to brubeck
                 # statsd_client.gauge('mailsync.sync_hosts_counts.{}'.format(acc.id), 1, delta=True)
                 db_session.commit()
@@ -424,6 +533,9 @@ class SyncService:
                 self.event_sync_monitors[account_id].kill()
                 del self.event_sync_monitors[account_id]
 
+            self.movable_accounts_started_at.pop(account_id, None)
+            self.account_costs.pop(account_id, None)
+
             # Update database/heartbeat state
             with session_scope(account_id) as db_session:
                 acc = db_session.query(Account).get(account_id)
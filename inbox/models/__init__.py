@@ -32,7 +32,7 @@ from inbox.models.metadata import Metadata
 from inbox.models.namespace import Namespace
 from inbox.models.search import ContactSearchIndexCursor
 from inbox.models.secret import Secret
-from inbox.models.thread import Thread
+from inbox.models.thread import Thread, ThreadCategory
 from inbox.models.transaction import AccountTransaction, Transaction
 from inbox.models.when import Date, DateSpan, Time, TimeSpan, When
 
@@ -55,6 +55,7 @@ __all__ = [
     "ContactSearchIndexCursor",
     "Secret",
     "Thread",
+    "ThreadCategory",
     "Transaction",
     "When",
     "Time",
@@ -23,35 +23,58 @@ log = get_logger()
 def schedule_action(  # type: ignore[no-untyped-def]
     func_name, record, namespace_id, db_session, **kwargs
 ) -> None:
-    # Ensure that the record's id is non-null
+    schedule_actions(func_name, [record], namespace_id, db_session, **kwargs)
+
+
+def schedule_actions(  # type: ignore[no-untyped-def]
+    func_name, records, namespace_id, db_session, **kwargs
+) -> None:
+    """
+    Schedule the same action for each of `records`, which must all be of the
+    same table. Equivalent to calling schedule_action on each of them, but
+    with one query for all of their pending actions.
+    """
+    if not records:
+        return
+
+    # Ensure that the records' ids are non-null
     db_session.flush()
 
     account = db_session.query(Namespace).get(namespace_id).account
 
-    # Don't queue action if an existing pending action exists.
-    existing_log_entry = (
-        db_session.query(ActionLog)
+    # Don't queue an action if the latest pending action for the same record
+    # is the same.
+    latest_pending_args: dict[int, object] = {}
+    for record_id, extra_args in (
+        db_session.query(ActionLog.record_id, ActionLog.extra_args)
         .filter(
             ActionLog.discriminator == "actionlog",
             ActionLog.status == "pending",
             ActionLog.namespace_id == namespace_id,
             ActionLog.action == func_name,
-            ActionLog.record_id == record.id,
+            ActionLog.record_id.in_({record.id for record in records}),
         )
         .order_by(desc(ActionLog.id))
-        .first()
-    )
-    if existing_log_entry and existing_log_entry.extra_args == kwargs:
-        return
-
-    log_entry = account.actionlog_cls.create(
-        action=func_name,
-        table_name=record.__tablename__,
-        record_id=record.id,
-        namespace_id=namespace_id,
-        extra_args=kwargs,
-    )
-    db_session.add(log_entry)
+    ):
+        latest_pending_args.setdefault(record_id, extra_args)
+
+    for record in records:
+        if (
+            record.id in latest_pending_args
+            and latest_pending_args[record.id] == kwargs
+        ):
+            continue
+        # Also skips records that were passed more than once.
+        latest_pending_args[record.id] = kwargs
+
+        log_entry = account.actionlog_cls.create(
+            action=func_name,
+            table_name=record.__tablename__,
+            record_id=record.id,
+            namespace_id=namespace_id,
+            extra_args=kwargs,
+        )
+        db_session.add(log_entry)
 
 
 class ActionLog(MailSyncBase, UpdatedAtMixin, DeletedAtMixin):
@@ -14,16 +14,44 @@ from sqlalchemy.ext.hybrid import (  # type: ignore[import-untyped]
     Comparator,
     hybrid_property,
 )
+from sqlalchemy.orm import object_session  # type: ignore[import-untyped]
+from sqlalchemy.util import IdentitySet  # type: ignore[import-untyped]
 
 from inbox.models.constants import MAX_INDEXABLE_LENGTH
 from inbox.sqlalchemy_ext.util import ABCMixin, Base36UID, generate_public_id
 from inbox.util.addr import canonicalize_address
 from inbox.util.encoding import unicode_safe_truncate
 
+# Key in Session.info of the objects manually marked as dirty, so that the
+# flush hooks find them without looking at every object in the session.
+DIRTY_OBJECTS_KEY = "dirty_objects"
+
 
 class HasRevisions(ABCMixin):
     """Mixin for tables that should be versioned in the transaction log."""
 
+    @property
+    def dirty(self) -> bool:
+        """
+        Whether the object was manually marked as changed, e.g. because a
+        related object changed (see `propagated_attributes`).
+        """
+        return self.__dict__.get("_dirty", False)
+
+    @dirty.setter
+    def dirty(self, value: bool) -> None:
+        self.__dict__["_dirty"] = value
+        session = object_session(self)
+        if session is None:
+            return
+        dirty_objects = session.info.setdefault(
+            DIRTY_OBJECTS_KEY, IdentitySet()
+        )
+        if value:
+            dirty_objects.add(self)
+        else:
+            dirty_objects.discard(self)
+
     @property
     def versioned_relationships(self):  # type: ignore[no-untyped-def]  # noqa: ANN201
         """
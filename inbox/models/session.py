@@ -12,6 +12,7 @@ from sqlalchemy.orm.session import Session  # type: ignore[import-untyped]
 from inbox.config import config
 from inbox.ignition import engine_manager
 from inbox.logging import find_first_app_frame_and_name, get_logger
+from inbox.util.call_site import get_call_site
 from inbox.util.stats import statsd_client
 
 log = get_logger()
@@ -28,20 +29,14 @@ def new_session(  # type: ignore[no-untyped-def]  # noqa: ANN201
 
     if versioned:
         configure_versioning(session)
+        configure_thread_summaries(session)
 
-        # Make statsd calls for transaction times
+        # Make statsd calls for transaction times, attributed to the call
+        # site tagged by the entry point rather than by walking the stack.
+        # These used to be named db.<database>.<module>.<function>.
         transaction_start_map = {}
-        frame, modname = find_first_app_frame_and_name(
-            ignores=[
-                "sqlalchemy",
-                "inbox.models.session",
-                "inbox.logging",
-                "contextlib",
-            ]
-        )
-        funcname = frame.f_code.co_name
-        modname = modname.replace(".", "-")
-        metric_name = f"db.{engine.url.database}.{modname}.{funcname}"
+        call_site = get_call_site()
+        metric_name = f"db.{engine.url.database}.{call_site or 'untagged'}"
 
         @event.listens_for(session, "after_begin")
         def after_begin(  # type: ignore[no-untyped-def]
@@ -68,9 +63,23 @@ def new_session(  # type: ignore[no-untyped-def]  # noqa: ANN201
                 statsd_client.timing(metric_name, latency)
                 statsd_client.incr(metric_name)
             if latency > MAX_SANE_TRX_TIME_MS:
+                # Only walk the stack for the rare long transactions, and
+                # only when there is no tag to tell where they come from.
+                modname = funcname = None
+                if call_site is None:
+                    frame, modname = find_first_app_frame_and_name(
+                        ignores=[
+                            "sqlalchemy",
+                            "inbox.models.session",
+                            "inbox.logging",
+                            "contextlib",
+                        ]
+                    )
+                    funcname = frame.f_code.co_name
                 log.warning(
                     "Long transaction",
                     latency=latency,
+                    call_site=call_site,
                     modname=modname,
                     funcname=funcname,
                 )
@@ -78,14 +87,39 @@ def new_session(  # type: ignore[no-untyped-def]  # noqa: ANN201
     return session
 
 
+def configure_thread_summaries(session) -> None:  # type: ignore[no-untyped-def]
+    from inbox.models.thread import (
+        expire_thread_summaries,
+        update_thread_summaries,
+    )
+
+    @event.listens_for(session, "after_flush")
+    def after_flush(  # type: ignore[no-untyped-def]
+        session, flush_context
+    ) -> None:
+        update_thread_summaries(session)
+
+    @event.listens_for(session, "after_flush_postexec")
+    def after_flush_postexec(  # type: ignore[no-untyped-def]
+        session, flush_context
+    ) -> None:
+        expire_thread_summaries(session)
+
+
 def configure_versioning(session):  # type: ignore[no-untyped-def]  # noqa: ANN201
     from inbox.models.transaction import (
+        WRITTEN_NAMESPACE_IDS_KEY,
+        bump_commit_counters,
         bump_redis_txn_id,
         create_revisions,
         increment_versions,
         propagate_changes,
+        record_written_namespaces,
+        track_identity_map_order,
     )
 
+    track_identity_map_order(session)
+
     @event.listens_for(session, "before_flush")
     def before_flush(  # type: ignore[no-untyped-def]
         session, flush_context, instances
@@ -112,6 +146,18 @@ def configure_versioning(session):  # type: ignore[no-untyped-def]  # noqa: ANN2
         except Exception:
             log.exception("bump_redis_txn_id exception")
         create_revisions(session)
+        record_written_namespaces(session)
+
+    @event.listens_for(session, "after_commit")
+    def after_commit(session) -> None:  # type: ignore[no-untyped-def]
+        try:
+            bump_commit_counters(session)
+        except Exception:
+            log.exception("bump_commit_counters exception")
+
+    @event.listens_for(session, "after_rollback")
+    def after_rollback(session) -> None:  # type: ignore[no-untyped-def]
+        session.info.pop(WRITTEN_NAMESPACE_IDS_KEY, None)
 
     return session
 
@@ -3,12 +3,20 @@ import itertools
 from collections import defaultdict
 
 from sqlalchemy import (  # type: ignore[import-untyped]
+    BigInteger,
     Column,
     DateTime,
     ForeignKey,
     Index,
     Integer,
     String,
+    and_,
+    exists,
+    false,
+    func,
+    inspect,
+    select,
+    true,
 )
 from sqlalchemy.orm import (  # type: ignore[import-untyped]
     backref,
@@ -17,6 +25,8 @@ from sqlalchemy.orm import (  # type: ignore[import-untyped]
     subqueryload,
     validates,
 )
+from sqlalchemy.orm.util import identity_key  # type: ignore[import-untyped]
+from sqlalchemy.schema import UniqueConstraint  # type: ignore[import-untyped]
 
 from inbox.logging import get_logger
 from inbox.models.base import MailSyncBase
@@ -67,6 +77,13 @@ class Thread(
     snippet = Column(String(191), nullable=True, default="")
     version = Column(Integer, nullable=True, server_default="0")
 
+    # Summary of the thread's messages, drafts included, so that threads can
+    # be filtered without scanning their messages. Kept up to date on flush
+    # by `update_thread_summaries`, together with ThreadCategory.
+    message_count = Column(Integer, nullable=False, server_default="0")
+    unread_count = Column(Integer, nullable=False, server_default="0")
+    starred_count = Column(Integer, nullable=False, server_default="0")
+
     @validates("subject")
     def compute_cleaned_up_subject(  # type: ignore[no-untyped-def]  # noqa: ANN201
         self, key, value
@@ -298,3 +315,185 @@ Index(
     Thread._cleaned_subject,
     mysql_length={"_cleaned_subject": 80},
 )
+
+# For filtering threads on their summary.
+Index(
+    "ix_thread_namespace_id_unread_count",
+    Thread.namespace_id,
+    Thread.unread_count,
+)
+Index(
+    "ix_thread_namespace_id_starred_count",
+    Thread.namespace_id,
+    Thread.starred_count,
+)
+
+
+class ThreadCategory(MailSyncBase):
+    """
+    Denormalized mapping between threads and the categories of their
+    messages. Maintained by `update_thread_summaries`, not through the ORM.
+    """
+
+    thread_id = Column(BigInteger, nullable=False)
+    category_id = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "thread_id",
+            "category_id",
+            name="uq_threadcategory_thread_id_category_id",
+        ),
+    )
+
+
+Index(
+    "ix_threadcategory_category_id_thread_id",
+    ThreadCategory.category_id,
+    ThreadCategory.thread_id,
+)
+
+
+SUMMARIZED_THREADS_KEY = "summarized_thread_ids"
+
+
+def update_thread_summaries(session) -> None:  # type: ignore[no-untyped-def]
+    """
+    Called from the post-flush hook to recompute the summaries of the threads
+    whose messages were added, deleted, moved or had their read, starred or
+    category state changed in the flush.
+    """  # noqa: D401
+    from inbox.models.message import Message, MessageCategory
+
+    thread_ids = set()
+    message_ids = set()
+    # Read the loaded values, deleted objects can't load expired ones.
+    for obj in itertools.chain(session.new, session.deleted):
+        if isinstance(obj, Message):
+            thread_ids.add(inspect(obj).dict.get("thread_id"))
+        elif isinstance(obj, MessageCategory):
+            message_ids.add(inspect(obj).dict.get("message_id"))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Message):
+            continue
+        obj_state = inspect(obj)
+        thread_history = obj_state.attrs._thread.history
+        if thread_history.has_changes():
+            thread_ids.update(
+                thread.id
+                for thread in itertools.chain(
+                    thread_history.added, thread_history.deleted
+                )
+                if thread is not None
+            )
+        elif any(
+            getattr(obj_state.attrs, attr).history.has_changes()
+            for attr in obj.propagated_attributes
+        ):
+            thread_ids.add(obj.thread_id)
+
+    message_ids.discard(None)
+    if message_ids:
+        thread_ids.update(
+            thread_id
+            for (thread_id,) in session.query(Message.thread_id).filter(
+                Message.id.in_(message_ids)
+            )
+        )
+
+    thread_ids.discard(None)
+    if not thread_ids:
+        return
+
+    summarize_threads(session, thread_ids)
+    session.info.setdefault(SUMMARIZED_THREADS_KEY, set()).update(thread_ids)
+
+
+def expire_thread_summaries(session) -> None:  # type: ignore[no-untyped-def]
+    """
+    Called after a flush has completed to make threads in the session reload
+    the summaries `update_thread_summaries` rewrote behind the ORM's back.
+    """  # noqa: D401
+    thread_ids = session.info.pop(SUMMARIZED_THREADS_KEY, None)
+    if not thread_ids:
+        return
+
+    # Look the threads up by identity, the session may hold many objects.
+    for thread_id in thread_ids:
+        obj = session.identity_map.get(identity_key(Thread, thread_id))
+        if obj is not None:
+            session.expire(
+                obj, ["message_count", "unread_count", "starred_count"]
+            )
+
+
+def summarize_threads(session, thread_ids) -> None:  # type: ignore[no-untyped-def]
+    """
+    Recompute the summary columns and ThreadCategory rows of the given
+    threads from their messages.
+    """
+    from inbox.models.message import Message, MessageCategory
+
+    thread = Thread.__table__  # type: ignore[attr-defined]
+    message = Message.__table__  # type: ignore[attr-defined]
+    message_category = MessageCategory.__table__  # type: ignore[attr-defined]
+    thread_category = ThreadCategory.__table__  # type: ignore[attr-defined]
+
+    def count_messages(*criteria):  # type: ignore[no-untyped-def]
+        return (
+            select(func.count())
+            .where(and_(message.c.thread_id == thread.c.id, *criteria))
+            .scalar_subquery()
+        )
+
+    session.execute(
+        thread.update()
+        .where(thread.c.id.in_(thread_ids))
+        .values(
+            message_count=count_messages(),
+            unread_count=count_messages(message.c.is_read == false()),
+            starred_count=count_messages(message.c.is_starred == true()),
+            # A summary refresh is not a change to the thread.
+            updated_at=thread.c.updated_at,
+        )
+    )
+
+    # Only touch the rows that changed, threads rarely gain or lose a
+    # category when they gain a message.
+    current_categories = select(
+        message.c.thread_id, message_category.c.category_id
+    ).select_from(
+        message.join(
+            message_category, message_category.c.message_id == message.c.id
+        )
+    )
+    session.execute(
+        thread_category.delete().where(
+            and_(
+                thread_category.c.thread_id.in_(thread_ids),
+                ~exists(
+                    current_categories.where(
+                        and_(
+                            message.c.thread_id == thread_category.c.thread_id,
+                            message_category.c.category_id
+                            == thread_category.c.category_id,
+                        )
+                    )
+                ),
+            )
+        )
+    )
+    # Read the rows first and insert them as values, INSERT ... SELECT would
+    # take shared locks on the message and messagecategory rows it reads.
+    rows = session.execute(
+        current_categories.where(message.c.thread_id.in_(thread_ids)).distinct()
+    ).fetchall()
+    if rows:
+        session.execute(
+            thread_category.insert().prefix_with("IGNORE"),
+            [
+                {"thread_id": thread_id, "category_id": category_id}
+                for thread_id, category_id in rows
+            ],
+        )
@@ -1,22 +1,39 @@
+import itertools
+
 from sqlalchemy import (  # type: ignore[import-untyped]
     BigInteger,
     Column,
     Enum,
     Index,
     String,
+    event,
     func,
     inspect,
 )
 from sqlalchemy.orm import relationship  # type: ignore[import-untyped]
+from sqlalchemy.util import IdentitySet  # type: ignore[import-untyped]
 
 from inbox.ignition import redis_txn
 from inbox.models.base import MailSyncBase
 from inbox.models.category import EPOCH
-from inbox.models.mixins import HasPublicID, HasRevisions
+from inbox.models.mixins import DIRTY_OBJECTS_KEY, HasPublicID, HasRevisions
 from inbox.models.namespace import Namespace
 
 TXN_REDIS_KEY = "latest-txn-by-namespace"
 
+# Counter of the commits that wrote to the transaction log of a namespace.
+# Unlike transaction ids, it's bumped after the commit, so it changes after
+# every change of the namespace becomes visible.
+COMMIT_COUNTER_REDIS_KEY = "txn-commits-by-namespace:{}"
+
+# Key in Session.info of the ids of the namespaces whose transaction log
+# the session wrote to since it last committed.
+WRITTEN_NAMESPACE_IDS_KEY = "written_namespace_ids"
+
+# Key in an object's __dict__ of its position in the identity map of its
+# session, see track_identity_map_order().
+IDENTITY_MAP_ORDER_KEY = "_identity_map_order"
+
 
 class Transaction(MailSyncBase, HasPublicID):
     """Transactional log to enable client syncing."""
@@ -73,16 +90,62 @@ Index(
 )
 
 
-def is_dirty(session, obj) -> bool:  # type: ignore[no-untyped-def]
-    if obj in session.dirty and obj.has_versioned_changes():
+def is_dirty(session, obj, dirty=None) -> bool:  # type: ignore[no-untyped-def]
+    if dirty is None:
+        dirty = session.dirty
+    if obj in dirty and obj.has_versioned_changes():
         return True
     if hasattr(obj, "dirty") and obj.dirty:
         return True
     return False
 
 
+def track_identity_map_order(session) -> None:  # type: ignore[no-untyped-def]
+    """
+    Record the order in which objects enter the session's identity map, so
+    that changed objects can be put in identity map order without iterating
+    over the identity map.
+    """
+    counter = itertools.count()
+
+    def number(session, instance) -> None:  # type: ignore[no-untyped-def]
+        instance.__dict__[IDENTITY_MAP_ORDER_KEY] = next(counter)
+
+    for identifier in (
+        "loaded_as_persistent",
+        "pending_to_persistent",
+        "detached_to_persistent",
+        "deleted_to_persistent",
+    ):
+        event.listen(session, identifier, number)
+
+
+def changed_objects(session, dirty, deleted) -> list[object]:  # type: ignore[no-untyped-def]
+    """
+    Return the persistent objects of the session that may need a revision:
+    those SQLAlchemy tracks as modified or deleted, and those manually
+    marked as dirty. They are returned in identity map order, so that
+    transactions are created in the same order as when looking at every
+    object in the session.
+    """
+    new = session.new
+    changed = IdentitySet(dirty)
+    changed.update(deleted)
+    changed.update(
+        obj
+        for obj in session.info.get(DIRTY_OBJECTS_KEY, ())
+        if obj in session and obj not in new
+    )
+    return sorted(
+        changed, key=lambda obj: obj.__dict__.get(IDENTITY_MAP_ORDER_KEY, -1)
+    )
+
+
 def create_revisions(session) -> None:  # type: ignore[no-untyped-def]
-    for obj in session:
+    dirty = session.dirty
+    deleted = session.deleted
+    new = list(session.new)
+    for obj in new + changed_objects(session, dirty, deleted):
         if (
             not isinstance(obj, HasRevisions)
             or obj.should_suppress_transaction_creation
@@ -90,15 +153,15 @@ def create_revisions(session) -> None:  # type: ignore[no-untyped-def]
             continue
         if obj in session.new:
             create_revision(obj, session, "insert")
-        elif is_dirty(session, obj):
+        elif is_dirty(session, obj, dirty):
             # Need to unmark the object as 'dirty' to prevent an infinite loop
             # (the pre-flush hook may be called again before a commit
             # occurs). This emulates what happens to objects in session.dirty,
             # in that they are no longer present in the set during the next
             # invocation of the pre-flush hook.
-            obj.dirty = False  # type: ignore[attr-defined]
+            obj.dirty = False
             create_revision(obj, session, "update")
-        elif obj in session.deleted:
+        elif obj in deleted:
             create_revision(obj, session, "delete")
 
 
@@ -150,6 +213,31 @@ def create_revision(  # type: ignore[no-untyped-def]
         session.add(revision)
 
 
+def create_deletion_revisions(  # type: ignore[no-untyped-def]
+    session, rows
+) -> None:
+    """
+    Log the deletion of objects removed with bulk DELETE statements, which
+    bypass the versioning hooks. `rows` are (object_type, record_id,
+    public_id, namespace_id, deleted_at) tuples.
+    """
+    for object_type, record_id, public_id, namespace_id, deleted_at in rows:
+        session.add(
+            Transaction(  # type: ignore[call-arg]
+                command="delete",
+                record_id=record_id,
+                object_type=object_type,
+                object_public_id=public_id,
+                namespace_id=namespace_id,
+                created_at=(
+                    deleted_at
+                    if deleted_at not in (None, EPOCH)
+                    else func.now()
+                ),
+            )
+        )
+
+
 def propagate_changes(session) -> None:  # type: ignore[no-untyped-def]
     """
     Mark an object's related object as dirty when certain attributes of the
@@ -175,11 +263,14 @@ def increment_versions(session) -> None:  # type: ignore[no-untyped-def]
     from inbox.models.metadata import Metadata
     from inbox.models.thread import Thread
 
-    for obj in session:
-        if isinstance(obj, Thread) and is_dirty(session, obj):
+    dirty = session.dirty
+    for obj in list(session.new) + changed_objects(
+        session, dirty, session.deleted
+    ):
+        if isinstance(obj, Thread) and is_dirty(session, obj, dirty):
             # This issues SQL for an atomic increment.
             obj.version = Thread.version + 1
-        if isinstance(obj, Metadata) and is_dirty(session, obj):
+        if isinstance(obj, Metadata) and is_dirty(session, obj, dirty):
             # This issues SQL for an atomic increment.
             obj.version = Metadata.version + 1  # TODO what's going on here?
 
@@ -198,8 +289,39 @@ def bump_redis_txn_id(session) -> None:  # type: ignore[no-untyped-def]
 
     mappings = {
         get_namespace_public_id(obj.namespace_id): obj.id
-        for obj in session
-        if (obj in session.new and isinstance(obj, Transaction) and obj.id)
+        for obj in session.new
+        if (isinstance(obj, Transaction) and obj.id)
     }
     if mappings:
         redis_txn.zadd(TXN_REDIS_KEY, mapping=mappings)
+
+
+def record_written_namespaces(session) -> None:  # type: ignore[no-untyped-def]
+    """
+    Called from the post-flush hook to remember the namespaces whose
+    transaction log the session wrote to.
+    """  # noqa: D401
+    session.info.setdefault(WRITTEN_NAMESPACE_IDS_KEY, set()).update(
+        obj.namespace_id for obj in session.new if isinstance(obj, Transaction)
+    )
+
+
+def bump_commit_counters(session) -> None:  # type: ignore[no-untyped-def]
+    """
+    Called from the after-commit hook to bump the commit counters of the
+    namespaces whose transaction log the commit wrote to.
+    """  # noqa: D401
+    namespace_ids = session.info.pop(WRITTEN_NAMESPACE_IDS_KEY, None)
+    if not namespace_ids:
+        return
+
+    pipeline = redis_txn.pipeline()
+    for namespace_id in namespace_ids:
+        pipeline.incr(COMMIT_COUNTER_REDIS_KEY.format(namespace_id))
+    pipeline.execute()
+
+
+def get_commit_counter(namespace_id: int) -> int:
+    """Get the number of commits that wrote to a namespace's log."""
+    counter = redis_txn.get(COMMIT_COUNTER_REDIS_KEY.format(namespace_id))
+    return int(counter or 0)  # type: ignore[arg-type]
@@ -1,13 +1,24 @@
-import math
+import contextlib
+import contextvars
+import functools
+import threading
 import time
 from collections import OrderedDict
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 import limitlion  # type: ignore[import-untyped]
-from sqlalchemy import desc, func  # type: ignore[import-untyped]
+from sqlalchemy import (  # type: ignore[import-untyped]
+    Column,
+    desc,
+    func,
+    or_,
+)
 from sqlalchemy.orm import Session  # type: ignore[import-untyped]
 from sqlalchemy.orm.exc import NoResultFound  # type: ignore[import-untyped]
 
+from inbox.config import config
 from inbox.heartbeat.status import clear_heartbeat_status
 from inbox.ignition import redis_txn
 from inbox.logging import get_logger
@@ -23,13 +34,187 @@ CHUNK_SIZE = 100
 
 log = get_logger()
 
-# Use a single throttle instance for rate limiting.  Limits will be applied
-# across all db shards (same approach as the original check_throttle()).
-bulk_throttle = limitlion.throttle_wait("bulk", rps=0.75, window=5)
+# Bulk deletions are rate limited per db shard, across all the threads and
+# processes deleting from it.
+DELETION_SHARD_RPS = config.get("ACCOUNT_DELETION_SHARD_RPS", 0.75)
+_shard_throttles: dict[int, Callable[[], None]] = {}
+_shard_throttles_lock = threading.Lock()
+
+# Number of deletion steps of an account (mostly tables) run concurrently.
+DELETION_CONCURRENCY = config.get("ACCOUNT_DELETION_CONCURRENCY", 4)
+# Number of messages or blocks whose data is deleted from the blockstore at
+# once.
+BLOCKSTORE_BATCH_SIZE = 1000
+# Checkpoints of in progress account deletions, see DeletionProgress.
+DELETION_PROGRESS_KEY = "account-deletion:{}"
+DELETION_PROGRESS_TTL = 30 * 24 * 60 * 60
+
+# Maximum number of keys kept in a MessageDedupeIndex. Entries are only
+# (key, message id) pairs so this stays small even for the biggest accounts.
+DEDUPE_INDEX_MAX_SIZE = 50000
+
+
+class MessageDedupeIndex:
+    """
+    Per-account map of data_sha256 and g_msgid values to the ids of
+    Messages that were already saved for them.
+
+    Sync warms the index with a single query per download batch (see
+    `batch`), so that reconciling each downloaded message doesn't need its
+    own round trip. Keys that `batch` looked up and didn't find are
+    remembered as misses for the duration of the batch only; callers must
+    hold the account's syncmanager lock for the whole batch so no other
+    sync thread can create a matching message in the meantime.
+
+    The index is only a hint. Outside of a batch cached ids are loaded by
+    primary key and if the message is gone we fall back to querying the
+    database.
+    """
+
+    def __init__(
+        self, namespace_id: int, max_size: int = DEDUPE_INDEX_MAX_SIZE
+    ) -> None:
+        self.namespace_id = namespace_id
+        self.max_size = max_size
+        self._ids: OrderedDict[tuple[str, str | int], int] = OrderedDict()
+        # Messages loaded by the current batch, and keys it didn't find.
+        self._loaded: dict[tuple[str, str | int], Message] = {}
+        self._misses: set[tuple[str, str | int]] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _remember(self, key: tuple[str, str | int], message_id: int) -> None:
+        with self._lock:
+            self._misses.discard(key)
+            self._ids[key] = message_id
+            self._ids.move_to_end(key)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def _forget(self, key: tuple[str, str | int]) -> None:
+        with self._lock:
+            self._ids.pop(key, None)
+            self._loaded.pop(key, None)
+
+    def add(self, message: Message) -> None:
+        """Record a message that was just flushed to the database."""
+        assert message.id is not None
+        for key in self._keys(message.data_sha256, message.g_msgid):
+            self._remember(key, message.id)
+
+    @staticmethod
+    def _keys(
+        data_sha256: str | None, g_msgid: int | None
+    ) -> list[tuple[str, str | int]]:
+        keys: list[tuple[str, str | int]] = []
+        if data_sha256 is not None:
+            keys.append(("data_sha256", data_sha256))
+        if g_msgid is not None:
+            keys.append(("g_msgid", int(g_msgid)))
+        return keys
+
+    @contextlib.contextmanager
+    def batch(
+        self,
+        session: Session,
+        data_sha256s: Iterable[str] = (),
+        g_msgids: Iterable[int | None] = (),
+    ) -> Iterator["MessageDedupeIndex"]:
+        """
+        Load the messages matching all the given keys with a single query.
+        Known keys are loaded by id, and keys without a message are treated
+        as misses until the block exits.
+        """
+        keys = {("data_sha256", sha) for sha in data_sha256s} | {
+            ("g_msgid", int(g_msgid))
+            for g_msgid in g_msgids
+            if g_msgid is not None
+        }
+        known_ids = {self._ids[key] for key in keys if key in self._ids}
+        unknown_shas = {
+            value
+            for kind, value in keys
+            if kind == "data_sha256" and (kind, value) not in self._ids
+        }
+        unknown_g_msgids = {
+            value
+            for kind, value in keys
+            if kind == "g_msgid" and (kind, value) not in self._ids
+        }
+        clauses = []
+        if known_ids:
+            clauses.append(Message.id.in_(known_ids))
+        if unknown_shas:
+            clauses.append(Message.data_sha256.in_(unknown_shas))
+        if unknown_g_msgids:
+            clauses.append(Message.g_msgid.in_(unknown_g_msgids))
+        if clauses:
+            messages = (
+                session.query(Message)
+                .filter(
+                    Message.namespace_id == self.namespace_id, or_(*clauses)
+                )
+                .order_by(Message.id)
+            )
+            # Keep the oldest message for each key, like the unordered
+            # per-message queries this replaces would in practice.
+            for message in messages:
+                for key in self._keys(message.data_sha256, message.g_msgid):
+                    if key in keys and key not in self._loaded:
+                        self._loaded[key] = message
+                        self._remember(key, message.id)
+            with self._lock:
+                self._misses.update(keys - self._loaded.keys())
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._loaded.clear()
+                self._misses.clear()
+
+    def _get(
+        self, session: Session, key: tuple[str, str | int], column: Column
+    ) -> Message | None:
+        if key in self._loaded:
+            return self._loaded[key]
+        if key in self._misses:
+            return None
+
+        message_id = self._ids.get(key)
+        if message_id is not None:
+            message = session.query(Message).get(message_id)
+            if message is not None:
+                return message
+            self._forget(key)
+
+        message = (
+            session.query(Message)
+            .filter(
+                Message.namespace_id == self.namespace_id, column == key[1]
+            )
+            .first()
+        )
+        if message is not None and message.id is not None:
+            self._remember(key, message.id)
+        return message
+
+    def get_by_data_sha256(
+        self, session: Session, data_sha256: str
+    ) -> Message | None:
+        return self._get(
+            session, ("data_sha256", data_sha256), Message.data_sha256
+        )
+
+    def get_by_g_msgid(self, session: Session, g_msgid: int) -> Message | None:
+        return self._get(session, ("g_msgid", int(g_msgid)), Message.g_msgid)
 
 
 def reconcile_message(
-    new_message: Message, session: Session
+    new_message: Message,
+    session: Session,
+    dedupe_index: MessageDedupeIndex | None = None,
 ) -> Message | None:
     """
     Check to see if the (synced) Message instance new_message was originally
@@ -37,10 +222,17 @@ def reconcile_message(
     update the existing message with new attributes from the synced message
     and return it.
 
+    If a `dedupe_index` is given, it is used to look up messages by
+    data_sha256 instead of querying the database for every message.
+
     """
     from inbox.models.message import Message
 
     if new_message.nylas_uid is None:
+        if dedupe_index is not None:
+            return dedupe_index.get_by_data_sha256(
+                session, new_message.data_sha256
+            )
         # try to reconcile using other means
         q = session.query(Message).filter(
             Message.namespace_id == new_message.namespace_id,
@@ -159,6 +351,59 @@ def batch_delete_namespaces(  # type: ignore[no-untyped-def]
     )
 
 
+class DeletionProgress:
+    """
+    Checkpoints of a namespace deletion, kept in Redis so that a deletion
+    that gets interrupted resumes where it stopped instead of starting over.
+    Every step is idempotent, so losing the checkpoints only costs time.
+    """
+
+    def __init__(self, namespace_id: int, dry_run: bool = False) -> None:
+        self.key = DELETION_PROGRESS_KEY.format(namespace_id)
+        self.dry_run = dry_run
+
+    def _set(self, field: str, value: str | int) -> None:
+        if self.dry_run:
+            return
+        pipeline = redis_txn.pipeline()
+        pipeline.hset(self.key, field, str(value))
+        pipeline.expire(self.key, DELETION_PROGRESS_TTL)
+        pipeline.execute()
+
+    def _get(self, field: str) -> bytes | None:
+        return redis_txn.hget(self.key, field)  # type: ignore[return-value]
+
+    def is_done(self, step: str) -> bool:
+        return self._get(step) == b"done"
+
+    def mark_done(self, step: str) -> None:
+        self._set(step, "done")
+
+    def get_cursor(self, step: str) -> int:
+        cursor = self._get(f"{step}:cursor")
+        return int(cursor) if cursor is not None else 0
+
+    def set_cursor(self, step: str, cursor: int) -> None:
+        self._set(f"{step}:cursor", cursor)
+
+    def clear(self) -> None:
+        if not self.dry_run:
+            redis_txn.delete(self.key)
+
+
+def shard_throttle(shard_id: int) -> Callable[[], None]:
+    """
+    Return the throttle for bulk deletions on the given shard, shared by all
+    the threads deleting from it.
+    """
+    with _shard_throttles_lock:
+        if shard_id not in _shard_throttles:
+            _shard_throttles[shard_id] = limitlion.throttle_wait(
+                f"bulk:{shard_id}", rps=DELETION_SHARD_RPS, window=5
+            )
+        return _shard_throttles[shard_id]
+
+
 def delete_namespace(  # type: ignore[no-untyped-def]
     namespace_id, throttle: bool = False, dry_run: bool = False
 ) -> None:
@@ -195,49 +440,125 @@ def delete_namespace(  # type: ignore[no-untyped-def]
     log.info("Deleting account", account_id=account_id)
     start_time = time.time()
 
-    # These folders are used to configure batch deletion in chunks for
-    # specific tables that are prone to transaction blocking during
-    # large concurrent write volume.  See _batch_delete
-    # NOTE: ImapFolderInfo doesn't reall fall into this category but
-    # we include here for simplicity anyway.
-
-    filters = OrderedDict()
-    for table in [
-        "message",
-        "block",
-        "thread",
-        "transaction",
-        "actionlog",
-        "event",
-        "contact",
-        "dataprocessingcache",
-    ]:
-        filters[table] = ("namespace_id", namespace_id)
-
-    if account_discriminator == "easaccount":
-        filters["easuid"] = ("easaccount_id", account_id)
-        filters["easfoldersyncstatus"] = ("account_id", account_id)
-    else:
-        filters["imapuid"] = ("account_id", account_id)
-        filters["imapfoldersyncstatus"] = ("account_id", account_id)
-        filters["imapfolderinfo"] = ("account_id", account_id)
-
     from inbox.ignition import engine_manager
 
     # Bypass the ORM for performant bulk deletion;
     # we do /not/ want Transaction records created for these deletions,
     # so this is okay.
     engine = engine_manager.get_for_id(namespace_id)
+    shard_id = engine_manager.shard_key_for_id(namespace_id)
+    progress = DeletionProgress(namespace_id, dry_run=dry_run)
 
-    for cls in filters:
-        _batch_delete(
+    def delete_rows(table, column, id_):  # type: ignore[no-untyped-def]
+        return functools.partial(
+            _batch_delete,
             engine,
-            cls,
-            filters[cls],
+            table,
+            column,
+            id_,
+            shard_id,
+            throttle,
+            dry_run,
+        )
+
+    def delete_blobs(model):  # type: ignore[no-untyped-def]
+        return functools.partial(
+            _delete_blobs,
+            model,
+            namespace_id,
             account_id,
-            throttle=throttle,
-            dry_run=dry_run,
+            progress,
+            shard_id,
+            throttle,
+            dry_run,
+        )
+
+    def delete_child_rows(table, column, parent):  # type: ignore[no-untyped-def]
+        return functools.partial(
+            _batch_delete_children,
+            engine,
+            table,
+            column,
+            parent,
+            namespace_id,
+            shard_id,
+            throttle,
+            dry_run,
+        )
+
+    # Deleting events cascades to eventcontactassociation, which also refers
+    # to contacts. Delete it on its own first so that the concurrent event
+    # and contact deletions below don't contend on it.
+    _run_deletion_steps(
+        progress,
+        [
+            (
+                "eventcontactassociation",
+                delete_child_rows("eventcontactassociation", "event_id", "event"),
+            )
+        ],
+    )
+
+    # These tables are deleted from in chunks since they are prone to
+    # transaction blocking during large concurrent write volume. They don't
+    # depend on each other, so they are deleted from concurrently.
+    # NOTE: ImapFolderInfo doesn't reall fall into this category but
+    # we include here for simplicity anyway.
+    steps = [
+        (table, delete_rows(table, "namespace_id", namespace_id))
+        for table in (
+            "transaction",
+            "actionlog",
+            "event",
+            "contact",
+            "dataprocessingcache",
         )
+    ]
+    if account_discriminator == "easaccount":
+        steps.append((
+            "easuid",
+            delete_rows("easuid", "easaccount_id", account_id),
+        ))
+        steps.append((
+            "easfoldersyncstatus",
+            delete_rows("easfoldersyncstatus", "account_id", account_id),
+        ))
+    else:
+        for table in ("imapuid", "imapfoldersyncstatus", "imapfolderinfo"):
+            steps.append((table, delete_rows(table, "account_id", account_id)))
+
+    # The blockstore objects of messages and blocks are deleted alongside,
+    # in batches, while the rows referencing them still exist. The rows
+    # themselves go once that is done, and threads go last since deleting a
+    # thread cascades to its messages.
+    steps.append(("blockstore_message", delete_blobs(Message)))
+    steps.append(("blockstore_block", delete_blobs(Block)))
+    _run_deletion_steps(progress, steps)
+    _run_deletion_steps(
+        progress,
+        [
+            (
+                "message",
+                functools.partial(
+                    _delete_messages,
+                    namespace_id,
+                    account_id,
+                    shard_id,
+                    throttle,
+                    dry_run,
+                ),
+            ),
+            ("block", delete_rows("block", "namespace_id", namespace_id)),
+            (
+                "threadcategory",
+                delete_child_rows("threadcategory", "thread_id", "thread"),
+            ),
+        ],
+    )
+    _run_deletion_steps(
+        progress,
+        [("thread", delete_rows("thread", "namespace_id", namespace_id))],
+    )
 
     # Use a single delete for the other tables. Rows from tables which contain
     # cascade-deleted foreign keys to other tables deleted here (or above)
@@ -260,7 +581,7 @@ def delete_namespace(  # type: ignore[no-untyped-def]
         start = time.time()
 
         if throttle:
-            bulk_throttle()
+            shard_throttle(shard_id)()
 
         if not dry_run:
             engine.execute(query.format(table, column, id_))
@@ -281,114 +602,226 @@ def delete_namespace(  # type: ignore[no-untyped-def]
     # Delete liveness data ( heartbeats)
     log.debug("Deleting liveness data", account_id=account_id)
     clear_heartbeat_status(account_id)
+    progress.clear()
 
     statsd_client.timing(
         "mailsync.account_deletion.queue.deleted", time.time() - start_time
     )
 
 
+def _run_deletion_steps(
+    progress: DeletionProgress, steps: list[tuple[str, Callable[[], int]]]
+) -> None:
+    """
+    Run the steps that haven't completed yet concurrently, and raise the
+    first error once they have all finished.
+    """
+    with ThreadPoolExecutor(max_workers=DELETION_CONCURRENCY) as executor:
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                _run_deletion_step,
+                progress,
+                step,
+                delete,
+            )
+            for step, delete in steps
+        ]
+    for future in futures:
+        future.result()
+
+
+def _run_deletion_step(
+    progress: DeletionProgress, step: str, delete: Callable[[], int]
+) -> None:
+    if progress.is_done(step):
+        log.info("Skipping completed deletion step", step=step)
+        return
+
+    log.info("Starting deletion step", step=step)
+    start = time.time()
+    count = delete()
+    elapsed = time.time() - start
+    rows_per_second = count / elapsed if elapsed > 0 else float(count)
+    log.info(
+        "Completed deletion step",
+        step=step,
+        count=count,
+        time=elapsed,
+        rows_per_second=rows_per_second,
+    )
+    statsd_client.gauge(
+        f"mailsync.account_deletion.rows_per_second.{step}", rows_per_second
+    )
+    progress.mark_done(step)
+
+
 def _batch_delete(  # type: ignore[no-untyped-def]
     engine,
     table,
-    column_id_filters,
-    account_id,
+    column,
+    id_,
+    shard_id,
     throttle: bool = False,
     dry_run: bool = False,
-) -> None:
-    (column, id_) = column_id_filters
-    count = engine.execute(
+) -> int:
+    """Delete the matching rows of a table in chunks, return their count."""
+    if dry_run:
+        count = engine.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE {column}={id_};"  # noqa: S608
+        ).scalar()
+        log.debug(
+            f"DELETE FROM {table} WHERE {column}={id_};",  # noqa: S608
+            count=count,
+        )
+        return count
+
+    query = f"DELETE FROM {table} WHERE {column}={id_} LIMIT {CHUNK_SIZE};"  # noqa: S608
+    count = 0
+    while True:
+        if throttle:
+            shard_throttle(shard_id)()
+        deleted = engine.execute(query).rowcount
+        count += deleted
+        if deleted < CHUNK_SIZE:
+            break
+
+    remaining = engine.execute(
         f"SELECT COUNT(*) FROM {table} WHERE {column}={id_};"  # noqa: S608
     ).scalar()
+    assert remaining == 0
+    return count
 
-    if count == 0:
-        log.info("Completed batch deletion", table=table)
-        return
-
-    batches = int(math.ceil(float(count) / CHUNK_SIZE))
 
-    log.info(
-        "Starting batch deletion", table=table, count=count, batches=batches
+def _batch_delete_children(  # type: ignore[no-untyped-def]
+    engine,
+    table,
+    column,
+    parent,
+    namespace_id,
+    shard_id,
+    throttle: bool = False,
+    dry_run: bool = False,
+) -> int:
+    """
+    Delete in chunks the rows of a table whose `column` refers to a row of
+    `parent` in the namespace, return their count. For tables that have no
+    namespace_id of their own.
+    """
+    join = (
+        f"FROM {table} JOIN {parent} ON {table}.{column}={parent}.id "
+        f"WHERE {parent}.namespace_id={namespace_id}"
     )
-    start = time.time()
+    if dry_run:
+        count = engine.execute(f"SELECT COUNT(*) {join};").scalar()  # noqa: S608
+        log.debug(f"DELETE {table} {join};", count=count)  # noqa: S608
+        return count
+
+    # MySQL doesn't support LIMIT on multi-table deletes, so look the rows up
+    # first.
+    query = f"SELECT {table}.id {join} LIMIT {CHUNK_SIZE};"  # noqa: S608
+    count = 0
+    while True:
+        if throttle:
+            shard_throttle(shard_id)()
+        ids = [id_ for (id_,) in engine.execute(query)]
+        if ids:
+            engine.execute(
+                f"DELETE FROM {table} WHERE id IN "  # noqa: S608
+                f"({', '.join(str(id_) for id_ in ids)});"
+            )
+        count += len(ids)
+        if len(ids) < CHUNK_SIZE:
+            break
 
-    if table in ("message", "block"):
-        query = ""
-    else:
-        query = f"DELETE FROM {table} WHERE {column}={id_} LIMIT {CHUNK_SIZE};"  # noqa: S608
+    remaining = engine.execute(f"SELECT COUNT(*) {join};").scalar()  # noqa: S608
+    assert remaining == 0
+    return count
 
-    log.info("deleting", account_id=account_id, table=table)
 
-    for _ in range(batches):
+def _delete_messages(  # type: ignore[no-untyped-def]
+    namespace_id,
+    account_id,
+    shard_id,
+    throttle: bool = False,
+    dry_run: bool = False,
+) -> int:
+    count = 0
+    while True:
         if throttle:
-            bulk_throttle()
-
-        if table == "block":
-            with session_scope(account_id) as db_session:
-                blocks = list(
-                    db_session.query(Block.id, Block.data_sha256)
-                    .filter(Block.namespace_id == id_)
-                    .limit(CHUNK_SIZE)
+            shard_throttle(shard_id)()
+
+        with session_scope(account_id) as db_session:
+            # messages must be order by the foreign key `received_date`
+            # otherwise MySQL will raise an error when deleting
+            # from the message table
+            message_query = (
+                db_session.query(Message.id)
+                .filter(Message.namespace_id == namespace_id)
+                .order_by(desc(Message.received_date))
+                .with_hint(
+                    Message,
+                    "use index (ix_message_namespace_id_received_date)",
                 )
-            blocks = list(blocks)
-            block_ids = [b[0] for b in blocks]
-            block_hashes = [b[1] for b in blocks]
-
-            # XXX: We currently don't check for existing blocks.
-            if dry_run is False:
-                delete_from_blockstore(*block_hashes)
+            )
+            if dry_run:
+                return message_query.count()
+
+            message_ids = [
+                message_id for (message_id,) in message_query.limit(CHUNK_SIZE)
+            ]
+            if not message_ids:
+                return count
+            db_session.query(Message).filter(
+                Message.id.in_(message_ids)
+            ).delete(synchronize_session=False)
+            db_session.commit()
+        count += len(message_ids)
 
-            with session_scope(account_id) as db_session:
-                block_query = db_session.query(Block).filter(
-                    Block.id.in_(block_ids)
-                )
-                if dry_run is False:
-                    block_query.delete(synchronize_session=False)
-
-        elif table == "message":
-            with session_scope(account_id) as db_session:
-                # messages must be order by the foreign key `received_date`
-                # otherwise MySQL will raise an error when deleting
-                # from the message table
-                messages = list(
-                    db_session.query(Message.id, Message.data_sha256)
-                    .filter(Message.namespace_id == id_)
-                    .order_by(desc(Message.received_date))
-                    .limit(CHUNK_SIZE)
-                    .with_hint(
-                        Message,
-                        "use index (ix_message_namespace_id_received_date)",
-                    )
-                )
 
-            message_ids = [m[0] for m in messages]
-            message_hashes = [m[1] for m in messages]
+def _delete_blobs(  # type: ignore[no-untyped-def]
+    model,
+    namespace_id,
+    account_id,
+    progress,
+    shard_id,
+    throttle: bool = False,
+    dry_run: bool = False,
+) -> int:
+    """
+    Delete the blockstore objects of a namespace's messages or blocks, in
+    id order from the last checkpoint. Returns the number of rows handled.
+    """
+    step = f"blockstore_{model.__tablename__}"
+    cursor = progress.get_cursor(step)
+    count = 0
+    while True:
+        if throttle:
+            shard_throttle(shard_id)()
+
+        with session_scope(account_id) as db_session:
+            rows = (
+                db_session.query(model.id, model.data_sha256)
+                .filter(model.namespace_id == namespace_id, model.id > cursor)
+                .order_by(model.id)
+                .limit(BLOCKSTORE_BATCH_SIZE)
+                .all()
+            )
+        if not rows:
+            return count
 
+        data_sha256s = [data_sha256 for (_, data_sha256) in rows]
+        if model is Message:
             delete_message_hashes(
-                id_, account_id, message_hashes, dry_run=dry_run
+                namespace_id, account_id, data_sha256s, dry_run=dry_run
             )
+        # XXX: We currently don't check for existing blocks.
+        elif dry_run is False:
+            delete_from_blockstore(*data_sha256s)
 
-            with session_scope(account_id) as db_session:
-                message_query = db_session.query(Message).filter(
-                    Message.id.in_(message_ids)
-                )
-                if dry_run is False:
-                    message_query.delete(synchronize_session=False)
-
-        else:
-            if dry_run is False:
-                engine.execute(query)
-            else:
-                log.debug(query)
-
-    end = time.time()
-    log.info("Completed batch deletion", time=end - start, table=table)
-
-    count = engine.execute(
-        f"SELECT COUNT(*) FROM {table} WHERE {column}={id_};"  # noqa: S608
-    ).scalar()
-
-    if dry_run is False:
-        assert count == 0
+        cursor = rows[-1][0]
+        progress.set_cursor(step, cursor)
+        count += len(rows)
 
 
 def check_throttle() -> bool:
@@ -402,6 +835,187 @@ def check_throttle() -> bool:
     return True
 
 
+# Default number of transaction ids per partition when the transaction table
+# is range-partitioned by id.
+TRANSACTION_PARTITION_SIZE = 10_000_000
+# Name of the catch-all partition above the highest bounded one.
+TRANSACTION_MAXVALUE_PARTITION = "pmax"
+
+
+def get_transaction_partitions(
+    db_session: Session,
+) -> list[tuple[str, int | None]]:
+    """
+    Return the partitions of the transaction table in order, as pairs of
+    (name, exclusive upper id bound), with a None bound for the MAXVALUE
+    partition. Returns an empty list if the table isn't partitioned.
+    """
+    rows = db_session.execute(
+        "SELECT PARTITION_NAME, PARTITION_DESCRIPTION "
+        "FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'transaction' "
+        "AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION"
+    ).fetchall()
+    return [
+        (name, None if bound == "MAXVALUE" else int(bound))
+        for name, bound in rows
+    ]
+
+
+def _transaction_partition_definition(upper_bound: int | None) -> str:
+    if upper_bound is None:
+        return (
+            f"PARTITION {TRANSACTION_MAXVALUE_PARTITION} "
+            "VALUES LESS THAN MAXVALUE"
+        )
+    return f"PARTITION p{upper_bound} VALUES LESS THAN ({upper_bound})"
+
+
+def _execute_partition_ddl(
+    db_session: Session, statement: str, dry_run: bool
+) -> None:
+    log.info(
+        "Transaction partition maintenance",
+        statement=statement,
+        dry_run=dry_run,
+    )
+    if not dry_run:
+        db_session.execute(statement)
+
+
+def partition_transaction_table(
+    shard_id: int,
+    partition_size: int = TRANSACTION_PARTITION_SIZE,
+    ahead: int = 2,
+    dry_run: bool = False,
+) -> None:
+    """
+    Convert the transaction table of a shard to a layout range-partitioned
+    by id. All existing rows end up in the first partition, followed by
+    `ahead` empty partitions of `partition_size` ids and a catch-all
+    MAXVALUE partition.
+
+    This rebuilds the table, so it should be run during a maintenance
+    window. Afterwards expired transactions are removed by dropping whole
+    partitions; see drop_expired_transaction_partitions.
+    """
+    with session_scope_by_shard_id(shard_id, versioned=False) as db_session:
+        if get_transaction_partitions(db_session):
+            log.info(
+                "Transaction table already partitioned", shard_id=shard_id
+            )
+            return
+
+        (max_id,) = db_session.query(func.max(Transaction.id)).one()
+        if max_id is None:
+            max_id = shard_id << 48
+        first_bound = (max_id // partition_size + 1) * partition_size
+        bounds: list[int | None] = [
+            first_bound + i * partition_size for i in range(ahead + 1)
+        ]
+        definitions = ", ".join(
+            _transaction_partition_definition(bound)
+            for bound in [*bounds, None]
+        )
+        _execute_partition_ddl(
+            db_session,
+            f"ALTER TABLE transaction PARTITION BY RANGE (id) ({definitions})",
+            dry_run,
+        )
+
+
+def create_transaction_partitions(
+    shard_id: int,
+    partition_size: int = TRANSACTION_PARTITION_SIZE,
+    ahead: int = 2,
+    dry_run: bool = False,
+) -> None:
+    """
+    Make sure at least `ahead` empty partitions exist above the highest
+    transaction id, so that new transactions never land in the MAXVALUE
+    partition. Splitting an empty MAXVALUE partition is a metadata-only
+    change.
+    """
+    with session_scope_by_shard_id(shard_id, versioned=False) as db_session:
+        partitions = get_transaction_partitions(db_session)
+        if not partitions:
+            return
+
+        (max_id,) = db_session.query(func.max(Transaction.id)).one()
+        highest = max_id if max_id is not None else -1
+        bounds = [bound for _, bound in partitions if bound is not None]
+        # A bounded partition is empty if its lower bound, the previous
+        # partition's upper bound, is above the highest id.
+        empty_ahead = sum(1 for bound in bounds[:-1] if bound > highest)
+
+        last_bound = bounds[-1]
+        new_bounds = []
+        while empty_ahead < ahead:
+            if last_bound > highest:
+                empty_ahead += 1
+            last_bound += partition_size
+            new_bounds.append(last_bound)
+        if not new_bounds:
+            return
+
+        definitions = ", ".join(
+            _transaction_partition_definition(bound)
+            for bound in [*new_bounds, None]
+        )
+        _execute_partition_ddl(
+            db_session,
+            "ALTER TABLE transaction REORGANIZE PARTITION "
+            f"{TRANSACTION_MAXVALUE_PARTITION} INTO ({definitions})",
+            dry_run,
+        )
+
+
+def drop_expired_transaction_partitions(
+    shard_id: int,
+    days_ago: int = 60,
+    dry_run: bool = False,
+    now: datetime | None = None,
+) -> list[str]:
+    """
+    Drop the partitions of the transaction table whose newest row is older
+    than `days_ago` days. Transaction ids increase with time, so partitions
+    are checked oldest first and the scan stops at the first one that
+    holds unexpired rows. Returns the names of the dropped partitions.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days_ago)
+    with session_scope_by_shard_id(shard_id, versioned=False) as db_session:
+        partitions = get_transaction_partitions(db_session)
+        (max_id,) = db_session.query(func.max(Transaction.id)).one()
+        if not partitions or max_id is None:
+            return []
+
+        expired = []
+        # Only partitions entirely below the highest id are complete; the
+        # one currently receiving inserts and those ahead of it are kept.
+        for name, upper_bound in partitions:
+            if upper_bound is None or upper_bound > max_id:
+                break
+            newest = (
+                db_session.query(Transaction.created_at)
+                .filter(Transaction.id < upper_bound)
+                .order_by(desc(Transaction.id))
+                .limit(1)
+                .scalar()
+            )
+            if newest is not None and newest >= cutoff:
+                break
+            expired.append(name)
+
+        if expired:
+            _execute_partition_ddl(
+                db_session,
+                f"ALTER TABLE transaction DROP PARTITION {', '.join(expired)}",
+                dry_run,
+            )
+        return expired
+
+
 def purge_transactions(  # type: ignore[no-untyped-def]
     shard_id,
     days_ago: int = 60,
@@ -414,6 +1028,22 @@ def purge_transactions(  # type: ignore[no-untyped-def]
     if now is not None:
         start = "'{}'".format(now.strftime("%Y-%m-%d %H:%M:%S"))
 
+    # With a partitioned transaction table, whole expired partitions are
+    # dropped first, leaving only the rows of the oldest live partition to
+    # the DELETE loop below.
+    try:
+        dropped = drop_expired_transaction_partitions(
+            shard_id, days_ago, dry_run, now
+        )
+        if dropped:
+            log.info(
+                "Dropped expired transaction partitions",
+                shard_id=shard_id,
+                partitions=dropped,
+            )
+    except Exception as e:
+        log.critical("Exception encountered during deletion", exception=e)
+
     # Delete all items from the transaction table that are older than
     # `days_ago` days.
     if dry_run:
@@ -432,7 +1062,7 @@ def purge_transactions(  # type: ignore[no-untyped-def]
         rowcount = 1
         while rowcount > 0:
             if throttle:
-                bulk_throttle()
+                shard_throttle(shard_id)()
 
             with session_scope_by_shard_id(
                 shard_id, versioned=False
@@ -1,11 +1,10 @@
 import base64
 
-import requests
-
 from inbox.auth.oauth import OAuthRequestsWrapper
 from inbox.logging import get_logger
 from inbox.models.backends.oauth import token_manager
 from inbox.s3.exc import EmailDeletedException, TemporaryEmailFetchException
+from inbox.util.http import get_session
 
 log = get_logger()
 
@@ -30,7 +29,9 @@ def get_gmail_raw_contents(message):  # type: ignore[no-untyped-def]  # noqa: AN
 
     hex_id = format(g_msgid, "x")
     url = f"https://www.googleapis.com/gmail/v1/users/me/messages/{hex_id}?format=raw"
-    r = requests.get(url, auth=OAuthRequestsWrapper(auth_token))
+    # Not retried, the caller is waiting and gets a temporary error instead.
+    session = get_session("gmail_api", max_retries=0)
+    r = session.get(url, auth=OAuthRequestsWrapper(auth_token))
 
     if r.status_code != 200:
         log.error(  # noqa: PLE1205
@@ -5,24 +5,10 @@ from redis import StrictRedis
 
 from inbox.config import config
 from inbox.logging import get_logger
+from inbox.util.redis_client import create_redis_client
 
 log = get_logger()
 
-SOCKET_CONNECT_TIMEOUT = 5
-SOCKET_TIMEOUT = 30
-
-
-def _get_redis_client(  # type: ignore[no-untyped-def]
-    host=None, port: int = 6379, db: int = 1
-):
-    return StrictRedis(
-        host=host,
-        port=port,
-        db=db,
-        socket_connect_timeout=SOCKET_CONNECT_TIMEOUT,
-        socket_timeout=SOCKET_TIMEOUT,
-    )
-
 
 class EventQueue:
     """
@@ -39,7 +25,7 @@ class EventQueue:
         if self.redis is None:
             redis_host = config["EVENT_QUEUE_REDIS_HOSTNAME"]
             redis_db = config["EVENT_QUEUE_REDIS_DB"]
-            self.redis = _get_redis_client(host=redis_host, db=redis_db)
+            self.redis = create_redis_client(host=redis_host, db=redis_db)
         self.queue_name = queue_name
 
     def receive_event(self, timeout: int | None = 0) -> dict[str, Any] | None:
@@ -0,0 +1,232 @@
+"""
+Load-aware placement of account syncs across sync processes.
+
+Every account gets an estimated cost in abstract load units (an idle,
+caught-up account costs about 1), derived from its folder sizes, how much
+mail it receives, whether it is still in initial sync and how much CPU its
+syncs recently used according to heartbeats. Each sync process publishes the
+sum of its accounts' costs, and uses the loads of its peers in the zone to
+decide whether to claim an account from the shared queue and whether to hand
+one back.
+
+Claiming and releasing use different thresholds (a hysteresis band) so an
+account that was moved off an overloaded process doesn't make the receiving
+process overloaded in turn and bounce around between processes.
+"""
+
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from redis import StrictRedis
+from sqlalchemy import func  # type: ignore[import-untyped]
+
+from inbox.config import config
+from inbox.heartbeat.store import HeartbeatStore
+from inbox.ignition import engine_manager
+from inbox.logging import get_logger
+from inbox.models import Message, Namespace
+from inbox.models.backends.imap import ImapFolderSyncStatus
+from inbox.models.session import session_scope_by_shard_id
+from inbox.util.redis_client import create_redis_client
+
+log = get_logger()
+
+# Cost of an account that is caught up and receives little mail.
+BASE_ACCOUNT_COST = 1.0
+# Polling cost grows with folder size (UID listing and flag refreshes).
+REMOTE_UID_COST = 1.0 / 50000
+# Initial sync downloads mail as fast as it can and dominates everything
+# else while it lasts.
+INITIAL_SYNC_COST = 20.0
+# Cost of each message received over RECENT_MESSAGES_WINDOW.
+RECENT_MESSAGE_COST = 1.0 / 200
+RECENT_MESSAGES_WINDOW = timedelta(days=1)
+# Cost of a fully busy core, as reported by the heartbeats.
+CPU_USAGE_COST = 50.0
+
+# A process claims an account if that keeps it within CLAIM_SLACK of the
+# zone's mean load, and releases one once it is more than RELEASE_THRESHOLD
+# over it. RELEASE_THRESHOLD must stay above CLAIM_SLACK.
+CLAIM_SLACK = config.get("SYNC_LOAD_CLAIM_SLACK", 0.1)
+RELEASE_THRESHOLD = config.get("SYNC_LOAD_RELEASE_THRESHOLD", 0.3)
+# Only accounts synced by a process for that long are moved, so the
+# estimates reflect how the account behaves on its current process.
+MIN_ACCOUNT_RESIDENCY = 30 * 60
+# Don't move more than one account per process per interval.
+REBALANCE_INTERVAL = 5 * 60
+
+PROCESS_LOAD_KEY = "sync:process_load:{}"
+# Loads not refreshed for that long belong to processes that went away.
+PROCESS_LOAD_TTL = 5 * 60
+
+
+def account_cost(
+    remote_uid_count: int = 0,
+    initial_sync: bool = False,
+    recent_message_count: int = 0,
+    cpu_usage: float = 0.0,
+) -> float:
+    return (
+        BASE_ACCOUNT_COST
+        + remote_uid_count * REMOTE_UID_COST
+        + (INITIAL_SYNC_COST if initial_sync else 0.0)
+        + recent_message_count * RECENT_MESSAGE_COST
+        + cpu_usage * CPU_USAGE_COST
+    )
+
+
+def estimate_account_costs(account_ids: list[int]) -> dict[int, float]:
+    """Estimate the cost of syncing each of the given accounts."""
+    remote_uid_counts: dict[int, int] = defaultdict(int)
+    initial_sync: set[int] = set()
+    recent_message_counts: dict[int, int] = {}
+
+    account_ids_by_shard = defaultdict(list)
+    for account_id in account_ids:
+        account_ids_by_shard[
+            engine_manager.shard_key_for_id(account_id)
+        ].append(account_id)
+
+    since = datetime.utcnow() - RECENT_MESSAGES_WINDOW
+    for shard_id, shard_account_ids in account_ids_by_shard.items():
+        with session_scope_by_shard_id(shard_id) as db_session:
+            for account_id, state, metrics in db_session.query(
+                ImapFolderSyncStatus.account_id,
+                ImapFolderSyncStatus.state,
+                ImapFolderSyncStatus._metrics,
+            ).filter(ImapFolderSyncStatus.account_id.in_(shard_account_ids)):
+                remote_uid_counts[account_id] += (metrics or {}).get(
+                    "remote_uid_count"
+                ) or 0
+                if state.startswith("initial"):
+                    initial_sync.add(account_id)
+
+            recent_message_counts.update(
+                db_session.query(Namespace.account_id, func.count(Message.id))
+                .join(Message, Message.namespace_id == Namespace.id)
+                .filter(
+                    Namespace.account_id.in_(shard_account_ids),
+                    Message.received_date > since,
+                )
+                .group_by(Namespace.account_id)
+            )
+
+    cpu_usage = HeartbeatStore.store().get_accounts_cpu_usage(account_ids)
+
+    return {
+        account_id: account_cost(
+            remote_uid_count=remote_uid_counts[account_id],
+            initial_sync=account_id in initial_sync,
+            recent_message_count=recent_message_counts.get(account_id, 0),
+            cpu_usage=cpu_usage.get(account_id, 0.0),
+        )
+        for account_id in account_ids
+    }
+
+
+def should_claim(
+    own_load: float,
+    cost: float,
+    process_loads: dict[str, float],
+    slack: float = CLAIM_SLACK,
+) -> bool:
+    """
+    Whether a process with `own_load` should claim an account costing `cost`,
+    given the current loads of all processes in the zone (its own included).
+
+    The least loaded process always claims, so every account finds a home
+    even if it is too big to fit under the mean anywhere.
+    """
+    if not process_loads:
+        return True
+    mean_load = (sum(process_loads.values()) + cost) / len(process_loads)
+    if own_load + cost <= mean_load * (1 + slack):
+        return True
+    return own_load <= min(process_loads.values())
+
+
+def choose_account_to_release(
+    own_identifier: str,
+    account_costs: dict[int, float],
+    process_loads: dict[str, float],
+    threshold: float = RELEASE_THRESHOLD,
+    slack: float = CLAIM_SLACK,
+) -> int | None:
+    """
+    Pick an account for an overloaded process to hand back to the shared
+    queue, or None if the process isn't overloaded or no account would
+    improve the balance.
+
+    Only accounts that leave this process at or above the mean and that the
+    least loaded peer would claim are candidates, so a moved account never
+    makes its new process overloaded. Of those the most expensive one is
+    picked to correct the imbalance with as few moves as possible.
+    """
+    own_load = process_loads.get(own_identifier, sum(account_costs.values()))
+    peer_loads = [
+        load
+        for identifier, load in process_loads.items()
+        if identifier != own_identifier
+    ]
+    if not peer_loads:
+        return None
+
+    mean_load = (own_load + sum(peer_loads)) / (len(peer_loads) + 1)
+    if own_load <= mean_load * (1 + threshold):
+        return None
+
+    min_peer_load = min(peer_loads)
+    candidates = [
+        (cost, account_id)
+        for account_id, cost in account_costs.items()
+        if own_load - cost >= mean_load
+        and min_peer_load + cost <= mean_load * (1 + slack)
+    ]
+    if not candidates:
+        return None
+    return max(candidates)[1]
+
+
+class ProcessLoadRegistry:
+    """
+    Per-zone registry of the load of each sync process, kept in the same
+    Redis as the sync event queues.
+    """
+
+    def __init__(
+        self,
+        zone: str | None,
+        redis: StrictRedis | None = None,
+    ) -> None:
+        if redis is None:
+            redis = create_redis_client(
+                host=config["EVENT_QUEUE_REDIS_HOSTNAME"],
+                db=config["EVENT_QUEUE_REDIS_DB"],
+            )
+        self.redis = redis
+        self.key = PROCESS_LOAD_KEY.format(zone)
+
+    def publish(self, process_identifier: str, load: float) -> None:
+        self.redis.hset(
+            self.key,
+            process_identifier,
+            json.dumps({"load": load, "updated_at": time.time()}),
+        )
+
+    def remove(self, process_identifier: str) -> None:
+        self.redis.hdel(self.key, process_identifier)
+
+    def get_loads(self) -> dict[str, float]:
+        now = time.time()
+        loads = {}
+        entries: dict[bytes, bytes] = self.redis.hgetall(  # type: ignore[assignment]
+            self.key
+        )
+        for identifier, value in entries.items():
+            entry = json.loads(value)
+            if now - entry["updated_at"] > PROCESS_LOAD_TTL:
+                continue
+            loads[identifier.decode()] = entry["load"]
+        return loads
@@ -1,4 +1,3 @@
-import requests
 from sqlalchemy import desc  # type: ignore[import-untyped]
 
 from inbox.api.kellogs import APIEncoder
@@ -9,6 +8,7 @@ from inbox.models import Account, Message, Thread
 from inbox.models.backends.oauth import token_manager
 from inbox.models.session import session_scope
 from inbox.search.base import SearchBackendException
+from inbox.util.http import get_session
 
 log = get_logger()
 
@@ -121,7 +121,7 @@ class GmailSearchClient:
         params = dict(q=search_query, maxResults=limit)
 
         for _ in range(1, 10):
-            ret = requests.get(
+            ret = get_session("gmail_api", max_retries=0).get(
                 "https://www.googleapis.com/gmail/v1/users/me/messages",
                 params=params,
                 auth=OAuthRequestsWrapper(self.auth_token),
@@ -334,13 +334,23 @@ class SyncbackService(InterruptibleThread):
                 group_keys.append(group_key)
             grouper[group_key].append(log_entry)
 
-        tasks = []
+        tasks: list[SyncbackTask] = []
         for group_key in group_keys:
             group_log_entries = grouper[group_key]
             group_tasks = self._tasks_for_log_entries(
                 db_session, group_log_entries, has_more
             )
-            tasks += group_tasks
+            for task in group_tasks:
+                # Coalesce runs of the same action with the same arguments on
+                # different messages (e.g. marking a whole thread or a
+                # selection as read) so that they're sent as one command per
+                # folder. Only adjacent tasks are merged, so actions on any
+                # one record still run in the order they were logged.
+                merged_task = tasks[-1].try_merge_with(task) if tasks else None
+                if merged_task is not None:
+                    tasks[-1] = merged_task
+                else:
+                    tasks.append(task)
             if len(tasks) > self.batch_size:
                 break
         if tasks:
@@ -646,28 +656,34 @@ class SyncbackTask:
             other_added_labels = set(other.extra_args["added_labels"])
             if my_added_labels != other_added_labels:
                 return None
-
-            # If anything seems fishy, conservatively return None.
-            if (
-                self.provider != other.provider
-                or self.action_log_ids == other.action_log_ids
-                or self.record_ids == other.record_ids
-                or self.account_id != other.account_id
-                or self.action_name != other.action_name
-            ):
+        elif self.action_name in ("mark_unread", "mark_starred", "move"):
+            # These only merge if they set the same flag value or move to
+            # the same folder.
+            if self.extra_args != other.extra_args:
                 return None
-            return SyncbackTask(
-                self.action_name,
-                self.semaphore,
-                self.action_log_ids + other.action_log_ids,
-                self.record_ids + other.record_ids,
-                self.account_id,
-                self.provider,
-                self.parent_service(),
-                self.retry_interval,
-                self.extra_args,
-            )
-        return None
+        else:
+            return None
+
+        # If anything seems fishy, conservatively return None.
+        if (
+            self.provider != other.provider
+            or self.action_log_ids == other.action_log_ids
+            or set(self.record_ids) & set(other.record_ids)
+            or self.account_id != other.account_id
+            or self.action_name != other.action_name
+        ):
+            return None
+        return SyncbackTask(
+            self.action_name,
+            self.semaphore,
+            self.action_log_ids + other.action_log_ids,
+            self.record_ids + other.record_ids,
+            self.account_id,
+            self.provider,
+            self.parent_service(),
+            self.retry_interval,
+            self.extra_args,
+        )
 
     def _log_to_statsd(  # type: ignore[no-untyped-def]
         self, action_log_status, latency=None
@@ -0,0 +1,127 @@
+"""Helpers shared by the benchmark scripts in bin/."""
+
+import json
+import platform
+import resource
+import subprocess
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import event  # type: ignore[import-untyped]
+
+from inbox.ignition import engine_manager
+from inbox.models import Namespace
+from inbox.models.backends.generic import GenericAccount
+from inbox.models.backends.gmail import GmailAccount
+from inbox.models.session import session_scope
+
+
+def create_account(provider: str = "gmail") -> tuple[int, int, str]:
+    """
+    Create a throwaway Gmail or generic IMAP account for a benchmark and
+    return its account id, namespace id and email address.
+    """
+    email_address = f"benchmark-{time.time_ns()}@benchmark.test"
+    with session_scope(0) as db_session:
+        namespace = Namespace()
+        account: GmailAccount | GenericAccount
+        if provider == "gmail":
+            account = GmailAccount(  # type: ignore[call-arg]
+                namespace=namespace,
+                email_address=email_address,
+                sync_host=platform.node(),
+                refresh_token="benchmark",
+            )
+        else:
+            account = GenericAccount(  # type: ignore[call-arg]
+                namespace=namespace,
+                email_address=email_address,
+                sync_host=platform.node(),
+                provider="custom",
+            )
+            account.imap_endpoint = ("imap.benchmark.test", 993)
+            account.smtp_endpoint = ("smtp.benchmark.test", 587)
+            account.imap_password = account.smtp_password = "benchmark"
+        db_session.add(account)
+        db_session.commit()
+        return account.id, namespace.id, email_address
+
+
+def current_revision() -> str | None:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def new_results(**sections: Any) -> dict[str, Any]:
+    """Start the results document of a benchmark run."""
+    return {"revision": current_revision(), **sections}
+
+
+def print_results(results: dict[str, Any]) -> None:
+    print(json.dumps(results, indent=2))  # noqa: T201
+
+
+class Measurement:
+    """
+    Times the phases of a benchmark and counts the database queries they
+    make. `unit` names what the phases process, e.g. "message".
+    Subclasses add their own figures by overriding `reset` and `extra`.
+    """
+
+    def __init__(self, namespace_id: int, unit: str) -> None:
+        self.namespace_id = namespace_id
+        self.unit = unit
+        self.queries = 0
+
+    def before_cursor_execute(  # type: ignore[no-untyped-def]
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        self.queries += 1
+
+    def reset(self) -> None:
+        self.queries = 0
+
+    def extra(self, count: int) -> dict[str, Any]:
+        return {}
+
+    @contextmanager
+    def phase(
+        self, results: dict[str, Any], name: str, count: int
+    ) -> Iterator[None]:
+        engine = engine_manager.get_for_id(self.namespace_id)
+        self.reset()
+        event.listen(
+            engine, "before_cursor_execute", self.before_cursor_execute
+        )
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            event.remove(
+                engine, "before_cursor_execute", self.before_cursor_execute
+            )
+            results[name] = {
+                f"{self.unit}s": count,
+                "seconds": round(elapsed, 3),
+                f"{self.unit}s_per_second": round(count / elapsed, 2),
+                "db_queries": self.queries,
+                f"db_queries_per_{self.unit}": round(
+                    self.queries / max(count, 1), 2
+                ),
+                **self.extra(count),
+                # ru_maxrss is reported in kilobytes on Linux.
+                "peak_rss_kb": resource.getrusage(
+                    resource.RUSAGE_SELF
+                ).ru_maxrss,
+            }
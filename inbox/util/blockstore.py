@@ -1,8 +1,9 @@
 import io
 import os
 import time
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Iterable, Iterator
 from hashlib import sha256
+from typing import BinaryIO
 
 import zstandard
 
@@ -25,6 +26,12 @@ import botocore.exceptions  # type: ignore[import-untyped]  # noqa: E402
 # > contains byte values outside of ASCII range, and doesn't map into UTF8 space.
 # > It reduces the chances that a text file represent this value by accident.
 ZSTD_MAGIC_NUMBER_PREFIX = 0xFD2FB528.to_bytes(4, "little")
+# Enough to read the header of a zstd frame, which has the content size.
+ZSTD_FRAME_HEADER_MAX_SIZE = 18
+
+# Streams read and decompress data in chunks of that many bytes, which bounds
+# the memory used by each stream.
+STREAM_CHUNK_SIZE = 256 * 1024
 
 
 def _data_file_directory(h):  # type: ignore[no-untyped-def]
@@ -341,6 +348,304 @@ def _get_from_disk(data_sha256):  # type: ignore[no-untyped-def]
         return None
 
 
+class _StoredData:
+    """The stored data, with its first bytes possibly read already."""
+
+    def __init__(self, file: BinaryIO, head: bytes = b"") -> None:
+        self.file = file
+        self.head = head
+
+    def read(self, size: int) -> bytes:
+        if self.head:
+            data, self.head = self.head[:size], self.head[size:]
+            return data
+        return self.file.read(size)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class BlockstoreStream(io.RawIOBase):
+    """
+    Read-only file object streaming data from the blockstore.
+
+    Data is read from S3 or disk, decompressed and checked against its hash
+    chunk by chunk as it's read, so that only one chunk is in memory at a
+    time. The hash is only checked if all the data is read from the start.
+
+    Uncompressed data can be seeked to serve ranges of it. Seeking in
+    compressed data isn't supported, it has to be read from the start.
+    """
+
+    def __init__(
+        self,
+        data_sha256: str,
+        stored_data: _StoredData,
+        length: "int | None",
+        *,
+        decompress: bool = False,
+        check_sha: bool = True,
+    ) -> None:
+        super().__init__()
+        self.data_sha256 = data_sha256
+        # The length of the data as read, None if it isn't known.
+        self.length = length
+        self._stored_data = stored_data
+        self._decompress = decompress
+        self._check_sha = check_sha
+        self._position = 0
+        self._chunks: Iterator[bytes] | None = None
+        self._buffer = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return not self._decompress
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence != io.SEEK_SET or not self.seekable():
+            raise io.UnsupportedOperation("Can only seek to a position")
+        if self._chunks is not None:
+            raise io.UnsupportedOperation("Can't seek once reading started")
+        if offset == self._position:
+            return offset
+
+        opened = _open_stored_data(self.data_sha256, offset)
+        if opened is None:
+            raise FileNotFoundError(f"No data with hash {self.data_sha256}")
+        self._stored_data.close()
+        self._stored_data = _StoredData(opened[0])
+        self._position = offset
+        return offset
+
+    def read(self, size: "int | None" = -1) -> bytes:
+        if self._chunks is None:
+            self._chunks = self._iter_chunks()
+        if size is None or size < 0:
+            data = bytes(self._buffer) + b"".join(self._chunks)
+            self._buffer = memoryview(b"")
+        else:
+            if not self._buffer:
+                self._buffer = memoryview(next(self._chunks, b""))
+            data = bytes(self._buffer[:size])
+            self._buffer = self._buffer[size:]
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:  # type: ignore[no-untyped-def]
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stored_data.close()
+        super().close()
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        chunks: Iterable[bytes]
+        if self._decompress:
+            chunks = zstandard.ZstdDecompressor().read_to_iter(
+                self._stored_data,  # type: ignore[arg-type]
+                read_size=STREAM_CHUNK_SIZE,
+                write_size=STREAM_CHUNK_SIZE,
+            )
+        else:
+            chunks = iter(
+                lambda: self._stored_data.read(STREAM_CHUNK_SIZE), b""
+            )
+
+        digest = sha256() if self._check_sha and self._position == 0 else None
+        for data in chunks:
+            if digest is not None:
+                digest.update(data)
+            yield data
+
+        if digest is not None:
+            assert digest.hexdigest() == self.data_sha256, (
+                "Returned data doesn't match stored hash!"
+            )
+
+
+def stream_from_blockstore(
+    data_sha256: str, *, check_sha: bool = True
+) -> "BlockstoreStream | None":
+    """
+    Stream data from the blockstore instead of reading it into memory.
+
+    Args:
+        data_sha256: The SHA256 hash of the data.
+        check_sha: Whether to check the data against its hash.
+
+    Returns:
+        A stream of the data, or None if it wasn't found.
+
+    """
+    opened = _open_stored_data(data_sha256)
+    if opened is None:
+        # The block may have expired.
+        log.warning("No data returned!")
+        return None
+
+    file, stored_length = opened
+    return BlockstoreStream(
+        data_sha256, _StoredData(file), stored_length, check_sha=check_sha
+    )
+
+
+def stream_raw_mime(data_sha256: str) -> "BlockstoreStream | None":
+    """
+    Stream the raw MIME data from the blockstore, decompressing it if
+    necessary, instead of reading it into memory.
+
+    Args:
+        data_sha256: The SHA256 hash of the *uncompressed* data.
+
+    Returns:
+        A stream of the raw MIME data, or None if it wasn't found. Its
+        length is None if the data is compressed without its content size.
+
+    """
+    opened = _open_stored_data(data_sha256)
+    if opened is None:
+        return None
+
+    file, stored_length = opened
+    head = file.read(ZSTD_FRAME_HEADER_MAX_SIZE)
+    stored_data = _StoredData(file, head)
+    # See maybe_decompress_raw_mime.
+    if not head.startswith(ZSTD_MAGIC_NUMBER_PREFIX):
+        return BlockstoreStream(data_sha256, stored_data, stored_length)
+
+    length: int | None = zstandard.frame_content_size(head)
+    if length == zstandard.CONTENTSIZE_UNKNOWN:
+        length = None
+    return BlockstoreStream(data_sha256, stored_data, length, decompress=True)
+
+
+def _open_stored_data(
+    data_sha256: str, offset: int = 0
+) -> "tuple[BinaryIO, int] | None":
+    """
+    Open the stored data at `offset`.
+
+    Returns:
+        A file object and the length of the stored data after `offset`, or
+        None if it wasn't found.
+
+    """
+    if STORE_MSG_ON_S3:
+        return _open_from_s3_bucket(
+            data_sha256,
+            config.get(  # type: ignore[arg-type]
+                "TEMP_MESSAGE_STORE_BUCKET_NAME"
+            ),
+            offset,
+        )
+    else:
+        return _open_from_disk(data_sha256, offset)
+
+
+def _open_from_s3_bucket(
+    data_sha256: str, bucket_name: str, offset: int
+) -> "tuple[BinaryIO, int] | None":
+    if not data_sha256:
+        return None
+
+    bucket = get_s3_bucket(bucket_name)
+
+    s3_object = bucket.Object(data_sha256)
+    try:
+        if offset:
+            response = s3_object.get(Range=f"bytes={offset}-")
+        else:
+            response = s3_object.get()
+    except botocore.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            log.warning(f"No key with name: {data_sha256} returned!")
+            return None
+        else:
+            raise
+
+    return response["Body"], response["ContentLength"]
+
+
+def _open_from_disk(
+    data_sha256: str, offset: int
+) -> "tuple[BinaryIO, int] | None":
+    if not data_sha256:
+        return None
+
+    try:
+        file = open(_data_file_path(data_sha256), "rb")  # noqa: PTH123, SIM115
+    except OSError:
+        log.warning(f"No file with name: {data_sha256}!")
+        return None
+
+    file.seek(offset)
+    return file, os.fstat(file.fileno()).st_size - offset
+
+
+def get_size_from_blockstore(data_sha256: str) -> "int | None":
+    """
+    Get the size of the stored data without downloading it.
+
+    Only looks at metadata (a HEAD request on S3, a stat on disk), so this is
+    the cheap way to check whether data exists.
+
+    Args:
+        data_sha256: The SHA256 hash the data was stored under.
+
+    Returns:
+        The size of the stored, possibly compressed, data in bytes, or None
+        if it wasn't found.
+
+    """
+    if STORE_MSG_ON_S3:
+        return _get_size_from_s3_bucket(
+            data_sha256,
+            config.get(  # type: ignore[arg-type]
+                "TEMP_MESSAGE_STORE_BUCKET_NAME"
+            ),
+        )
+    else:
+        return _get_size_from_disk(data_sha256)
+
+
+def _get_size_from_s3_bucket(
+    data_sha256: str, bucket_name: str
+) -> "int | None":
+    if not data_sha256:
+        return None
+
+    bucket = get_s3_bucket(bucket_name)
+
+    s3_object = bucket.Object(data_sha256)
+    try:
+        s3_object.load()
+    except botocore.exceptions.ClientError as e:
+        if e.response["Error"]["Code"] == "404":
+            return None
+        else:
+            raise
+
+    return s3_object.content_length
+
+
+def _get_size_from_disk(data_sha256: str) -> "int | None":
+    if not data_sha256:
+        return None
+
+    try:
+        return os.stat(_data_file_path(data_sha256)).st_size  # noqa: PTH116
+    except FileNotFoundError:
+        return None
+
+
 def _delete_from_s3_bucket(
     data_sha256_hashes: "Iterable[str]", bucket_name: str
 ) -> None:
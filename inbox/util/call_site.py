@@ -0,0 +1,43 @@
+"""
+Cheap attribution of database sessions and connections to the code using
+them.
+
+Entry points (API requests, sync threads, jobs) tag the context they run in
+with a low-cardinality name, and the database hooks read the tag back
+instead of walking the stack on every session and connection checkout.
+"""
+
+import contextlib
+from collections.abc import Iterator
+from contextvars import ContextVar, Token
+
+_call_site: ContextVar[str | None] = ContextVar("call_site", default=None)
+
+
+def get_call_site() -> str | None:
+    return _call_site.get()
+
+
+def set_call_site(name: str) -> Token[str | None]:
+    """
+    Tag the current context with `name`, e.g. "api.thread_api" or
+    "FolderSyncEngine". Returns a token to pass to `reset_call_site`.
+
+    The tag ends up in metric names, so it is stored as a single metric
+    level: the `<locals>` of nested qualified names are dropped and dots
+    become dashes, e.g. "api-thread_api".
+    """
+    return _call_site.set(name.replace(".<locals>", "").replace(".", "-"))
+
+
+def reset_call_site(token: Token[str | None]) -> None:
+    _call_site.reset(token)
+
+
+@contextlib.contextmanager
+def call_site(name: str) -> Iterator[None]:
+    token = set_call_site(name)
+    try:
+        yield
+    finally:
+        reset_call_site(token)
@@ -0,0 +1,108 @@
+"""
+Pooled HTTP sessions for the API clients of a process.
+
+Calling `requests.get` and friends opens a new TCP and TLS connection for
+every request. The sessions here are shared by all the accounts synced by a
+process, keep connections to each host alive in a bounded pool, and retry
+idempotent requests that fail because of a connection error or a transient
+server error with exponential backoff.
+"""
+
+import http.cookiejar
+import threading
+import time
+from typing import Any
+
+import requests
+import requests.adapters
+from urllib3.util.retry import Retry
+
+from inbox.config import config
+from inbox.util.stats import statsd_client
+
+# Connections kept open per host. More connections can be opened when more
+# threads make requests at once, but they're closed after their request.
+HTTP_POOL_MAXSIZE = config.get("HTTP_POOL_MAXSIZE", 50)
+# Retries of connection errors and of these statuses, for idempotent methods
+# only. Retry-After is honored, otherwise the delay doubles from 2 seconds.
+HTTP_MAX_RETRIES = config.get("HTTP_MAX_RETRIES", 5)
+HTTP_BACKOFF_FACTOR = 1.0
+HTTP_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+class PooledHTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    HTTPAdapter that reports request latency and whether connections were
+    reused to statsd.
+    """
+
+    def __init__(self, metric_prefix: str, **kwargs: Any) -> None:
+        self.metric_prefix = metric_prefix
+        super().__init__(**kwargs)
+
+    def send(  # type: ignore[override]
+        self, request: requests.PreparedRequest, **kwargs: Any
+    ) -> requests.Response:
+        assert request.url is not None
+        pool = self.poolmanager.connection_from_url(request.url)
+        connections_before = pool.num_connections
+        start = time.monotonic()
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            latency_millis = (time.monotonic() - start) * 1000
+            statsd_client.timing(
+                f"{self.metric_prefix}.request_latency", latency_millis
+            )
+            opened = pool.num_connections - connections_before
+            if opened > 0:
+                statsd_client.incr(
+                    f"{self.metric_prefix}.connections_opened", opened
+                )
+            else:
+                statsd_client.incr(f"{self.metric_prefix}.connections_reused")
+
+
+def _create_session(name: str, max_retries: int) -> requests.Session:
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_BACKOFF_FACTOR,
+        status_forcelist=HTTP_RETRY_STATUSES,
+        # Let the caller look at the last response once retries run out.
+        raise_on_status=False,
+    )
+    adapter = PooledHTTPAdapter(
+        f"http.{name}",
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # The session is shared by all accounts, so never keep cookies.
+    session.cookies.set_policy(
+        http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+    )
+    return session
+
+
+def get_session(
+    name: str, *, max_retries: int = HTTP_MAX_RETRIES
+) -> requests.Session:
+    """
+    Get the process-wide session for the given API, e.g. "google".
+
+    Sessions don't hold credentials, pass them with each request.
+    `max_retries` is only used when the session is created; pass 0 when
+    serving an API request that shouldn't wait for backoffs.
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _sessions[name] = _create_session(name, max_retries)
+        return session
@@ -0,0 +1,16 @@
+from redis import StrictRedis
+
+SOCKET_CONNECT_TIMEOUT = 5
+SOCKET_TIMEOUT = 30
+
+
+def create_redis_client(
+    host: str | None = None, port: int = 6379, db: int = 1
+) -> StrictRedis:
+    return StrictRedis(
+        host=host,
+        port=port,
+        db=db,
+        socket_connect_timeout=SOCKET_CONNECT_TIMEOUT,
+        socket_timeout=SOCKET_TIMEOUT,
+    )
@@ -83,12 +83,14 @@ class MockDNSResolver:
         self._registry: dict[
             Literal["mx", "ns"], dict[str, dict[str, str] | list[str]]
         ] = {"mx": {}, "ns": {}}
+        self.queries: list[tuple[str, str]] = []
 
     def _load_records(self, filename) -> None:  # type: ignore[no-untyped-def]
         self._registry = json.loads(get_data(filename))
 
     def query(self, domain, record_type):  # type: ignore[no-untyped-def]  # noqa: ANN201
         record_type = record_type.lower()
+        self.queries.append((domain, record_type))
         entry = self._registry[record_type][domain]
         if isinstance(entry, dict):
             raise {
@@ -102,10 +104,14 @@ class MockDNSResolver:
 
 @pytest.fixture
 def mock_dns_resolver(monkeypatch):  # type: ignore[no-untyped-def]  # noqa: ANN201
+    from inbox.util.url import dns_cache
+
     dns_resolver = MockDNSResolver()
     monkeypatch.setattr("inbox.util.url.dns_resolver", dns_resolver)
+    dns_cache.clear()
     yield dns_resolver
     monkeypatch.undo()
+    dns_cache.clear()
 
 
 class MockIMAPClient:
@@ -1,12 +1,19 @@
+import json
 import re
 import socket
+import threading
+import time
+from collections import OrderedDict
 from urllib.parse import urlencode
 
 import dns
 from dns.resolver import NXDOMAIN, NoAnswer, NoNameservers, Resolver, Timeout
+from redis import RedisError, StrictRedis
 from tldextract import extract as tld_extract  # type: ignore[import-untyped]
 
+from inbox.config import config
 from inbox.logging import get_logger
+from inbox.util.redis_client import create_redis_client
 
 log = get_logger("inbox.util.url")
 
@@ -22,6 +29,102 @@ GOOGLE_DNS_IP = "8.8.8.8"
 dns_resolver = Resolver()
 dns_resolver.nameservers = [GOOGLE_DNS_IP]
 
+# MX and NS records are cached for as long as their TTL says, within these
+# bounds. Domains without records (NXDOMAIN or no answer) are cached for
+# DNS_CACHE_NEGATIVE_TTL, failed lookups (timeouts, no nameservers) aren't.
+DNS_CACHE_MIN_TTL = 60
+DNS_CACHE_MAX_TTL = 24 * 60 * 60
+DNS_CACHE_NEGATIVE_TTL = 5 * 60
+DNS_CACHE_MAX_ENTRIES = 10000
+# Share the cache between processes when a Redis host is configured.
+DNS_CACHE_REDIS_HOSTNAME = config.get("DNS_CACHE_REDIS_HOSTNAME")
+DNS_CACHE_REDIS_DB = config.get("DNS_CACHE_REDIS_DB", 0)
+DNS_CACHE_KEY = "dns_cache:{}"
+
+
+class DNSCache:
+    """
+    Cache of DNS lookups and of what is derived from them, shared by all the
+    threads of a process and optionally by all processes through Redis.
+    """
+
+    def __init__(
+        self,
+        redis: StrictRedis | None = None,
+        max_entries: int = DNS_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.redis = redis
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, list[str]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> list[str] | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, values = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    return values
+                del self._entries[key]
+
+        if self.redis is None:
+            return None
+        try:
+            value = self.redis.get(DNS_CACHE_KEY.format(key))
+        except RedisError:
+            log.warning("Error reading DNS cache", key=key, exc_info=True)
+            return None
+        if value is None:
+            return None
+        shared_entry = json.loads(value)  # type: ignore[arg-type]
+        self._set_local(
+            key, shared_entry["values"], shared_entry["expires_at"]
+        )
+        return shared_entry["values"]
+
+    def set(self, key: str, values: list[str], ttl: int) -> None:
+        expires_at = time.time() + ttl
+        self._set_local(key, values, expires_at)
+
+        if self.redis is None:
+            return
+        try:
+            self.redis.setex(
+                DNS_CACHE_KEY.format(key),
+                ttl,
+                json.dumps({"values": values, "expires_at": expires_at}),
+            )
+        except RedisError:
+            log.warning("Error writing DNS cache", key=key, exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _set_local(
+        self, key: str, values: list[str], expires_at: float
+    ) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _get_dns_cache_redis() -> StrictRedis | None:
+    if not DNS_CACHE_REDIS_HOSTNAME:
+        return None
+    return create_redis_client(
+        host=DNS_CACHE_REDIS_HOSTNAME, db=DNS_CACHE_REDIS_DB
+    )
+
+
+dns_cache = DNSCache(_get_dns_cache_redis())
+
 
 class InvalidEmailAddressError(Exception):
     pass
@@ -46,15 +149,37 @@ def _fallback_get_mx_domains(domain):  # type: ignore[no-untyped-def]
         return []
 
 
-def get_mx_domains(  # type: ignore[no-untyped-def]  # noqa: ANN201
-    domain, dns_resolver=_dns_resolver
-):
-    """Retrieve and return the MX records for a domain."""
+def _answer_ttl(answer) -> int:  # type: ignore[no-untyped-def]
+    rrset = getattr(answer, "rrset", None)
+    ttl = getattr(rrset, "ttl", None)
+    if ttl is None:
+        return DNS_CACHE_MIN_TTL
+    return max(DNS_CACHE_MIN_TTL, min(ttl, DNS_CACHE_MAX_TTL))
+
+
+def _uses_dns_cache(dns_resolver) -> bool:  # type: ignore[no-untyped-def]
+    # The cache is keyed by domain only, so it only holds the answers of the
+    # default resolver.
+    return dns_resolver is _dns_resolver
+
+
+def _get_mx_domains(  # type: ignore[no-untyped-def]
+    domain, dns_resolver
+) -> tuple[list[str], bool]:
+    """Look up the MX domains and whether the result can be cached."""
+    use_cache = _uses_dns_cache(dns_resolver)
+    cached = dns_cache.get(f"mx:{domain}") if use_cache else None
+    if cached is not None:
+        return cached, True
+
     mx_records = []
+    ttl = DNS_CACHE_NEGATIVE_TTL
     try:
         mx_records = dns_resolver().query(domain, "MX")
+        ttl = _answer_ttl(mx_records)
     except NoNameservers:
         log.error("NoMXservers", domain=domain)
+        return [], False
     except NXDOMAIN:
         log.error("No such domain", domain=domain)
     except Timeout:
@@ -63,8 +188,51 @@ def get_mx_domains(  # type: ignore[no-untyped-def]  # noqa: ANN201
     except NoAnswer:
         log.error("No answer from provider", domain=domain)
         mx_records = _fallback_get_mx_domains(domain)
+        if mx_records:
+            ttl = DNS_CACHE_MIN_TTL
+
+    mx_domains = [str(rdata.exchange).lower() for rdata in mx_records]
+    if use_cache:
+        dns_cache.set(f"mx:{domain}", mx_domains, ttl)
+    return mx_domains, True
+
+
+def get_mx_domains(  # type: ignore[no-untyped-def]  # noqa: ANN201
+    domain, dns_resolver=_dns_resolver
+):
+    """Retrieve and return the MX records for a domain."""
+    return _get_mx_domains(domain, dns_resolver)[0]
+
 
-    return [str(rdata.exchange).lower() for rdata in mx_records]
+def _get_ns_records(  # type: ignore[no-untyped-def]
+    domain, dns_resolver
+) -> tuple[list[str], bool]:
+    """Look up the name servers and whether the result can be cached."""
+    use_cache = _uses_dns_cache(dns_resolver)
+    cached = dns_cache.get(f"ns:{domain}") if use_cache else None
+    if cached is not None:
+        return cached, True
+
+    ns_records = []
+    ttl = DNS_CACHE_NEGATIVE_TTL
+    try:
+        ns_records = dns_resolver().query(domain, "NS")
+        ttl = _answer_ttl(ns_records)
+    except NoNameservers:
+        log.error("NoNameservers", domain=domain)
+        return [], False
+    except NXDOMAIN:
+        log.error("No such domain", domain=domain)
+    except Timeout:
+        log.error("Time out during resolution", domain=domain)
+        return [], False
+    except NoAnswer:
+        log.error("No answer from provider", domain=domain)
+
+    ns_names = [str(rdata).lower() for rdata in ns_records]
+    if use_cache:
+        dns_cache.set(f"ns:{domain}", ns_names, ttl)
+    return ns_names, True
 
 
 def mx_match(  # type: ignore[no-untyped-def]
@@ -102,18 +270,6 @@ def provider_from_address(  # type: ignore[no-untyped-def]  # noqa: ANN201
         raise InvalidEmailAddressError("Invalid email address")
 
     domain = email_address.split("@")[1].lower()
-    mx_domains = get_mx_domains(domain, dns_resolver)
-    ns_records = []
-    try:
-        ns_records = dns_resolver().query(domain, "NS")
-    except NoNameservers:
-        log.error("NoNameservers", domain=domain)
-    except NXDOMAIN:
-        log.error("No such domain", domain=domain)
-    except Timeout:
-        log.error("Time out during resolution", domain=domain)
-    except NoAnswer:
-        log.error("No answer from provider", domain=domain)
 
     for name, info in providers.items():
         provider_domains = info.get("domains", [])
@@ -124,24 +280,44 @@ def provider_from_address(  # type: ignore[no-untyped-def]  # noqa: ANN201
             if domain.endswith(d):
                 return name
 
+    use_cache = _uses_dns_cache(dns_resolver)
+    cached = dns_cache.get(f"provider:{domain}") if use_cache else None
+    if cached is not None:
+        return cached[0]
+
+    provider, cacheable = _provider_from_dns(domain, dns_resolver)
+    # Derived from records that may be cached for longer, so only cache the
+    # provider briefly, and not at all if a lookup failed.
+    if use_cache and cacheable:
+        dns_cache.set(f"provider:{domain}", [provider], DNS_CACHE_MIN_TTL)
+    return provider
+
+
+def _provider_from_dns(  # type: ignore[no-untyped-def]
+    domain, dns_resolver
+) -> tuple[str, bool]:
+    mx_domains, mx_cacheable = _get_mx_domains(domain, dns_resolver)
     for name, info in providers.items():
         provider_mx = info.get("mx_servers", [])
 
         # If a retrieved mx_domain is in the list of stored MX domains for a
         # provider, return the provider.
         if mx_match(mx_domains, provider_mx):
-            return name
+            return name, mx_cacheable
 
+    # Name servers are only needed when the MX records didn't match.
+    ns_records, ns_cacheable = _get_ns_records(domain, dns_resolver)
+    cacheable = mx_cacheable and ns_cacheable
     for name, info in providers.items():
         provider_ns = info.get("ns_servers", [])
 
         # If a retrieved name server is in the list of stored name servers for
         # a provider, return the provider.
-        for rdata in ns_records:
-            if str(rdata).lower() in provider_ns:
-                return name
+        for ns_record in ns_records:
+            if ns_record in provider_ns:
+                return name, cacheable
 
-    return "unknown"
+    return "unknown", cacheable
 
 
 # From tornado.httputil
@@ -0,0 +1,70 @@
+"""
+add thread summary
+
+Revision ID: e43ba04e6708
+Revises: e3cf974d07a5
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = "e43ba04e6708"
+down_revision = "e3cf974d07a5"
+
+import sqlalchemy as sa  # type: ignore[import-untyped]
+from alembic import op
+
+
+def upgrade() -> None:
+    for column in ("message_count", "unread_count", "starred_count"):
+        op.add_column(
+            "thread",
+            sa.Column(
+                column, sa.Integer(), nullable=False, server_default="0"
+            ),
+        )
+    op.create_index(
+        "ix_thread_namespace_id_unread_count",
+        "thread",
+        ["namespace_id", "unread_count"],
+    )
+    op.create_index(
+        "ix_thread_namespace_id_starred_count",
+        "thread",
+        ["namespace_id", "starred_count"],
+    )
+
+    op.create_table(
+        "threadcategory",
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("id", sa.BigInteger(), nullable=False, autoincrement=True),
+        sa.Column("thread_id", sa.BigInteger(), nullable=False),
+        sa.Column("category_id", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "thread_id",
+            "category_id",
+            name="uq_threadcategory_thread_id_category_id",
+        ),
+    )
+    op.create_index(
+        "ix_threadcategory_created_at", "threadcategory", ["created_at"]
+    )
+    op.create_index(
+        "ix_threadcategory_category_id_thread_id",
+        "threadcategory",
+        ["category_id", "thread_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("threadcategory")
+    op.drop_index("ix_thread_namespace_id_starred_count", table_name="thread")
+    op.drop_index("ix_thread_namespace_id_unread_count", table_name="thread")
+    for column in ("message_count", "unread_count", "starred_count"):
+        op.drop_column("thread", column)
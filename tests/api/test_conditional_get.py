@@ -0,0 +1,77 @@
+import datetime
+
+from inbox.models import Thread
+from inbox.models.session import session_scope
+from tests.util.base import add_fake_message
+
+
+def test_conditional_get(db, api_client, default_namespace, thread) -> None:
+    message = add_fake_message(db.session, default_namespace.id, thread)
+
+    for path in [
+        "/threads/",
+        f"/threads/{thread.public_id}",
+        "/messages/",
+        f"/messages/{message.public_id}",
+    ]:
+        resp = api_client.get_raw(path)
+        assert resp.status_code == 200
+        etag = resp.headers["ETag"]
+
+        resp = api_client.get_raw(path, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["ETag"] == etag
+        assert resp.data == b""
+
+    resp = api_client.get_raw("/threads/")
+    etag = resp.headers["ETag"]
+    assert api_client.get_raw("/threads/?limit=1").headers["ETag"] != etag
+
+    resp = api_client.put_data(
+        f"/messages/{message.public_id}", {"unread": False}
+    )
+    assert resp.status_code == 200
+
+    resp = api_client.get_raw("/threads/", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_no_etag_for_errors(db, api_client) -> None:
+    resp = api_client.get_raw("/threads/?limit=foo")
+    assert resp.status_code == 400
+    assert "ETag" not in resp.headers
+
+
+def test_etag_changes_when_lower_transaction_commits_last(
+    db, api_client, default_namespace, thread
+) -> None:
+    message = add_fake_message(db.session, default_namespace.id, thread)
+
+    with session_scope(default_namespace.id) as db_session:
+        # Insert a transaction, but commit it only after a later one.
+        now = datetime.datetime.utcnow()
+        db_session.add(
+            Thread(
+                subjectdate=now,
+                recentdate=now,
+                namespace_id=default_namespace.id,
+            )
+        )
+        # The first flush inserts the thread, the second its transaction.
+        db_session.flush()
+        db_session.flush()
+
+        resp = api_client.put_data(
+            f"/messages/{message.public_id}", {"unread": False}
+        )
+        assert resp.status_code == 200
+        etag = api_client.get_raw("/threads/").headers["ETag"]
+
+        db_session.commit()
+
+    resp = api_client.get_raw("/threads/", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    # The latest transaction id is the same, but the ETag changed.
+    assert resp.headers["ETag"].split("-")[0] == etag.split("-")[0]
+    assert resp.headers["ETag"] != etag
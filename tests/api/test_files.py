@@ -165,6 +165,20 @@ def test_download(api_client, uploaded_file_ids, filename) -> None:
     assert local_md5 == dl_md5
 
 
+@pytest.mark.usefixtures("blockstore_backend")
+@pytest.mark.parametrize("blockstore_backend", ["disk", "s3"], indirect=True)
+def test_download_range(api_client, uploaded_file_ids) -> None:
+    in_file = api_client.get_data("/files?filename=LetMeSendYouEmail.wav")[0]
+    path = "/files/{}/download".format(in_file["id"])
+    data = api_client.get_raw(path).data
+    assert len(data) == in_file["size"]
+
+    resp = api_client.get_raw(path, headers={"Range": "bytes=100-199"})
+    assert resp.status_code == 206
+    assert resp.headers["Content-Range"] == f"bytes 100-199/{len(data)}"
+    assert resp.data == data[100:200]
+
+
 @pytest.fixture
 def fake_attachment(db, default_account, message):
     block = Block()
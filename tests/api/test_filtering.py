@@ -1,8 +1,21 @@
 import calendar
 import datetime
 import json
-
-from inbox.models import Block, Category, Namespace, Thread
+import random
+
+import pytest
+from sqlalchemy import or_
+
+from inbox.api import filtering
+from inbox.config import config
+from inbox.models import (
+    Block,
+    Category,
+    Message,
+    MessageCategory,
+    Namespace,
+    Thread,
+)
 from inbox.util.misc import dt_to_timestamp
 from tests.util.base import add_fake_message, add_fake_thread, test_client
 
@@ -426,3 +439,130 @@ def test_namespace_limiting(db, api_client, default_namespaces):
 
         r = api_client.get_data(f"/files?filename={subject}")
         assert len(r) == 1
+
+
+def _thread_ids(db_session, namespace_id, **kwargs):
+    args = dict.fromkeys([
+        "subject",
+        "from_addr",
+        "to_addr",
+        "cc_addr",
+        "bcc_addr",
+        "any_email",
+        "message_id_header",
+        "thread_public_id",
+        "started_before",
+        "started_after",
+        "last_message_before",
+        "last_message_after",
+        "filename",
+        "in_",
+        "unread",
+        "starred",
+    ])
+    args.update(kwargs)
+    return set(
+        filtering.threads(
+            namespace_id=namespace_id,
+            limit=1000,
+            offset=0,
+            view="ids",
+            db_session=db_session,
+            **args,
+        )
+    )
+
+
+def _reference_thread_ids(db_session, namespace_id, in_, unread, starred):
+    """Answer the thread filters from the messages themselves."""
+    query = db_session.query(Thread.public_id).filter(
+        Thread.namespace_id == namespace_id, Thread.deleted_at.is_(None)
+    )
+    if in_ is not None:
+        query = query.filter(
+            Thread.id.in_(
+                db_session.query(Message.thread_id)
+                .join(Message.messagecategories)
+                .join(MessageCategory.category)
+                .filter(
+                    Category.namespace_id == namespace_id,
+                    or_(Category.name == in_, Category.display_name == in_),
+                )
+            )
+        )
+    if unread is not None:
+        query = query.filter(
+            Thread.id.in_(
+                db_session.query(Message.thread_id).filter(
+                    Message.namespace_id == namespace_id,
+                    Message.is_read == (not unread),
+                )
+            )
+        )
+    if starred is not None:
+        query = query.filter(
+            Thread.id.in_(
+                db_session.query(Message.thread_id).filter(
+                    Message.namespace_id == namespace_id,
+                    Message.is_starred == starred,
+                )
+            )
+        )
+    return {public_id for (public_id,) in query}
+
+
+@pytest.mark.parametrize("use_thread_summary", [False, True])
+def test_thread_summary_filters_match_messages(
+    db, default_namespace, monkeypatch, use_thread_summary
+):
+    monkeypatch.setitem(config, "THREAD_SUMMARY_FILTERS", use_thread_summary)
+    rng = random.Random(1234)
+    namespace_id = default_namespace.id
+    categories = [
+        Category(namespace_id=namespace_id, name=name, display_name=name)
+        for name in ["inbox", "sent", "archive"]
+    ]
+    threads = [add_fake_thread(db.session, namespace_id) for _ in range(12)]
+    messages = []
+    for thread in threads:
+        for _ in range(rng.randint(1, 4)):
+            message = add_fake_message(db.session, namespace_id, thread)
+            message.is_read = rng.random() < 0.5
+            message.is_starred = rng.random() < 0.3
+            message.categories = set(rng.sample(categories, rng.randint(0, 2)))
+            messages.append(message)
+    db.session.commit()
+
+    # Change read state, stars and categories, move messages between threads
+    # and delete some, over several flushes.
+    for _ in range(3):
+        for message in rng.sample(messages, 8):
+            action = rng.choice(["read", "star", "categories", "move"])
+            if action == "read":
+                message.is_read = not message.is_read
+            elif action == "star":
+                message.is_starred = not message.is_starred
+            elif action == "categories":
+                message.categories = set(
+                    rng.sample(categories, rng.randint(0, 2))
+                )
+            else:
+                message.thread = rng.choice(threads)
+        db.session.commit()
+
+    for message in rng.sample(messages, 5):
+        db.session.delete(message)
+    db.session.commit()
+
+    for in_ in [None, "inbox", "sent", "archive"]:
+        for unread in [None, True, False]:
+            for starred in [None, True, False]:
+                assert _thread_ids(
+                    db.session,
+                    namespace_id,
+                    in_=in_,
+                    unread=unread,
+                    starred=starred,
+                ) == _reference_thread_ids(
+                    db.session, namespace_id, in_, unread, starred
+                )
@@ -19,14 +19,14 @@ def token_manager(monkeypatch):
 
 
 @pytest.fixture
-def search_response():
+def search_response(monkeypatch):
     resp = requests.Response()
     resp.status_code = 200
     resp.elapsed = datetime.timedelta(seconds=22)
     resp._content = json.dumps({
         "messages": [{"id": "1"}, {"id": "2"}, {"id": "3"}]
     })
-    requests.get = mock.Mock(return_value=resp)
+    monkeypatch.setattr(requests.Session, "get", mock.Mock(return_value=resp))
 
 
 @pytest.fixture
@@ -4,6 +4,8 @@ from unittest import mock
 import pytest
 
 from inbox.api.ns_api import API_VERSIONS
+from inbox.models import ActionLog
+from inbox.sqlalchemy_ext.util import generate_public_id
 from inbox.util.blockstore import get_from_blockstore
 from tests.api.base import new_api_client
 from tests.util.base import (
@@ -345,3 +347,84 @@ def test_message_label_updates(
         assert resp_data["labels"][0]["id"] == category.public_id
     else:
         assert resp_data["labels"] == []
+
+
+def _scheduled_actions(db, message):
+    return sorted(
+        (entry.action, entry.extra_args)
+        for entry in db.session.query(ActionLog).filter(
+            ActionLog.namespace_id == message.namespace_id,
+            ActionLog.table_name == "message",
+            ActionLog.record_id == message.id,
+        )
+    )
+
+
+def test_bulk_message_update_matches_individual_updates(
+    db, api_client, default_namespace, thread, custom_label
+):
+    update = dict(
+        unread=False, starred=True, labels=[custom_label.category.public_id]
+    )
+    messages = [
+        add_fake_message(db.session, default_namespace.id, thread)
+        for _ in range(4)
+    ]
+    individually_updated, bulk_updated = messages[:2], messages[2:]
+
+    for message in individually_updated:
+        resp = api_client.put_data(f"/messages/{message.public_id}", update)
+        assert resp.status_code == 200
+
+    missing_public_id = generate_public_id()
+    resp = api_client.put_data(
+        "/messages/bulk",
+        dict(
+            ids=[message.public_id for message in bulk_updated]
+            + [missing_public_id],
+            **update,
+        ),
+    )
+    assert resp.status_code == 200
+    assert json.loads(resp.data)["results"] == [
+        {"id": message.public_id, "status": 200} for message in bulk_updated
+    ] + [
+        {
+            "id": missing_public_id,
+            "status": 404,
+            "type": "invalid_request_error",
+            "message": f"Couldn't find message {missing_public_id}",
+        }
+    ]
+
+    expected_actions = _scheduled_actions(db, individually_updated[0])
+    assert [action for action, _ in expected_actions] == [
+        "change_labels",
+        "mark_starred",
+        "mark_unread",
+    ]
+    for message in messages:
+        db.session.refresh(message)
+        assert _scheduled_actions(db, message) == expected_actions
+        assert message.is_read
+        assert message.is_starred
+        assert {category.display_name for category in message.categories} == {
+            "Kraftwerk"
+        }
+
+
+def test_bulk_message_update_validation(
+    db, api_client, default_namespace, thread
+):
+    message = add_fake_message(db.session, default_namespace.id, thread)
+
+    for data in [
+        dict(unread=True),
+        dict(ids=[], unread=True),
+        dict(ids=[message.public_id], unread="yes"),
+        dict(ids=[message.public_id], unread=True, subject="Hello"),
+    ]:
+        resp = api_client.put_data("/messages/bulk", data)
+        assert resp.status_code == 400
+
+    assert _scheduled_actions(db, message) == []
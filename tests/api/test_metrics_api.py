@@ -3,6 +3,7 @@ from unittest import mock
 
 import pytest
 
+from inbox.api.metrics_api import MetricsAggregator
 from inbox.ignition import redis_txn
 from inbox.models.namespace import Namespace
 from tests.util.base import add_fake_message
@@ -103,3 +104,37 @@ def test_metrics_index_busted_account(
         default_account_metrics["namespace_private_id"]
         == default_account.namespace.id
     )
+
+
+def test_metrics_index_filters(test_client, outlook_account) -> None:
+    metrics = test_client.get("/metrics?provider_name=microsoft")
+    assert [m["account_private_id"] for m in metrics.json] == [
+        outlook_account.id
+    ]
+    assert float(metrics.headers["X-Metrics-Generated-At"]) > 0
+
+    metrics = test_client.get("/metrics?provider_name=gmail")
+    assert metrics.json == []
+
+
+def test_metrics_aggregator_refreshes_changed_accounts(
+    db, outlook_account
+) -> None:
+    aggregator = MetricsAggregator(max_age=3600, full_refresh_interval=3600)
+    metrics, generated_at = aggregator.get_metrics()
+    (outlook_account_metrics,) = metrics
+    assert outlook_account_metrics["sync_host"] is None
+
+    # Served from memory until it gets too old.
+    outlook_account.sync_host = "sync-host-1"
+    db.session.commit()
+    assert aggregator.get_metrics() == (metrics, generated_at)
+
+    # Only the changed account is reread.
+    aggregator.refresh()
+    (outlook_account_metrics,) = aggregator.metrics
+    assert outlook_account_metrics["sync_host"] == "sync-host-1"
+
+    outlook_account.mark_for_deletion()
+    aggregator.refresh()
+    assert aggregator.metrics == []
@@ -263,14 +263,14 @@ def patch_token_manager(monkeypatch) -> None:
 
 
 @fixture
-def patch_gmail_search_response() -> None:
+def patch_gmail_search_response(monkeypatch) -> None:
     resp = requests.Response()
     resp.status_code = 200
     resp.elapsed = datetime.timedelta(seconds=22)
     resp._content = json.dumps({
         "messages": [{"id": "1"}, {"id": "2"}, {"id": "3"}]
     }).encode()
-    requests.get = mock.Mock(return_value=resp)
+    monkeypatch.setattr(requests.Session, "get", mock.Mock(return_value=resp))
 
 
 @fixture
@@ -0,0 +1,176 @@
+import datetime
+import random
+from collections import defaultdict, namedtuple
+
+import pytest
+
+from inbox.contacts.algorithms import (
+    JACCARD_THRESHOLD,
+    MIN_GROUP_SIZE,
+    MIN_MESSAGE_COUNT,
+    SELF_IDENTITY_THRESHOLD,
+    SOCIAL_MOLECULE_EXPANSION_LIMIT,
+    _get_message_weight,
+    _get_participants,
+    calculate_contact_scores,
+    calculate_group_scores,
+    contact_scores,
+    fold_contact_scores,
+    fold_group_scores,
+    group_scores,
+    new_scores_state,
+)
+
+Message = namedtuple(
+    "Message", ["id", "to_addr", "cc_addr", "bcc_addr", "date"]
+)
+
+USER_EMAIL = "me@example.com"
+
+
+def reference_group_scores(messages, user_email):
+    """Score groups as the original set-based algorithm does."""
+    now = datetime.datetime.now()
+    message_ids_to_scores = {}
+    molecules_dict = defaultdict(set)
+
+    def get_message_list_weight(message_ids):
+        return sum(message_ids_to_scores[m_id] for m_id in message_ids)
+
+    for msg in messages:
+        participants = _get_participants(msg, [user_email])
+        if len(participants) >= MIN_GROUP_SIZE:
+            molecules_dict[tuple(participants)].add(msg.id)
+            message_ids_to_scores[msg.id] = _get_message_weight(now, msg.date)
+
+    if len(molecules_dict) < SOCIAL_MOLECULE_EXPANSION_LIMIT:
+        mditems = [(set(g), msgs) for (g, msgs) in molecules_dict.items()]
+        for i in range(len(mditems)):
+            g1, m1 = mditems[i]
+            for j in range(i, len(mditems)):
+                g2, m2 = mditems[j]
+                new_molecule = tuple(sorted(g1.intersection(g2)))
+                if len(new_molecule) >= MIN_GROUP_SIZE:
+                    molecules_dict[new_molecule] = (
+                        molecules_dict[new_molecule].union(m1).union(m2)
+                    )
+
+    molecules_list = [
+        (set(emails), set(msgs))
+        for emails, msgs in molecules_dict.items()
+        if get_message_list_weight(msgs) >= MIN_MESSAGE_COUNT
+    ]
+
+    molecules_list.sort(key=lambda x: len(x[0]), reverse=True)
+    is_subsumed = [False] * len(molecules_list)
+    mol_weights = [get_message_list_weight(m) for (_, m) in molecules_list]
+    for i in range(1, len(molecules_list)):
+        g1 = molecules_list[i][0]
+        for j in range(i):
+            if is_subsumed[j]:
+                continue
+            g2 = molecules_list[j][0]
+            if g1.issubset(g2):
+                sharing_error = (
+                    (len(g2) - len(g1)) * (mol_weights[i] - mol_weights[j])
+                ) / (1.0 * (len(g2) * mol_weights[i]))
+                if sharing_error < SELF_IDENTITY_THRESHOLD:
+                    is_subsumed[i] = True
+                    break
+    molecules_list = [
+        ml for (ml, dead) in zip(molecules_list, is_subsumed) if not dead
+    ]
+
+    new_guys_start_idx = 0
+    while new_guys_start_idx < len(molecules_list):
+        combined = [False] * len(molecules_list)
+        new_guys = []
+        for j in range(new_guys_start_idx, len(molecules_list)):
+            for i in range(j):
+                if combined[i]:
+                    continue
+                (g1, m1), (g2, m2) = (molecules_list[i], molecules_list[j])
+                js = len(g1 & g2) / float(len(g1 | g2))
+                if js > JACCARD_THRESHOLD:
+                    new_guys.append((g1 | g2, m1 | m2))
+                    (combined[i], combined[j]) = (True, True)
+                    break
+        molecules_list = [
+            molecule
+            for molecule, was_combined in zip(molecules_list, combined)
+            if not was_combined
+        ]
+        new_guys_start_idx = len(molecules_list)
+        molecules_list.extend(new_guys)
+
+    return {
+        ", ".join(sorted(g)): get_message_list_weight(m)
+        for (g, m) in molecules_list
+    }
+
+
+def generate_messages(seed, count=400):
+    rng = random.Random(seed)
+    teams = [
+        [f"{team}{i}@example.com" for i in range(rng.randint(2, 6))]
+        for team in "abcdefgh"
+    ]
+    now = datetime.datetime.utcnow()
+    messages = []
+    for message_id in range(1, count + 1):
+        team = rng.choice(teams)
+        recipients = rng.sample(team, rng.randint(1, len(team)))
+        if rng.random() < 0.2:
+            recipients.append(rng.choice(rng.choice(teams)))
+        if rng.random() < 0.1:
+            recipients.append(USER_EMAIL)
+        addresses = [(email.split("@")[0], email) for email in recipients]
+        split = rng.randint(0, len(addresses))
+        messages.append(
+            Message(
+                id=message_id,
+                to_addr=addresses[:split],
+                cc_addr=addresses[split:],
+                bcc_addr=[],
+                date=now - datetime.timedelta(days=rng.uniform(0, 900)),
+            )
+        )
+    return messages
+
+
+def fold_in_batches(fold, messages, *args):
+    state = new_scores_state()
+    for start in range(0, len(messages), 50):
+        fold(state, messages[start : start + 50], *args)
+    return state
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_group_scores_match_original_algorithm(seed):
+    messages = generate_messages(seed)
+    expected = reference_group_scores(messages, USER_EMAIL)
+    assert expected
+
+    scores = calculate_group_scores(messages, USER_EMAIL)
+    assert scores.keys() == expected.keys()
+    for group, score in scores.items():
+        assert score == pytest.approx(expected[group], rel=1e-6)
+
+    state = fold_in_batches(fold_group_scores, messages, USER_EMAIL)
+    assert state["last_message_id"] == len(messages)
+    scores = group_scores(state)
+    assert scores.keys() == expected.keys()
+    for group, score in scores.items():
+        assert score == pytest.approx(expected[group], rel=1e-3)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_contact_scores_match_original_algorithm(seed):
+    messages = generate_messages(seed)
+    expected = calculate_contact_scores(messages)
+
+    state = fold_in_batches(fold_contact_scores, messages)
+    scores = contact_scores(state)
+    assert scores.keys() == expected.keys()
+    for email, score in scores.items():
+        assert score == pytest.approx(expected[email], rel=1e-3)
@@ -68,6 +68,52 @@ def test_add_contacts(contacts_provider, contact_sync, db, default_namespace):
     assert num_current_contacts - num_original_contacts == 2
 
 
+def test_add_contacts_in_chunks(
+    contacts_provider, contact_sync, db, default_namespace, monkeypatch
+):
+    """Test that known contacts are skipped, even from an earlier chunk."""
+    monkeypatch.setattr(
+        "inbox.contacts.remote_sync.CONTACT_SYNC_CHUNK_SIZE", 2
+    )
+    db.session.add(
+        Contact(
+            namespace_id=default_namespace.id,
+            uid="from_mail",
+            provider_name="inbox",
+            name="From Mail",
+            email_address="from.mail@email.address",
+        )
+    )
+    db.session.commit()
+    num_original_contacts = (
+        db.session.query(Contact)
+        .filter_by(namespace_id=default_namespace.id)
+        .count()
+    )
+    contacts_provider.supply_contact("From Mail", "from.mail@email.address")
+    contacts_provider.supply_contact(
+        "Contact One", "contact.one@email.address"
+    )
+    contacts_provider.supply_contact(
+        "Contact Two", "contact.two@email.address"
+    )
+    contacts_provider.supply_contact(
+        "contact one", "contact.one@email.address"
+    )
+
+    contact_sync.provider = contacts_provider
+    contact_sync.sync()
+    contacts = (
+        db.session.query(Contact)
+        .filter_by(namespace_id=default_namespace.id)
+        .all()
+    )
+    assert len(contacts) - num_original_contacts == 2
+    assert {"Contact One", "Contact Two"} <= {
+        contact.name for contact in contacts
+    }
+
+
 def test_update_contact(contacts_provider, contact_sync, db):
     """Test that subsequent contact updates get stored."""
     contacts_provider.supply_contact("Old Name", "old@email.address")
@@ -431,6 +431,18 @@ def exception_override_response() -> None:
     )
 
 
+@pytest.fixture
+def nothing_stored():
+    # Stands in for a calendar without any events stored yet, so these tests
+    # don't need the database.
+    with mock.patch.object(
+        MicrosoftEventsProvider,
+        "_get_changed_masters",
+        lambda self, calendar_uid, masters: masters,
+    ):
+        yield
+
+
 @pytest.fixture
 def provider(client):
     provider = MicrosoftEventsProvider("fake_account_id", "fake_namespace_id")
@@ -473,7 +485,9 @@ def test_sync_calendars_deletion(db, client, outlook_account) -> None:
 
 
 @responses.activate
-@pytest.mark.usefixtures("events_responses", "instances_response")
+@pytest.mark.usefixtures(
+    "events_responses", "instances_response", "nothing_stored"
+)
 def test_sync_events(provider) -> None:
     events = provider.sync_events("fake_calendar_id")
     events_by_title = {event.title: event for event in events}
@@ -647,7 +661,9 @@ def recurring_instances_response() -> None:
 
 @responses.activate
 @pytest.mark.usefixtures(
-    "events_with_cutoff_response", "recurring_instances_response"
+    "events_with_cutoff_response",
+    "recurring_instances_response",
+    "nothing_stored",
 )
 def test_sync_events_respects_ical_uid_cutoff(provider) -> None:
     events = provider.sync_events("fake_calendar_id")
@@ -670,7 +686,9 @@ def test_sync_events_respects_ical_uid_cutoff(provider) -> None:
 
 
 @responses.activate
-@pytest.mark.usefixtures("events_responses", "cancellation_override_response")
+@pytest.mark.usefixtures(
+    "events_responses", "cancellation_override_response", "nothing_stored"
+)
 def test_sync_events_cancellation(provider) -> None:
     events = provider.sync_events("fake_calendar_id")
     events_by_title_and_status = {
@@ -701,7 +719,9 @@ def test_sync_events_cancellation(provider) -> None:
 
 
 @responses.activate
-@pytest.mark.usefixtures("events_responses", "exception_override_response")
+@pytest.mark.usefixtures(
+    "events_responses", "exception_override_response", "nothing_stored"
+)
 def test_sync_events_exception(provider) -> None:
     events = provider.sync_events("fake_calendar_id")
     events_by_title = {event.title: event for event in events}
@@ -824,3 +844,48 @@ def test_sync(db, provider, outlook_account) -> None:
         calendars_by_name["Test"].webhook_subscription_expiration is not None
     )
     assert calendars_by_name["Test"].webhook_last_ping is not None
+
+
+@responses.activate
+@pytest.mark.usefixtures(
+    "calendars_response", "events_responses", "instances_response"
+)
+def test_sync_skips_instances_of_unchanged_recurring_events(
+    db, provider, outlook_account
+) -> None:
+    event_sync = WebhookEventSync(
+        outlook_account.email_address,
+        outlook_account.verbose_provider,
+        outlook_account.id,
+        outlook_account.namespace.id,
+        provider_class=lambda *args, **kwargs: provider,
+    )
+    instances_url = BASE_URL + "/me/events/recurrence_id/instances"
+
+    def instances_calls():
+        return [
+            call
+            for call in responses.calls
+            if call.request.url.startswith(instances_url)
+        ]
+
+    event_sync.sync()
+    assert len(instances_calls()) == 1
+
+    # Nothing changed, so the recurring event isn't expanded again.
+    provider.sync_events("fake_calendar_id")
+    assert len(instances_calls()) == 1
+
+    db.session.expire_all()
+    recurring = (
+        db.session.query(RecurringEvent)
+        .filter_by(
+            namespace_id=outlook_account.namespace.id, uid="recurrence_id"
+        )
+        .one()
+    )
+    recurring.last_modified = datetime.datetime(2022, 9, 1, tzinfo=pytz.UTC)
+    db.session.commit()
+
+    provider.sync_events("fake_calendar_id")
+    assert len(instances_calls()) == 2
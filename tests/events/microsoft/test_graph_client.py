@@ -83,6 +83,25 @@ def test_request_retry_429(client) -> None:
     assert args2 == (3,)
 
 
+@responses.activate(registry=OrderedRegistry)
+def test_request_retry_429_backs_off_other_requests(client) -> None:
+    responses.get(
+        BASE_URL + "/me/calendars", status=429, headers={"Retry-After": "12"}
+    )
+    responses.get(BASE_URL + "/me/calendars", json=calendars_json)
+    responses.get(BASE_URL + "/me/calendars", json=calendars_json)
+
+    with unittest.mock.patch("time.sleep") as sleep_mock:
+        client.request("GET", "/me/calendars")
+        # Another request, e.g. from another thread, made while the first
+        # one is backing off waits for the same Retry-After.
+        client.request("GET", "/me/calendars")
+
+    ((args1, _), (args2, _)) = sleep_mock.call_args_list
+    assert args1 == (12,)
+    assert args2[0] == pytest.approx(12, abs=1)
+
+
 @responses.activate(registry=OrderedRegistry)
 def test_request_retry_503(client) -> None:
     responses.get(BASE_URL + "/me/calendars", status=503)
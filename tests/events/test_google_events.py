@@ -1,17 +1,19 @@
+import datetime
 import email
-import json
 import time
 from unittest import mock
 
 import arrow
 import pytest
 import requests
+from freezegun import freeze_time
 
 from inbox.api.kellogs import _encode
 from inbox.events.google import GoogleEventsProvider, parse_event_response
 from inbox.exceptions import AccessNotEnabledError
 from inbox.models import Calendar, Event
 from inbox.models.event import RecurringEvent, RecurringEventOverride
+from inbox.util.http import HTTP_MAX_RETRIES
 
 
 def cmp_cal_attrs(calendar1, calendar2):
@@ -264,7 +266,7 @@ def test_event_parsing() -> None:
 
     provider = GoogleEventsProvider(1, 1)
     provider.calendars_table = {"uid": False}
-    provider._get_raw_events = mock.MagicMock(return_value=raw_response)
+    provider._get_raw_event_pages = mock.MagicMock(return_value=[raw_response])
     updates = provider.sync_events("uid", 1)
 
     # deleted events are actually only marked as
@@ -316,7 +318,7 @@ def test_event_parsing() -> None:
 
     # This is a read-only calendar
     provider.calendars_table = {"uid": True}
-    provider._get_raw_events = mock.MagicMock(return_value=raw_response)
+    provider._get_raw_event_pages = mock.MagicMock(return_value=[raw_response])
     updates = provider.sync_events("uid", 1)
     assert len(updates) == 1
     assert updates[0].read_only is True
@@ -507,137 +509,228 @@ def test_handle_unparseable_dates() -> None:
         }
     ]
     provider = GoogleEventsProvider(1, 1)
-    provider._get_raw_events = mock.MagicMock(return_value=raw_response)
+    provider._get_raw_event_pages = mock.MagicMock(return_value=[raw_response])
     updates = provider.sync_events("uid", 1)
     assert len(updates) == 0
 
 
-def test_pagination() -> None:
-    first_response = requests.Response()
-    first_response.status_code = 200
-    first_response._content = json.dumps({
-        "items": ["A", "B", "C"],
-        "nextPageToken": "CjkKKzlhb2tkZjNpZTMwNjhtZThllU",
-    }).encode()
-    second_response = requests.Response()
-    second_response.status_code = 200
-    second_response._content = json.dumps({"items": ["D", "E"]}).encode()
+def test_pagination(local_http_server) -> None:
+    local_http_server.add_response(
+        200,
+        {
+            "items": ["A", "B", "C"],
+            "nextPageToken": "CjkKKzlhb2tkZjNpZTMwNjhtZThllU",
+        },
+    )
+    local_http_server.add_response(200, {"items": ["D", "E"]})
 
-    requests.get = mock.Mock(side_effect=[first_response, second_response])
     provider = GoogleEventsProvider(1, 1)
     provider._get_access_token = mock.Mock(return_value="token")
-    items = provider._get_resource_list("https://googleapis.com/testurl")
+    items = provider._get_resource_list(local_http_server.url + "/testurl")
     assert items == ["A", "B", "C", "D", "E"]
 
+    first_request, second_request = local_http_server.requests
+    assert first_request["headers"]["Authorization"] == "Bearer token"
+    assert "pageToken=CjkKKzlhb2tkZjNpZTMwNjhtZThllU" in second_request["path"]
+    # Both pages were fetched over the same connection.
+    assert first_request["client_port"] == second_request["client_port"]
+
+
+def test_resume_interrupted_listing(local_http_server) -> None:
+    local_http_server.add_response(
+        200, {"items": ["A", "B"], "nextPageToken": "second"}
+    )
+    local_http_server.add_response(404)
+
+    provider = GoogleEventsProvider(1, 1)
+    provider._get_access_token = mock.Mock(return_value="token")
+    url = local_http_server.url + "/testurl"
+    pages = provider._get_resource_pages(url)
+    assert next(pages) == ["A", "B"]
+    with pytest.raises(requests.exceptions.HTTPError):
+        next(pages)
+
+    # The next listing starts from the page that failed.
+    local_http_server.add_response(200, {"items": ["C"]})
+    assert list(provider._get_resource_pages(url)) == [["C"]]
+    assert "pageToken=second" in local_http_server.requests[-1]["path"]
+
+    # Once a listing completes, the next one starts from the beginning.
+    local_http_server.add_response(200, {"items": ["A", "B", "C"]})
+    assert list(provider._get_resource_pages(url)) == [["A", "B", "C"]]
+    assert "pageToken" not in local_http_server.requests[-1]["path"]
+
+
+def test_resume_with_expired_page_token(local_http_server) -> None:
+    local_http_server.add_response(
+        200, {"items": ["A", "B"], "nextPageToken": "second"}
+    )
+    local_http_server.add_response(404)
+
+    provider = GoogleEventsProvider(1, 1)
+    provider._get_access_token = mock.Mock(return_value="token")
+    url = local_http_server.url + "/testurl"
+    with pytest.raises(requests.exceptions.HTTPError):
+        list(provider._get_resource_pages(url))
+
+    local_http_server.add_response(400)
+    local_http_server.add_response(200, {"items": ["A", "B", "C"]})
+    assert list(provider._get_resource_pages(url)) == [["A", "B", "C"]]
+    assert "pageToken" not in local_http_server.requests[-1]["path"]
+
+
+def test_resumed_listing_start(local_http_server, monkeypatch) -> None:
+    monkeypatch.setattr(
+        "inbox.events.google.EVENTS_URL",
+        local_http_server.url + "/calendars/{}/events",
+    )
+    provider = GoogleEventsProvider(1, 1)
+    provider._get_access_token = mock.Mock(return_value="token")
+    last_synced = datetime.datetime(2024, 1, 1)
+    interrupted_start = datetime.datetime(2024, 1, 2)
+    assert provider.get_resumed_listing_start("uid", last_synced) is None
+
+    local_http_server.add_response(
+        200, {"items": ["A"], "nextPageToken": "second"}
+    )
+    local_http_server.add_response(404)
+    with freeze_time(interrupted_start):
+        pages = provider._get_raw_event_pages("uid", last_synced)
+        assert next(pages) == ["A"]
+        with pytest.raises(requests.exceptions.HTTPError):
+            next(pages)
+
+    # Event A changes after its page was handled. The resumed listing only
+    # gets the page after it, so the calendar has to be synced from the
+    # start of the interrupted listing for the change to be fetched.
+    local_http_server.add_response(200, {"items": ["B"]})
+    with freeze_time(datetime.datetime(2024, 1, 3)):
+        assert (
+            provider.get_resumed_listing_start("uid", last_synced)
+            == interrupted_start
+        )
+        assert list(provider._get_raw_event_pages("uid", last_synced)) == [
+            ["B"]
+        ]
+    assert "pageToken=second" in local_http_server.requests[-1]["path"]
+    assert provider.get_resumed_listing_start("uid", last_synced) is None
+
+    local_http_server.add_response(200, {"items": ["A"]})
+    assert list(provider._get_raw_event_pages("uid", interrupted_start)) == [
+        ["A"]
+    ]
+    assert (
+        "updatedMin=2024-01-02T00%3A00%3A00Z"
+        in local_http_server.requests[-1]["path"]
+    )
 
-def test_handle_http_401() -> None:
-    first_response = requests.Response()
-    first_response.status_code = 401
 
-    second_response = requests.Response()
-    second_response.status_code = 200
-    second_response._content = json.dumps({"items": ["A", "B", "C"]}).encode()
+def test_handle_http_401(local_http_server) -> None:
+    local_http_server.add_response(401)
+    local_http_server.add_response(200, {"items": ["A", "B", "C"]})
 
-    requests.get = mock.Mock(side_effect=[first_response, second_response])
     provider = GoogleEventsProvider(1, 1)
     provider._get_access_token = mock.Mock(return_value="token")
-    items = provider._get_resource_list("https://googleapis.com/testurl")
+    items = provider._get_resource_list(local_http_server.url + "/testurl")
     assert items == ["A", "B", "C"]
     # Check that we actually refreshed the access token
     assert len(provider._get_access_token.mock_calls) == 2
 
 
 @pytest.mark.usefixtures("mock_time_sleep")
-def test_handle_quota_exceeded() -> None:
-    first_response = requests.Response()
-    first_response.status_code = 403
-    first_response._content = json.dumps({
-        "error": {
-            "errors": [
-                {
-                    "domain": "usageLimits",
-                    "reason": "userRateLimitExceeded",
-                    "message": "User Rate Limit Exceeded",
-                }
-            ],
-            "code": 403,
-            "message": "User Rate Limit Exceeded",
-        }
-    }).encode()
-
-    second_response = requests.Response()
-    second_response.status_code = 200
-    second_response._content = json.dumps({"items": ["A", "B", "C"]}).encode()
+def test_handle_quota_exceeded(local_http_server) -> None:
+    local_http_server.add_response(
+        403,
+        {
+            "error": {
+                "errors": [
+                    {
+                        "domain": "usageLimits",
+                        "reason": "userRateLimitExceeded",
+                        "message": "User Rate Limit Exceeded",
+                    }
+                ],
+                "code": 403,
+                "message": "User Rate Limit Exceeded",
+            }
+        },
+    )
+    local_http_server.add_response(200, {"items": ["A", "B", "C"]})
 
-    requests.get = mock.Mock(side_effect=[first_response, second_response])
     provider = GoogleEventsProvider(1, 1)
     provider._get_access_token = mock.Mock(return_value="token")
-    items = provider._get_resource_list("https://googleapis.com/testurl")
+    items = provider._get_resource_list(local_http_server.url + "/testurl")
     # Check that we slept, then retried.
     assert time.sleep.called
     assert items == ["A", "B", "C"]
 
 
 @pytest.mark.usefixtures("mock_time_sleep")
-def test_handle_internal_server_error() -> None:
-    first_response = requests.Response()
-    first_response.status_code = 503
+def test_handle_internal_server_error(local_http_server) -> None:
+    local_http_server.add_response(503, headers={"Retry-After": "7"})
+    local_http_server.add_response(500)
+    local_http_server.add_response(200, {"items": ["A", "B", "C"]})
 
-    second_response = requests.Response()
-    second_response.status_code = 200
-    second_response._content = json.dumps({"items": ["A", "B", "C"]}).encode()
-
-    requests.get = mock.Mock(side_effect=[first_response, second_response])
     provider = GoogleEventsProvider(1, 1)
     provider._get_access_token = mock.Mock(return_value="token")
-    items = provider._get_resource_list("https://googleapis.com/testurl")
-    # Check that we slept, then retried.
-    assert time.sleep.called
+    items = provider._get_resource_list(local_http_server.url + "/testurl")
+    # The session honored Retry-After, then retried.
+    time.sleep.assert_any_call(7)
     assert items == ["A", "B", "C"]
+    assert len(local_http_server.requests) == 3
 
 
-def test_handle_api_not_enabled() -> None:
-    response = requests.Response()
-    response.status_code = 403
-    response._content = json.dumps({
-        "error": {
-            "code": 403,
-            "message": "Access Not Configured.",
-            "errors": [
-                {
-                    "domain": "usageLimits",
-                    "message": "Access Not Configured",
-                    "reason": "accessNotConfigured",
-                    "extendedHelp": "https://console.developers.google.com",
-                }
-            ],
-        }
-    }).encode()
+@pytest.mark.usefixtures("mock_time_sleep")
+def test_handle_persistent_internal_server_error(local_http_server) -> None:
+    for _ in range(HTTP_MAX_RETRIES + 1):
+        local_http_server.add_response(503)
+
+    provider = GoogleEventsProvider(1, 1)
+    provider._get_access_token = mock.Mock(return_value="token")
+    with pytest.raises(requests.exceptions.HTTPError):
+        provider._get_resource_list(local_http_server.url + "/testurl")
+    assert len(local_http_server.requests) == HTTP_MAX_RETRIES + 1
+
+
+def test_handle_api_not_enabled(local_http_server) -> None:
+    local_http_server.add_response(
+        403,
+        {
+            "error": {
+                "code": 403,
+                "message": "Access Not Configured.",
+                "errors": [
+                    {
+                        "domain": "usageLimits",
+                        "message": "Access Not Configured",
+                        "reason": "accessNotConfigured",
+                        "extendedHelp": "https://console.developers.google.com",
+                    }
+                ],
+            }
+        },
+    )
 
-    requests.get = mock.Mock(return_value=response)
     provider = GoogleEventsProvider(1, 1)
     provider._get_access_token = mock.Mock(return_value="token")
     with pytest.raises(AccessNotEnabledError):
-        provider._get_resource_list("https://googleapis.com/testurl")
+        provider._get_resource_list(local_http_server.url + "/testurl")
 
 
-def test_handle_other_errors() -> None:
-    response = requests.Response()
-    response.status_code = 403
-    response._content = b"This is not the JSON you're looking for"
-    requests.get = mock.Mock(return_value=response)
+def test_handle_other_errors(local_http_server) -> None:
+    local_http_server.add_response(
+        403, b"This is not the JSON you're looking for"
+    )
     provider = GoogleEventsProvider(1, 1)
     provider._get_access_token = mock.Mock(return_value="token")
     with pytest.raises(requests.exceptions.HTTPError):
-        provider._get_resource_list("https://googleapis.com/testurl")
+        provider._get_resource_list(local_http_server.url + "/testurl")
 
-    response = requests.Response()
-    response.status_code = 404
-    requests.get = mock.Mock(return_value=response)
+    local_http_server.add_response(404)
     provider = GoogleEventsProvider(1, 1)
     provider._get_access_token = mock.Mock(return_value="token")
     with pytest.raises(requests.exceptions.HTTPError):
-        provider._get_resource_list("https://googleapis.com/testurl")
+        provider._get_resource_list(local_http_server.url + "/testurl")
 
 
 def test_recurrence_creation() -> None:
@@ -850,6 +943,6 @@ def test_cancelled_override_creation() -> None:
     ]
 
     provider = GoogleEventsProvider(1, 1)
-    provider._get_raw_events = mock.MagicMock(return_value=raw_response)
+    provider._get_raw_event_pages = mock.MagicMock(return_value=[raw_response])
     updates = provider.sync_events("uid", 1)
     assert updates[0].cancelled is True
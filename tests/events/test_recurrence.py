@@ -527,6 +527,77 @@ def test_override_updated(db, default_account, calendar) -> None:
     assert find_override.location == "walk and talk"
 
 
+def test_master_and_overrides_synced_together(
+    db, default_account, calendar, monkeypatch
+) -> None:
+    # The overrides come before their master, some in the same chunk and
+    # some in an earlier one, and should all end up linked to it.
+    monkeypatch.setattr("inbox.events.remote_sync.EVENT_UPDATES_CHUNK_SIZE", 2)
+    master_uid = "batchmasteruid"
+    overrides = [
+        Event.create(
+            title="override",
+            description="",
+            uid=f"{master_uid}_201408{day}T203000Z",
+            location="",
+            busy=False,
+            read_only=False,
+            reminders="",
+            recurrence=None,
+            start=arrow.get(2014, 8, day, 22, 30, 0),
+            end=arrow.get(2014, 8, day, 23, 30, 0),
+            all_day=False,
+            is_owner=False,
+            participants=[],
+            provider_name="inbox",
+            raw_data="",
+            original_start_tz="America/Los_Angeles",
+            original_start_time=arrow.get(2014, 8, day, 20, 30, 0),
+            master_event_uid=master_uid,
+            source="local",
+        )
+        for day in (14, 21, 28)
+    ]
+    master = recurring_event(
+        db, default_account, calendar, TEST_EXDATE_RULE, commit=False
+    )
+    master.uid = master_uid
+    # The same override again, as when it changed during the sync.
+    update = recurring_override_instance(
+        db,
+        master,
+        arrow.get(2014, 8, 14, 20, 30, 0),
+        arrow.get(2014, 8, 14, 22, 45, 0),
+        arrow.get(2014, 8, 14, 23, 45, 0),
+    )
+    db.session.expunge(update)
+    update.location = "moved"
+
+    handle_event_updates(
+        default_account.namespace.id,
+        calendar.id,
+        [*overrides, master, update],
+        log,
+        db.session,
+    )
+    db.session.commit()
+
+    find_master = db.session.query(Event).filter_by(uid=master_uid).one()
+    assert isinstance(find_master, RecurringEvent)
+    find_overrides = (
+        db.session.query(RecurringEventOverride)
+        .filter_by(master_event_uid=master_uid)
+        .order_by(RecurringEventOverride.uid)
+        .all()
+    )
+    assert len(find_overrides) == 3
+    assert all(
+        override.master_event_id == find_master.id
+        for override in find_overrides
+    )
+    assert find_overrides[0].location == "moved"
+
+
 def test_override_cancelled(db, default_account, calendar) -> None:
     # Test that overrides with status 'cancelled' are appropriately missing
     # from the expanded event.
@@ -22,6 +22,13 @@ default_params = dict(
 # Mock responses from the provider with adds/updates/deletes
 
 
+def as_pages(event_response):
+    def sync_event_pages(calendar_uid, sync_from_time):
+        return [event_response(calendar_uid, sync_from_time) or []]
+
+    return sync_event_pages
+
+
 def calendar_response():
     return CalendarSyncResponse(
         [],
@@ -150,7 +157,7 @@ def test_handle_changes(db, generic_account) -> None:
 
     # Sync calendars/events
     event_sync.provider.sync_calendars = calendar_response
-    event_sync.provider.sync_events = event_response
+    event_sync.provider.sync_event_pages = as_pages(event_response)
     event_sync.sync()
 
     assert (
@@ -202,7 +209,7 @@ def test_handle_changes(db, generic_account) -> None:
 
     # Sync a calendar update
     event_sync.provider.sync_calendars = calendar_response_with_update
-    event_sync.provider.sync_events = event_response
+    event_sync.provider.sync_event_pages = as_pages(event_response)
     event_sync.sync()
 
     # Check that we have the same number of calendars and events as before
@@ -261,7 +268,7 @@ def test_handle_changes(db, generic_account) -> None:
     assert first_calendar.name == "Super Important Meetings"
 
     # Sync an event update
-    event_sync.provider.sync_events = event_response_with_update
+    event_sync.provider.sync_event_pages = as_pages(event_response_with_update)
     event_sync.sync()
     # Make sure the update was persisted
     first_event = (
@@ -276,7 +283,9 @@ def test_handle_changes(db, generic_account) -> None:
     assert first_event.title == "Top Secret Plotting Meeting"
 
     # Sync a participant update
-    event_sync.provider.sync_events = event_response_with_participants_update
+    event_sync.provider.sync_event_pages = as_pages(
+        event_response_with_participants_update
+    )
     event_sync.sync()
 
     # Make sure the update was persisted
@@ -296,7 +305,7 @@ def test_handle_changes(db, generic_account) -> None:
     ]
 
     # Sync an event delete
-    event_sync.provider.sync_events = event_response_with_delete
+    event_sync.provider.sync_event_pages = as_pages(event_response_with_delete)
     event_sync.sync()
     # Make sure the delete was persisted.
     first_event = (
@@ -354,3 +363,37 @@ def test_handle_changes(db, generic_account) -> None:
         .count()
         == 4
     )
+
+
+def test_resumed_listing_syncs_from_interrupted_start(
+    db, generic_account
+) -> None:
+    namespace_id = generic_account.namespace.id
+    event_sync = EventSync(
+        generic_account.email_address,
+        "google",
+        generic_account.id,
+        namespace_id,
+        provider_class=GoogleEventsProvider,
+    )
+    interrupted_start = datetime(2024, 1, 2)
+
+    def get_resumed_listing_start(calendar_uid, sync_from_time):
+        if calendar_uid == "first_calendar_uid":
+            return interrupted_start
+        return None
+
+    event_sync.provider.sync_calendars = calendar_response
+    event_sync.provider.sync_event_pages = as_pages(event_response)
+    event_sync.provider.get_resumed_listing_start = get_resumed_listing_start
+    event_sync.sync()
+
+    # The calendar whose listing was resumed is synced from the start of the
+    # interrupted listing next time, the other one from this sync.
+    last_synced = dict(
+        db.session.query(Calendar.uid, Calendar.last_synced).filter(
+            Calendar.namespace_id == namespace_id
+        )
+    )
+    assert last_synced["first_calendar_uid"] == interrupted_start
+    assert last_synced["second_calendar_uid"] > interrupted_start
@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 
 from inbox.ignition import init_db, reset_invalid_autoincrements, verify_db
@@ -59,3 +61,20 @@ def test_reset_autoincrements(base_db) -> None:
 
     assert len(reset_tables) > 0
     verify_db(engines[key], shard_schemas[key], key)
+
+
+@pytest.mark.parametrize(
+    ("checkedout", "random_value", "expected"),
+    [(1, 0.5, False), (1, 0.001, True), (8, 0.5, True)],
+)
+def test_should_capture_stack(
+    monkeypatch, checkedout, random_value, expected
+) -> None:
+    from inbox import ignition
+
+    pool = mock.Mock(_max_overflow=5)
+    pool.size.return_value = 5
+    pool.checkedout.return_value = checkedout
+    monkeypatch.setattr(ignition.random, "random", lambda: random_value)
+
+    assert ignition.should_capture_stack(pool) is expected
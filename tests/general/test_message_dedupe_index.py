@@ -0,0 +1,93 @@
+from pytest import fixture  # noqa: PT013
+from sqlalchemy import event  # type: ignore[import-untyped]
+
+from inbox.models.util import MessageDedupeIndex
+from tests.util.base import add_fake_message
+
+
+@fixture
+def statements(db):
+    statements = []
+
+    def before_cursor_execute(  # type: ignore[no-untyped-def]
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        statements.append(statement)
+
+    event.listen(db, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(db, "before_cursor_execute", before_cursor_execute)
+
+
+def test_batch_warms_index_with_a_single_query(
+    db, default_namespace, thread, statements
+) -> None:
+    first = add_fake_message(
+        db.session, default_namespace.id, thread, g_msgid=1001
+    )
+    first.data_sha256 = "a" * 64
+    second = add_fake_message(
+        db.session, default_namespace.id, thread, g_msgid=1002
+    )
+    second.data_sha256 = "b" * 64
+    db.session.commit()
+
+    index = MessageDedupeIndex(default_namespace.id)
+    del statements[:]
+    with index.batch(
+        db.session,
+        data_sha256s={"a" * 64, "c" * 64},
+        g_msgids={1002, 1003},
+    ):
+        assert len(statements) == 1
+        assert index.get_by_data_sha256(db.session, "a" * 64) == first
+        assert index.get_by_g_msgid(db.session, 1002) == second
+        # Keys that were looked up and not found don't hit the database.
+        assert index.get_by_data_sha256(db.session, "c" * 64) is None
+        assert index.get_by_g_msgid(db.session, 1003) is None
+        assert len(statements) == 1
+
+    # Known keys aren't queried again by later batches.
+    with index.batch(db.session, data_sha256s={"a" * 64}):
+        pass
+    assert len(statements) == 1
+
+
+def test_misses_only_last_for_the_batch(db, default_namespace, thread) -> None:
+    index = MessageDedupeIndex(default_namespace.id)
+    with index.batch(db.session, g_msgids={2001}):
+        assert index.get_by_g_msgid(db.session, 2001) is None
+
+    message = add_fake_message(
+        db.session, default_namespace.id, thread, g_msgid=2001
+    )
+    assert index.get_by_g_msgid(db.session, 2001) == message
+
+
+def test_stale_entries_fall_back_to_the_database(
+    db, default_namespace, thread
+) -> None:
+    message = add_fake_message(
+        db.session, default_namespace.id, thread, g_msgid=3001
+    )
+    index = MessageDedupeIndex(default_namespace.id)
+    index.add(message)
+    db.session.delete(message)
+    db.session.commit()
+
+    assert index.get_by_g_msgid(db.session, 3001) is None
+    assert len(index) == 0
+
+
+def test_index_is_size_bounded(db, default_namespace, thread) -> None:
+    index = MessageDedupeIndex(default_namespace.id, max_size=2)
+    for g_msgid in (4001, 4002, 4003):
+        index.add(
+            add_fake_message(
+                db.session, default_namespace.id, thread, g_msgid=g_msgid
+            )
+        )
+
+    assert len(index) == 2
+    assert ("g_msgid", 4001) not in index._ids
+    assert ("g_msgid", 4003) in index._ids
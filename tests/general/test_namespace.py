@@ -348,6 +348,89 @@ def test_namespace_deletion(db, default_account) -> None:
     assert message
 
 
+def test_namespace_deletion_resumes(db, default_account, monkeypatch) -> None:
+    from inbox.models import Account, Message, Thread
+    from inbox.models import util as models_util
+    from inbox.models.util import DeletionProgress, delete_namespace
+
+    namespace_id = default_account.namespace.id
+    account_id = default_account.id
+    thread = add_fake_thread(db.session, namespace_id)
+    message_ids = sorted(
+        add_fake_message(db.session, namespace_id, thread).id for _ in range(3)
+    )
+    default_account.mark_for_deletion()
+
+    monkeypatch.setattr("inbox.models.util.CHUNK_SIZE", 1)
+    monkeypatch.setattr("inbox.models.util.BLOCKSTORE_BATCH_SIZE", 1)
+
+    deleted_message_ids = []
+
+    def interrupted_delete_message_hashes(
+        namespace_id, account_id, message_hashes, dry_run=False
+    ):
+        if deleted_message_ids:
+            raise RuntimeError("interrupted")
+        deleted_message_ids.append(message_ids[0])
+
+    monkeypatch.setattr(
+        "inbox.models.util.delete_message_hashes",
+        interrupted_delete_message_hashes,
+    )
+    with pytest.raises(RuntimeError):
+        delete_namespace(namespace_id)
+
+    progress = DeletionProgress(namespace_id)
+    assert progress.is_done("transaction")
+    assert not progress.is_done("blockstore_message")
+    assert progress.get_cursor("blockstore_message") == message_ids[0]
+    # Messages are only deleted once their data is gone from the blockstore.
+    db.session.expire_all()
+    assert (
+        db.session.query(Message)
+        .filter(Message.namespace_id == namespace_id)
+        .count()
+        == 3
+    )
+    assert db.session.query(Account).get(account_id)
+
+    deleted_hashes = []
+    monkeypatch.setattr(
+        "inbox.models.util.delete_message_hashes",
+        lambda namespace_id, account_id, message_hashes, dry_run=False: (
+            deleted_hashes.extend(message_hashes)
+        ),
+    )
+    deleted_tables = []
+    batch_delete = models_util._batch_delete
+
+    def recording_batch_delete(engine, table, *args):
+        deleted_tables.append(table)
+        return batch_delete(engine, table, *args)
+
+    monkeypatch.setattr(
+        "inbox.models.util._batch_delete", recording_batch_delete
+    )
+    delete_namespace(namespace_id)
+
+    # Completed steps aren't run again, and the blockstore deletion picked
+    # up after the last checkpoint.
+    assert "transaction" not in deleted_tables
+    assert "thread" in deleted_tables
+    assert len(deleted_hashes) == 2
+
+    db.session.expire_all()
+    for model in (Message, Thread):
+        assert (
+            db.session.query(model)
+            .filter(model.namespace_id == namespace_id)
+            .count()
+            == 0
+        )
+    assert db.session.query(Account).get(account_id) is None
+    assert not progress.is_done("transaction")
+
+
 def test_namespace_delete_cascade(db, default_account) -> None:
     from inbox.models import Account, Message, Thread
 
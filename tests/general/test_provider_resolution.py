@@ -4,7 +4,12 @@ from inbox.auth.base import handler_from_provider
 from inbox.auth.generic import GenericAuthHandler
 from inbox.auth.google import GoogleAuthHandler
 from inbox.exceptions import NotSupportedError
-from inbox.util.url import InvalidEmailAddressError, provider_from_address
+from inbox.util.testutils import MockDNSResolver
+from inbox.util.url import (
+    InvalidEmailAddressError,
+    get_mx_domains,
+    provider_from_address,
+)
 
 
 def test_provider_resolution(mock_dns_resolver) -> None:
@@ -57,6 +62,76 @@ def test_provider_resolution(mock_dns_resolver) -> None:
         provider_from_address("notanemail.com", lambda: mock_dns_resolver)
 
 
+def test_provider_resolution_is_cached(mock_dns_resolver) -> None:
+    mock_dns_resolver._load_records(
+        "tests/data/general_test_provider_resolution.json"
+    )
+
+    for _ in range(3):
+        assert provider_from_address("foo@aol.com") == "aol"
+        assert provider_from_address("bar@aol.com") == "aol"
+        assert get_mx_domains("aol.com") == [
+            "mailin-02.mx.aol.com.",
+            "mailin-01.mx.aol.com.",
+        ] + ["mailin-03.mx.aol.com.", "mailin-04.mx.aol.com."]
+    # The name servers aren't needed, the MX records match.
+    assert mock_dns_resolver.queries == [("aol.com", "mx")]
+
+
+def test_missing_domain_is_cached(mock_dns_resolver) -> None:
+    mock_dns_resolver._load_records(
+        "tests/data/general_test_provider_resolution.json"
+    )
+
+    for _ in range(3):
+        assert provider_from_address("foo@doesnotexist.nilas.com") == "unknown"
+        assert get_mx_domains("doesnotexist.nilas.com") == []
+    assert mock_dns_resolver.queries == [
+        ("doesnotexist.nilas.com", "mx"),
+        ("doesnotexist.nilas.com", "ns"),
+    ]
+
+
+def test_custom_resolver_bypasses_cache(mock_dns_resolver) -> None:
+    mock_dns_resolver._load_records(
+        "tests/data/general_test_provider_resolution.json"
+    )
+    custom_resolver = MockDNSResolver()
+    custom_resolver._registry = {
+        "mx": {"aol.com": ["mx.nowhere.test."]},
+        "ns": {"aol.com": []},
+    }
+
+    assert provider_from_address("foo@aol.com") == "aol"
+    assert (
+        provider_from_address("foo@aol.com", lambda: custom_resolver)
+        == "unknown"
+    )
+    assert get_mx_domains("aol.com", lambda: custom_resolver) == [
+        "mx.nowhere.test."
+    ]
+    assert provider_from_address("foo@aol.com") == "aol"
+    assert mock_dns_resolver.queries == [("aol.com", "mx")]
+
+
+def test_failed_lookup_is_not_cached(mock_dns_resolver) -> None:
+    mock_dns_resolver._registry = {
+        "mx": {"flaky.com": {"error": "NoNameservers"}},
+        "ns": {"flaky.com": {"error": "Timeout"}},
+    }
+
+    for _ in range(2):
+        assert provider_from_address("foo@flaky.com") == "unknown"
+    assert (
+        mock_dns_resolver.queries
+        == [
+            ("flaky.com", "mx"),
+            ("flaky.com", "ns"),
+        ]
+        * 2
+    )
+
+
 def test_auth_handler_dispatch() -> None:
     assert isinstance(handler_from_provider("custom"), GenericAuthHandler)
     assert isinstance(handler_from_provider("gmail"), GoogleAuthHandler)
@@ -154,3 +154,25 @@ def test_ping_single(random_heartbeats) -> None:
     single = ping[0]
     for f in single.folders:
         assert f.alive
+
+
+def test_publish_cpu_usage(monkeypatch) -> None:
+    clock = iter([100.0, 1.0, 110.0, 3.0, 100.0, 5.0, 105.0, 6.0])
+    monkeypatch.setattr("time.monotonic", lambda: next(clock))
+    monkeypatch.setattr("time.thread_time", lambda: next(clock))
+    store = HeartbeatStore.store()
+
+    inbox_proxy = proxy_for(1, 2)
+    inbox_proxy.publish()
+    # The first heartbeat only takes a sample.
+    assert store.get_accounts_cpu_usage([1]) == {}
+    inbox_proxy.publish()
+    assert store.get_accounts_cpu_usage([1]) == {1: pytest.approx(0.2)}
+
+    sent_proxy = proxy_for(1, 3)
+    sent_proxy.publish()
+    sent_proxy.publish()
+    assert store.get_accounts_cpu_usage([1, 2]) == {1: pytest.approx(0.4)}
+
+    store.remove_folders(1, 3)
+    assert store.get_accounts_cpu_usage([1]) == {1: pytest.approx(0.2)}
@@ -25,7 +25,11 @@ from inbox.models.action_log import schedule_action
 from inbox.sendmail.base import create_message_from_json
 from inbox.sendmail.base import update_draft as sendmail_update_draft
 from inbox.transactions.actions import SyncbackService
-from tests.util.base import add_fake_category, add_fake_imapuid
+from tests.util.base import (
+    add_fake_category,
+    add_fake_imapuid,
+    add_fake_message,
+)
 
 
 def test_draft_updates(db, default_account, mock_imapclient) -> None:
@@ -115,34 +119,97 @@ def test_change_flags(
     add_fake_imapuid(db.session, default_account.id, message, folder, 22)
     with writable_connection_pool(default_account.id).get() as crispin_client:
         mark_unread(
-            crispin_client, default_account.id, message.id, {"unread": False}
+            crispin_client, default_account.id, [message.id], {"unread": False}
         )
         mock_imapclient.add_flags.assert_called_with(
             [22], ["\\Seen"], silent=True
         )
 
         mark_unread(
-            crispin_client, default_account.id, message.id, {"unread": True}
+            crispin_client, default_account.id, [message.id], {"unread": True}
         )
         mock_imapclient.remove_flags.assert_called_with(
             [22], ["\\Seen"], silent=True
         )
 
         mark_starred(
-            crispin_client, default_account.id, message.id, {"starred": True}
+            crispin_client, default_account.id, [message.id], {"starred": True}
         )
         mock_imapclient.add_flags.assert_called_with(
             [22], ["\\Flagged"], silent=True
         )
 
         mark_starred(
-            crispin_client, default_account.id, message.id, {"starred": False}
+            crispin_client,
+            default_account.id,
+            [message.id],
+            {"starred": False},
         )
         mock_imapclient.remove_flags.assert_called_with(
             [22], ["\\Flagged"], silent=True
         )
 
 
+def test_change_flags_on_multiple_messages(
+    db, default_account, thread, message, folder, mock_imapclient
+) -> None:
+    mock_imapclient.add_folder_data(folder.name, {})
+    mock_imapclient.add_flags = mock.Mock()
+    other_message = add_fake_message(
+        db.session, default_account.namespace.id, thread
+    )
+    add_fake_imapuid(db.session, default_account.id, message, folder, 22)
+    add_fake_imapuid(db.session, default_account.id, other_message, folder, 23)
+
+    with writable_connection_pool(default_account.id).get() as crispin_client:
+        mark_unread(
+            crispin_client,
+            default_account.id,
+            [message.id, other_message.id],
+            {"unread": False},
+        )
+    mock_imapclient.add_flags.assert_called_once_with(
+        [22, 23], ["\\Seen"], silent=True
+    )
+
+
+def test_flag_actions_are_merged_across_messages(
+    db, default_account, thread, message
+) -> None:
+    namespace_id = default_account.namespace.id
+    messages = [message] + [
+        add_fake_message(db.session, namespace_id, thread) for _ in range(3)
+    ]
+    for record in messages[:3]:
+        schedule_action(
+            "mark_unread", record, namespace_id, db.session, unread=False
+        )
+    # Different arguments, so it can't be sent along with the others.
+    schedule_action(
+        "mark_unread", messages[3], namespace_id, db.session, unread=True
+    )
+    db.session.commit()
+
+    service = SyncbackService(
+        syncback_id=0, process_number=0, total_processes=1, num_workers=1
+    )
+    log_entries = (
+        db.session.query(ActionLog)
+        .filter_by(namespace_id=namespace_id)
+        .order_by(ActionLog.id)
+        .all()
+    )
+    batch_task = service._get_batch_task(db.session, log_entries, False)
+
+    assert [task.record_ids for task in batch_task.tasks] == [
+        [record.id for record in messages[:3]],
+        [messages[3].id],
+    ]
+    assert batch_task.tasks[0].action_log_ids == [
+        log_entry.id for log_entry in log_entries[:3]
+    ]
+
+
 def test_change_labels(
     db, default_account, message, folder, mock_imapclient
 ) -> None:
@@ -296,7 +363,7 @@ def test_move_uses_imap_move_when_supported(
         move(
             crispin_client,
             default_account.id,
-            message.id,
+            [message.id],
             {"destination": "Archive"},
         )
 
@@ -321,7 +388,7 @@ def test_move_falls_back_to_copy_delete_when_move_not_supported(
         move(
             crispin_client,
             default_account.id,
-            message.id,
+            [message.id],
             {"destination": "Archive"},
         )
 
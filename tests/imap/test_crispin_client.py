@@ -23,6 +23,7 @@ from inbox.crispin import (
     fixed_parse_message_list,
     localized_folder_names,
     original_parse_message_list,
+    parse_vanished_responses,
 )
 
 
@@ -863,3 +864,48 @@ def test_fixed_parse_message_list_multiple_elements() -> None:
         124,
         1024,
     }
+
+
+def test_parse_vanished_responses() -> None:
+    assert parse_vanished_responses([b"(EARLIER) 41,43:45", b"50"]) == [
+        (41, 41),
+        (43, 45),
+        (50, 50),
+    ]
+    # Servers may send ranges with the higher UID first.
+    assert parse_vanished_responses([b"(EARLIER) 12:10"]) == [(10, 12)]
+    assert parse_vanished_responses([]) == []
+
+
+def test_enable_qresync(generic_client) -> None:
+    generic_client.conn.capabilities = lambda: (b"IMAP4REV1", b"CONDSTORE")
+    assert not generic_client.enable_qresync()
+    assert not generic_client.qresync_enabled
+
+    generic_client.conn.capabilities = lambda: (
+        b"IMAP4REV1",
+        b"ENABLE",
+        b"QRESYNC",
+    )
+    generic_client.conn.enable = lambda *capabilities: [b"QRESYNC"]
+    assert generic_client.enable_qresync()
+    assert generic_client.qresync_enabled
+
+
+def test_qresync_changed_flags(generic_client, constants) -> None:
+    generic_client.qresync_enabled = True
+    resp = "{seq} (UID {uid} MODSEQ ({modseq}) FLAGS {flags})".format(
+        **constants
+    ).encode()
+    patch_imap4(generic_client, [resp])
+    generic_client.conn._imap.untagged_responses = {
+        "VANISHED": [b"(EARLIER) 300:302,310"]
+    }
+
+    changed_flags, vanished = generic_client.qresync_changed_flags(90000)
+
+    assert changed_flags == {
+        constants["uid"]: Flags(constants["flags"], constants["modseq"])
+    }
+    assert vanished == [(300, 302), (310, 310)]
+    assert generic_client.conn._imap.untagged_responses == {}
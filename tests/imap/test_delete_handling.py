@@ -12,10 +12,14 @@ from inbox.mailsync.backends.imap.common import (
     update_metadata,
 )
 from inbox.mailsync.gc import DeleteHandler, LabelRenameHandler
-from inbox.models import Folder, Message, Transaction
+from inbox.models import Folder, Message, ThreadCategory, Transaction
 from inbox.models.label import Label
 from inbox.util.testutils import MockIMAPClient
-from tests.util.base import add_fake_imapuid, add_fake_message
+from tests.util.base import (
+    add_fake_imapuid,
+    add_fake_message,
+    add_fake_thread,
+)
 
 
 @pytest.fixture
@@ -106,7 +110,6 @@ def test_deletion_with_short_ttl(
         account_id=default_account.id,
         namespace_id=default_namespace.id,
         provider_name=default_account.provider,
-        uid_accessor=lambda m: m.imapuids,
         message_ttl=0,
         thread_ttl=0,
     )
@@ -120,6 +123,38 @@ def test_deletion_with_short_ttl(
         thread.id  # noqa: B018
 
 
+def test_thread_deletion_removes_thread_categories(
+    db,
+    default_account,
+    default_namespace,
+    marked_deleted_message,
+    thread,
+    folder,
+) -> None:
+    handler = DeleteHandler(
+        account_id=default_account.id,
+        namespace_id=default_namespace.id,
+        provider_name=default_account.provider,
+        message_ttl=0,
+        thread_ttl=0,
+    )
+    handler.check(marked_deleted_message.deleted_at + timedelta(seconds=1))
+    # A stale summary row, threadcategory has no foreign key to cascade.
+    db.session.add(
+        ThreadCategory(thread_id=thread.id, category_id=folder.category_id)
+    )
+    db.session.commit()
+
+    handler.gc_deleted_threads(thread.deleted_at + timedelta(seconds=1))
+    db.session.expire_all()
+    assert (
+        db.session.query(ThreadCategory)
+        .filter(ThreadCategory.thread_id == thread.id)
+        .count()
+        == 0
+    )
+
+
 def test_thread_deletion_with_short_ttl(
     db,
     default_account,
@@ -132,7 +167,6 @@ def test_thread_deletion_with_short_ttl(
         account_id=default_account.id,
         namespace_id=default_namespace.id,
         provider_name=default_account.provider,
-        uid_accessor=lambda m: m.imapuids,
         message_ttl=0,
         thread_ttl=120,
     )
@@ -170,7 +204,6 @@ def test_non_orphaned_messages_get_unmarked(
         account_id=default_account.id,
         namespace_id=default_namespace.id,
         provider_name=default_account.provider,
-        uid_accessor=lambda m: m.imapuids,
         message_ttl=0,
     )
     handler.check(marked_deleted_message.deleted_at + timedelta(seconds=1))
@@ -192,7 +225,6 @@ def test_threads_only_deleted_when_no_messages_left(
         account_id=default_account.id,
         namespace_id=default_namespace.id,
         provider_name=default_account.provider,
-        uid_accessor=lambda m: m.imapuids,
         message_ttl=0,
     )
     # Add another message onto the thread
@@ -219,7 +251,6 @@ def test_deletion_deferred_with_longer_ttl(
         account_id=default_account.id,
         namespace_id=default_namespace.id,
         provider_name=default_account.provider,
-        uid_accessor=lambda m: m.imapuids,
         message_ttl=5,
     )
     db.session.commit()
@@ -244,7 +275,6 @@ def test_deletion_creates_revision(
         account_id=default_account.id,
         namespace_id=default_namespace.id,
         provider_name=default_account.provider,
-        uid_accessor=lambda m: m.imapuids,
         message_ttl=0,
     )
     handler.check(marked_deleted_message.deleted_at + timedelta(seconds=1))
@@ -274,6 +304,84 @@ def test_deletion_creates_revision(
     assert latest_thread_transaction.command == "update"
 
 
+def test_deletion_in_batches(
+    db, default_account, default_namespace, folder, monkeypatch
+) -> None:
+    monkeypatch.setattr("inbox.mailsync.gc.DELETE_BATCH_SIZE", 2)
+    deleted_at = datetime(2015, 2, 22, 22, 22, 22)
+    now = datetime.utcnow()
+
+    kept_thread = add_fake_thread(db.session, default_namespace.id)
+    emptied_thread = add_fake_thread(db.session, default_namespace.id)
+    first = add_fake_message(
+        db.session,
+        default_namespace.id,
+        kept_thread,
+        subject="first",
+        snippet="first snippet",
+        received_date=now - timedelta(days=2),
+    )
+    middle = add_fake_message(
+        db.session,
+        default_namespace.id,
+        kept_thread,
+        subject="middle",
+        snippet="middle snippet",
+        received_date=now - timedelta(days=1),
+    )
+    last = add_fake_message(
+        db.session,
+        default_namespace.id,
+        kept_thread,
+        subject="last",
+        snippet="last snippet",
+        received_date=now,
+    )
+    lonely = add_fake_message(
+        db.session, default_namespace.id, emptied_thread, subject="lonely"
+    )
+    moved = add_fake_message(db.session, default_namespace.id, emptied_thread)
+    add_fake_imapuid(db.session, default_account.id, moved, folder, 4242)
+    for message in (first, last, lonely, moved):
+        message.deleted_at = deleted_at
+    db.session.commit()
+    deleted_ids = {first.id, last.id, lonely.id}
+
+    handler = DeleteHandler(
+        account_id=default_account.id,
+        namespace_id=default_namespace.id,
+        provider_name=default_account.provider,
+        message_ttl=0,
+    )
+    handler.check(deleted_at + timedelta(seconds=1))
+    db.session.expire_all()
+
+    assert (
+        db.session.query(Message).filter(Message.id.in_(deleted_ids)).all()
+        == []
+    )
+    # The message still has a uid, so it was unmarked instead.
+    assert moved.deleted_at is None
+
+    assert kept_thread.deleted_at is None
+    assert kept_thread.message_count == 1
+    assert kept_thread.subject == "middle"
+    assert kept_thread.snippet == "middle snippet"
+    assert kept_thread.recentdate == middle.received_date
+    assert emptied_thread.deleted_at is None
+    assert emptied_thread.message_count == 1
+
+    deletions = {
+        record_id
+        for (record_id,) in db.session.query(Transaction.record_id).filter(
+            Transaction.namespace_id == default_namespace.id,
+            Transaction.object_type == "message",
+            Transaction.command == "delete",
+        )
+    }
+    assert deletions == deleted_ids
+
+
 def test_deleted_labels_get_gced(
     empty_db, default_account, thread, message, imapuid, folder
 ) -> None:
@@ -309,7 +417,6 @@ def test_deleted_labels_get_gced(
         account_id=default_account.id,
         namespace_id=default_namespace.id,
         provider_name=default_account.provider,
-        uid_accessor=lambda m: m.imapuids,
         message_ttl=0,
     )
     handler.gc_deleted_categories()
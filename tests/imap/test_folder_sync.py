@@ -11,7 +11,10 @@ from inbox.mailsync.backends.imap.generic import (
     MAX_UIDINVALID_RESYNCS,
     FolderSyncEngine,
     UidInvalid,
+    expand_uid_ranges,
+    uidvalidity_cb,
 )
+from inbox.mailsync.backends.imap.planner import InitialSyncPlanner
 from inbox.models import Folder, Message
 from inbox.models.backends.imap import (
     ImapFolderInfo,
@@ -87,6 +90,41 @@ def test_initial_sync(
     }
 
 
+def test_priority_folder_syncs_recent_mail_first(
+    db, generic_account, inbox_folder, mock_imapclient, monkeypatch
+) -> None:
+    uid_dict = uids.example()
+    mock_imapclient.add_folder_data(inbox_folder.name, uid_dict)
+    recent_uids = set(sorted(uid_dict)[-2:])
+    monkeypatch.setattr(
+        "inbox.crispin.CrispinClient.search_uids",
+        lambda self, criteria: iter(recent_uids),
+    )
+    planner = InitialSyncPlanner("custom")
+    planner.prioritize([inbox_folder.name])
+
+    folder_sync_engine = FolderSyncEngine(
+        generic_account.id,
+        generic_account.namespace.id,
+        inbox_folder.name,
+        generic_account.email_address,
+        "custom",
+        BoundedSemaphore(1),
+        initial_sync_planner=planner,
+    )
+    assert folder_sync_engine.initial_sync() == "initial"
+    assert planner.recent_synced(inbox_folder.name)
+
+    saved_uids = db.session.query(ImapUid).filter(
+        ImapUid.folder_id == inbox_folder.id
+    )
+    assert {u.msg_uid for u in saved_uids} == recent_uids
+
+    # Once recent mail is synced the rest of the folder is backfilled.
+    assert folder_sync_engine.initial_sync() == "poll"
+    assert {u.msg_uid for u in saved_uids} == set(uid_dict)
+
+
 def test_new_uids_synced_when_polling(
     db, generic_account, inbox_folder, mock_imapclient
 ) -> None:
@@ -315,6 +353,64 @@ def test_gmail_initial_sync(
     assert {u.msg_uid for u in saved_uids} == set(uid_dict)
 
 
+def test_gmail_batch_download_skips_failed_message(
+    db, default_account, all_mail_folder, mock_imapclient, monkeypatch
+) -> None:
+    uid_dict = {}
+    for uid in range(22, 27):
+        uid_dict[uid] = uid_data.example()
+        uid_dict[uid][b"X-GM-MSGID"] = uid_dict[uid][b"X-GM-THRID"] = uid
+    mock_imapclient.add_folder_data(all_mail_folder.name, uid_dict)
+    mock_imapclient.list_folders = lambda: [
+        ((b"\\All", b"\\HasNoChildren"), b"/", "[Gmail]/All Mail")
+    ]
+    bad_uid = 24
+
+    create_message = GmailFolderSyncEngine.create_message
+
+    def create_message_failing_after_flush(
+        self, db_session, account, folder, raw_message
+    ):
+        uid = create_message(self, db_session, account, folder, raw_message)
+        if raw_message.uid == bad_uid:
+            raise ValueError("Failed to save message")
+        return uid
+
+    monkeypatch.setattr(
+        GmailFolderSyncEngine,
+        "create_message",
+        create_message_failing_after_flush,
+    )
+
+    folder_sync_engine = GmailFolderSyncEngine(
+        default_account.id,
+        default_account.namespace.id,
+        all_mail_folder.name,
+        default_account.email_address,
+        "gmail",
+        BoundedSemaphore(1),
+    )
+    with folder_sync_engine.conn_pool.get() as crispin_client:
+        crispin_client.select_folder(all_mail_folder.name, uidvalidity_cb)
+        folder_sync_engine.download_and_commit_uids(
+            crispin_client, sorted(uid_dict)
+        )
+
+    saved_uids = db.session.query(ImapUid).filter(
+        ImapUid.folder_id == all_mail_folder.id
+    )
+    assert {u.msg_uid for u in saved_uids} == set(uid_dict) - {bad_uid}
+    assert (
+        db.session.query(Message)
+        .filter(
+            Message.namespace_id == default_account.namespace.id,
+            Message.g_msgid == bad_uid,
+        )
+        .count()
+        == 0
+    )
+
+
 @pytest.mark.skipif(True, reason="Need to investigate")
 def test_gmail_message_deduplication(
     db, default_account, all_mail_folder, trash_folder, mock_imapclient
@@ -494,3 +590,9 @@ def test_gmail_handle_uidinvalid(
         .all()
         == []
     )
+
+
+def test_expand_uid_ranges() -> None:
+    assert expand_uid_ranges([(1, 3), (7, 7)], max_uids=4) == {1, 2, 3, 7}
+    assert expand_uid_ranges([(1, 3), (7, 8)], max_uids=4) is None
+    assert expand_uid_ranges([], max_uids=4) == set()
@@ -0,0 +1,56 @@
+from inbox.mailsync.backends.imap.planner import InitialSyncPlanner
+
+
+def test_recent_mail_reported_once_all_priority_folders_synced(
+    monkeypatch,
+) -> None:
+    timings = []
+    monkeypatch.setattr(
+        "inbox.mailsync.backends.imap.planner.statsd_client.timing",
+        lambda metric, value: timings.append(metric),
+    )
+    planner = InitialSyncPlanner("custom")
+    planner.prioritize(["Inbox", "Sent"])
+    assert planner.is_pending("Inbox")
+    assert not planner.is_pending("Archive")
+
+    planner.mark_recent_synced("Inbox", downloaded=True)
+    assert planner.recent_synced("Inbox")
+    assert not planner.is_pending("Inbox")
+    assert timings == []
+
+    planner.mark_recent_synced("Sent", downloaded=True)
+    assert timings == [
+        "mailsync.providers.custom.recent_mail_synced",
+        "mailsync.providers.overall.recent_mail_synced",
+    ]
+
+    # Folders that already have their recent mail aren't prioritized again.
+    planner.prioritize(["Inbox", "Sent"])
+    assert not planner.is_pending("Inbox")
+    planner.mark_recent_synced("Inbox", downloaded=True)
+    assert len(timings) == 2
+
+
+def test_recent_mail_not_reported_without_downloads(monkeypatch) -> None:
+    timings = []
+    monkeypatch.setattr(
+        "inbox.mailsync.backends.imap.planner.statsd_client.timing",
+        lambda metric, value: timings.append(metric),
+    )
+    planner = InitialSyncPlanner("custom")
+    planner.prioritize(["Inbox"])
+    # The folder was already past initial sync.
+    planner.mark_recent_synced("Inbox")
+    assert timings == []
+
+
+def test_wait_for_recent_mail_times_out() -> None:
+    planner = InitialSyncPlanner("custom")
+    planner.prioritize(["Inbox", "Sent"])
+    planner.mark_recent_synced("Inbox", downloaded=True)
+    planner.wait_for_recent_mail(timeout=0)
+    assert planner.is_pending("Sent")
+
+    planner.mark_recent_synced("Sent", downloaded=True)
+    planner.wait_for_recent_mail()
@@ -0,0 +1,145 @@
+import random
+import statistics
+
+import pytest
+
+from inbox.scheduling.load import (
+    RELEASE_THRESHOLD,
+    account_cost,
+    choose_account_to_release,
+    should_claim,
+)
+
+PROCESSES = [f"host:{process_number}" for process_number in range(8)]
+
+
+def generate_account_costs(seed, count=400):
+    rng = random.Random(seed)
+    return [
+        account_cost(
+            remote_uid_count=int(rng.paretovariate(1.2) * 5000),
+            initial_sync=rng.random() < 0.05,
+            recent_message_count=int(rng.paretovariate(1.5) * 20),
+            cpu_usage=rng.random() * 0.02,
+        )
+        for _ in range(count)
+    ]
+
+
+class Simulation:
+    """
+    Accounts land on random processes, the way events on the shared queue
+    are picked up by whichever process pops them first.
+    """
+
+    def __init__(self, seed, claim):
+        self.rng = random.Random(seed)
+        self.claim = claim
+        self.accounts = {process: {} for process in PROCESSES}
+        self.moved = []
+
+    def loads(self):
+        return {
+            process: sum(costs.values())
+            for process, costs in self.accounts.items()
+        }
+
+    def deliver(self, account_id, cost):
+        while True:
+            process = self.rng.choice(PROCESSES)
+            if self.claim(self, process, cost):
+                self.accounts[process][account_id] = cost
+                return
+
+    def rebalance(self):
+        moves = 0
+        for process in self.rng.sample(PROCESSES, len(PROCESSES)):
+            account_id = choose_account_to_release(
+                process, self.accounts[process], self.loads()
+            )
+            if account_id is not None:
+                self.deliver(
+                    account_id, self.accounts[process].pop(account_id)
+                )
+                self.moved.append(account_id)
+                moves += 1
+        return moves
+
+    def load_spread(self):
+        loads = list(self.loads().values())
+        return statistics.pstdev(loads) / statistics.mean(loads)
+
+
+def claim_by_count(simulation, process, cost):
+    cap = 1.1 * 400 / len(PROCESSES)
+    return len(simulation.accounts[process]) < cap
+
+
+def claim_by_load(simulation, process, cost):
+    loads = simulation.loads()
+    return should_claim(loads[process], cost, loads)
+
+
+def test_account_cost() -> None:
+    idle = account_cost()
+    assert account_cost(remote_uid_count=500000) > idle
+    assert account_cost(initial_sync=True) > account_cost(
+        remote_uid_count=500000
+    )
+    assert account_cost(recent_message_count=1000) > idle
+    assert account_cost(cpu_usage=0.5) > idle
+
+
+def test_least_loaded_process_always_claims() -> None:
+    loads = {"host:0": 10.0, "host:1": 20.0}
+    assert should_claim(10.0, 100.0, loads)
+    assert not should_claim(20.0, 100.0, loads)
+    assert should_claim(0.0, 100.0, {})
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_load_aware_placement_lowers_load_spread(seed) -> None:
+    account_costs = generate_account_costs(seed)
+
+    by_count = Simulation(seed, claim_by_count)
+    by_load = Simulation(seed, claim_by_load)
+    for account_id, cost in enumerate(account_costs):
+        by_count.deliver(account_id, cost)
+        by_load.deliver(account_id, cost)
+
+    assert by_load.load_spread() < by_count.load_spread() / 2
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rebalancing_after_load_changes(seed) -> None:
+    simulation = Simulation(seed, claim_by_load)
+    for account_id, cost in enumerate(generate_account_costs(seed)):
+        simulation.deliver(account_id, cost)
+
+    # Accounts on two processes get busy, e.g. start a resync.
+    for process in PROCESSES[:2]:
+        for account_id, cost in simulation.accounts[process].items():
+            if simulation.rng.random() < 0.3:
+                simulation.accounts[process][account_id] = cost * 3
+    spread = simulation.load_spread()
+
+    moves = [simulation.rebalance() for _ in range(20)]
+    assert sum(moves) > 0
+    assert simulation.load_spread() < spread
+    loads = simulation.loads().values()
+    assert max(loads) <= statistics.mean(loads) * (1 + RELEASE_THRESHOLD)
+
+    # Hysteresis: once balanced, accounts stay where they are.
+    assert moves[-5:] == [0] * 5
+    assert len(set(simulation.moved)) == len(simulation.moved)
+
+
+def test_release_keeps_receiver_under_release_threshold() -> None:
+    loads = {"host:0": 200.0, "host:1": 100.0, "host:2": 100.0}
+    account_costs = {1: 90.0, 2: 40.0, 3: 5.0}
+    # Releasing account 1 would overload whoever picks it up, so the most
+    # expensive account that still fits is released instead.
+    assert choose_account_to_release("host:0", account_costs, loads) == 2
+
+    balanced = {"host:0": 120.0, "host:1": 100.0, "host:2": 100.0}
+    assert choose_account_to_release("host:0", account_costs, balanced) is None
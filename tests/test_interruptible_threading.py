@@ -3,6 +3,7 @@ import time
 
 from inbox import interruptible_threading
 from inbox.interruptible_threading import InterruptibleThread
+from inbox.util.call_site import get_call_site
 
 
 class SuccessfulThread(InterruptibleThread):
@@ -147,3 +148,35 @@ def test_several_timeouts_interrupts_sleep() -> None:
     assert thread.ready() is True
     assert thread.successful() is True
     assert thread.exception is None
+
+
+class CallSiteThread(InterruptibleThread):
+    def __init__(self) -> None:
+        self.call_site = None
+
+        super().__init__()
+
+    def _run(self):
+        self.call_site = get_call_site()
+
+
+def test_thread_tags_call_site() -> None:
+    thread = CallSiteThread()
+    thread.start()
+    thread.join()
+
+    assert thread.call_site == "CallSiteThread"
+    assert get_call_site() is None
+
+
+def test_thread_call_site_is_a_metric_level() -> None:
+    call_sites = []
+
+    def target() -> None:
+        call_sites.append(get_call_site())
+
+    thread = InterruptibleThread(target=target)
+    thread.start()
+    thread.join()
+
+    assert call_sites == ["test_thread_call_site_is_a_metric_level-target"]
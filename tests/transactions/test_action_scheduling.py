@@ -1,5 +1,9 @@
-from inbox.models.action_log import ActionLog, schedule_action
-from tests.util.base import add_fake_event
+from inbox.models.action_log import (
+    ActionLog,
+    schedule_action,
+    schedule_actions,
+)
+from tests.util.base import add_fake_event, add_fake_message
 
 
 def test_action_scheduling(db, default_account) -> None:
@@ -52,3 +56,43 @@ def test_action_scheduling(db, default_account) -> None:
         calendar_name=event.calendar.name,
         calendar_uid=event.calendar.uid,
     )
+
+
+def test_bulk_action_scheduling(db, default_account, thread) -> None:
+    namespace_id = default_account.namespace.id
+    messages = [
+        add_fake_message(db.session, namespace_id, thread) for _ in range(3)
+    ]
+    schedule_action(
+        "mark_unread", messages[0], namespace_id, db.session, unread=True
+    )
+    schedule_action(
+        "mark_unread", messages[1], namespace_id, db.session, unread=False
+    )
+
+    schedule_actions(
+        "mark_unread",
+        messages + [messages[2]],
+        namespace_id,
+        db.session,
+        unread=True,
+    )
+    db.session.commit()
+
+    entries = (
+        db.session.query(ActionLog)
+        .filter(
+            ActionLog.namespace_id == namespace_id,
+            ActionLog.action == "mark_unread",
+        )
+        .order_by(ActionLog.id)
+        .all()
+    )
+    # The first message already had the same action pending and the last one
+    # was passed twice.
+    assert [(entry.record_id, entry.extra_args) for entry in entries] == [
+        (messages[0].id, {"unread": True}),
+        (messages[1].id, {"unread": False}),
+        (messages[1].id, {"unread": True}),
+        (messages[2].id, {"unread": True}),
+    ]
@@ -3,7 +3,7 @@ from datetime import datetime
 from flanker import mime
 from sqlalchemy import desc
 
-from inbox.models import AccountTransaction, Calendar, Transaction
+from inbox.models import AccountTransaction, Calendar, Thread, Transaction
 from inbox.models.mixins import HasRevisions
 from inbox.models.util import transaction_objects
 from tests.util.base import (
@@ -112,6 +112,57 @@ def test_message_updates_create_thread_transaction(
         assert same_transaction.id == new_transaction.id
 
 
+def test_flush_only_inspects_changed_objects(
+    db, default_namespace, monkeypatch
+) -> None:
+    thread_ids = [
+        add_fake_thread(db.session, default_namespace.id).id for _ in range(50)
+    ]
+    db.session.commit()
+    # Load every thread into the session, but only change two of them.
+    db.session.expunge_all()
+    threads = (
+        db.session.query(Thread)
+        .filter(Thread.id.in_(thread_ids))
+        .order_by(Thread.id)
+        .all()
+    )
+    threads[40].dirty = True
+    threads[10].subject = "Changed"
+
+    inspected = []
+    has_versioned_changes = HasRevisions.has_versioned_changes
+    monkeypatch.setattr(
+        HasRevisions,
+        "has_versioned_changes",
+        lambda self: inspected.append(self) or has_versioned_changes(self),
+    )
+    identity_map_type = type(db.session.identity_map)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The identity map was iterated over")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(identity_map_type, "values", fail)
+        patch.setattr(identity_map_type, "__iter__", fail)
+        patch.setattr(type(db.session), "__iter__", fail)
+        db.session.flush()
+    db.session.commit()
+
+    assert inspected
+    assert all(obj in (threads[10], threads[40]) for obj in inspected)
+    first, second = (
+        get_latest_transaction(
+            db.session, "thread", thr.id, default_namespace.id
+        )
+        for thr in (threads[10], threads[40])
+    )
+    assert first.command == second.command == "update"
+    # Transactions are created in the order the threads were loaded.
+    assert first.id < second.id
+    assert not threads[40].dirty
+
+
 def test_message_category_updates_create_transaction(
     db, default_namespace
 ) -> None:
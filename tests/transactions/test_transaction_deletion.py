@@ -7,7 +7,13 @@ from sqlalchemy import desc
 
 from inbox.ignition import redis_txn
 from inbox.models.transaction import TXN_REDIS_KEY, Transaction
-from inbox.models.util import purge_transactions
+from inbox.models.util import (
+    create_transaction_partitions,
+    drop_expired_transaction_partitions,
+    get_transaction_partitions,
+    partition_transaction_table,
+    purge_transactions,
+)
 
 
 def get_latest_transaction(db_session, namespace_id):
@@ -159,3 +165,51 @@ class TestTransactionDeletion:
 
         assert not db.session.query(Transaction).count()
         assert not len(_get_redis_transactions())
+
+
+class TestTransactionPartitions:
+    @pytest.fixture
+    def partitioned(self, db, default_namespace):
+        shard_id = default_namespace.id >> 48
+        yield shard_id
+        db.session.rollback()
+        if get_transaction_partitions(db.session):
+            db.session.execute("ALTER TABLE transaction REMOVE PARTITIONING")
+
+    def test_expired_partitions_dropped(
+        self, db, default_namespace, partitioned
+    ) -> None:
+        shard_id = partitioned
+        now = datetime.utcnow()
+        old = create_transaction(
+            db, now - timedelta(days=31), default_namespace.id
+        )
+        partition_transaction_table(shard_id, partition_size=1, ahead=2)
+        db.session.commit()
+        partitions = get_transaction_partitions(db.session)
+        assert [bound for _, bound in partitions] == [
+            old.id + 1,
+            old.id + 2,
+            old.id + 3,
+            None,
+        ]
+
+        new = create_transaction(db, now, default_namespace.id)
+        create_transaction_partitions(shard_id, partition_size=1, ahead=2)
+        db.session.commit()
+        bounds = [bound for _, bound in get_transaction_partitions(db.session)]
+        assert bounds[-2] == bounds[-3] + 1
+        assert len(bounds) == 5
+
+        # Partitions holding unexpired transactions are kept.
+        assert not drop_expired_transaction_partitions(
+            shard_id, days_ago=31, now=now - timedelta(days=1)
+        )
+        dropped = drop_expired_transaction_partitions(
+            shard_id, days_ago=30, now=now
+        )
+        assert dropped == [partitions[0][0]]
+        db.session.commit()
+        remaining = {t.id for t in db.session.query(Transaction)}
+        assert old.id not in remaining
+        assert new.id in remaining
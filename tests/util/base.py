@@ -741,6 +741,74 @@ def mock_time_sleep(monkeypatch):
     monkeypatch.undo()
 
 
+class LocalHTTPServer:
+    """
+    HTTP server on localhost that answers with queued responses and records
+    the requests it got, including which client connection they came from.
+    """
+
+    def __init__(self):
+        import http.server
+        import threading
+
+        self.responses = []
+        self.requests = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            # Keep-alive, so that connection reuse can be checked.
+            protocol_version = "HTTP/1.1"
+
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length", 0))
+                server.requests.append({
+                    "method": self.command,
+                    "path": self.path,
+                    "headers": dict(self.headers),
+                    "body": self.rfile.read(length),
+                    "client_port": self.client_address[1],
+                })
+                status, body, headers = server.responses.pop(0)
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_DELETE = handle_request  # noqa: N815
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0), Handler
+        )
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self.thread.start()
+
+    def add_response(self, status, body=b"", headers=None):
+        self.responses.append((status, body, headers or {}))
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@fixture
+def local_http_server():
+    server = LocalHTTPServer()
+    yield server
+    server.stop()
+
+
 def mock_client():
     mock_client = mock_strict_redis_client()
     mock_client.reset = lambda: True
@@ -784,7 +852,7 @@ def redis_mock(redis_client, monkeypatch):
         "inbox.heartbeat.store.HeartbeatStore.__init__", set_self_client
     )
     monkeypatch.setattr(
-        "inbox.scheduling.event_queue._get_redis_client", fake_redis_client
+        "inbox.scheduling.event_queue.create_redis_client", fake_redis_client
     )
     monkeypatch.setattr(
         "inbox.mailsync.service.SHARED_SYNC_EVENT_QUEUE_ZONE_MAP", {}
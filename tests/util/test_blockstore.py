@@ -42,3 +42,64 @@ def test_save_and_get_raw_mime_with_compression(tiny_email_data) -> None:
 
     assert stored_length < len(tiny_email_data)
     assert blockstore.get_raw_mime(data_sha256) == tiny_email_data
+
+
+@pytest.mark.usefixtures("blockstore_backend")
+@pytest.mark.parametrize("blockstore_backend", ["disk", "s3"], indirect=True)
+def test_get_size_from_blockstore(tiny_email_data) -> None:
+    data_sha256 = hashlib.sha256(tiny_email_data).hexdigest()
+    blockstore.delete_from_blockstore(data_sha256)
+    assert blockstore.get_size_from_blockstore(data_sha256) is None
+
+    stored_length = blockstore.save_raw_mime(
+        data_sha256, tiny_email_data, compress=True
+    )
+    assert blockstore.get_size_from_blockstore(data_sha256) == stored_length
+
+    blockstore.delete_from_blockstore(data_sha256)
+    assert blockstore.get_size_from_blockstore(data_sha256) is None
+
+
+@pytest.mark.usefixtures("blockstore_backend")
+@pytest.mark.parametrize("blockstore_backend", ["disk", "s3"], indirect=True)
+@pytest.mark.parametrize("compress", [False, True])
+def test_stream_raw_mime(monkeypatch, tiny_email_data, compress) -> None:
+    monkeypatch.setattr("inbox.util.blockstore.STREAM_CHUNK_SIZE", 100)
+    data_sha256 = hashlib.sha256(tiny_email_data).hexdigest()
+    blockstore.save_raw_mime(data_sha256, tiny_email_data, compress=compress)
+
+    stream = blockstore.stream_raw_mime(data_sha256)
+    assert stream is not None
+    assert stream.length == len(tiny_email_data)
+    assert stream.seekable() is not compress
+
+    chunks = list(iter(lambda: stream.read(1000), b""))
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert b"".join(chunks) == tiny_email_data
+    stream.close()
+
+    blockstore.delete_from_blockstore(data_sha256)
+    assert blockstore.stream_raw_mime(data_sha256) is None
+
+
+@pytest.mark.usefixtures("blockstore_backend")
+@pytest.mark.parametrize("blockstore_backend", ["disk", "s3"], indirect=True)
+def test_stream_from_blockstore(tiny_email_data) -> None:
+    data_sha256 = hashlib.sha256(tiny_email_data).hexdigest()
+    blockstore.save_to_blockstore(data_sha256, tiny_email_data)
+
+    with blockstore.stream_from_blockstore(data_sha256) as stream:
+        assert stream.read() == tiny_email_data
+
+    with blockstore.stream_from_blockstore(data_sha256) as stream:
+        assert stream.seek(10) == 10
+        assert stream.read(5) == tiny_email_data[10:15]
+        assert stream.tell() == 15
+
+    blockstore.save_to_blockstore(data_sha256, b"not the data", overwrite=True)
+    with (
+        blockstore.stream_from_blockstore(data_sha256) as stream,
+        pytest.raises(AssertionError),
+    ):
+        stream.read()
+    blockstore.delete_from_blockstore(data_sha256)